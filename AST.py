@@ -1,6 +1,10 @@
 from abc import ABC
 from typing import TypeVar, Generic
 
+from Errors import GJKError, GJKRuntimeError
+from Rope import concat
+from SymbolTable import read_line, write_line, get_budget
+
 
 class ASTNode(ABC):
     """
@@ -19,7 +23,24 @@ class ASTNode(ABC):
         :param self: 
         :return: 
         """
-        pass
+        self.__line = None
+        self.__column = None
+
+    def set_position(self, line, column) -> None:
+        """
+        Nastaví pozici ve zdrojovém kódu, ze které uzel vznikl.
+
+        :param line: Číslo řádku.
+        :param column: Číslo sloupce.
+        """
+        self.__line = line
+        self.__column = column
+
+    def get_position(self) -> tuple:
+        """
+        :return: Dvojice (řádek, sloupec), případně (None, None), pokud pozice není známa.
+        """
+        return self.__line, self.__column
 
     def evaluate(self, symbol_table: dict):
         """
@@ -28,13 +49,21 @@ class ASTNode(ABC):
 
         :param self:
         :param symbol_table: Tabulka symbolů slouží k udržování
-        informací o proměnných (jméno, hodnota) a o funkcích.
+        informací o globálních proměnných (jméno, hodnota).
 
         :return: Výsledek vyhodnocení vrcholu. Podoba záleží 
         na konkrétním druhu vrcholu. 
         """
         pass
 
+    def __str__(self):
+        """
+        :return: Podstrom zapsaný jako S-výraz (viz Serializer).
+        """
+        from Serializer import dumps
+
+        return dumps(self)
+
 
 #####################################################
 # KEYWORDS & VARIABLES                              #
@@ -58,17 +87,27 @@ class ASTNodeReadKeyword(ASTNode):
         super().__init__()
         self.__expr = ex
 
-    def evaluate(self, symbol_table: dict):
-        data = input("> ")
+    def get_expression(self) -> ASTNodeIdent:
+        return self.__expr
+
+    @staticmethod
+    def convert(data: str):
+        """
+        Převede řetězec zadaný uživatelem na hodnotu proměnné (číslo,
+        pravdivostní hodnotu nebo řetězec).
+        """
         try:
-            symbol_table[self.__expr.get_name()] = int(data)
+            return int(data)
         except ValueError:
             if data == "True":
-                symbol_table[self.__expr.get_name()] = True
+                return True
             elif data == "False":
-                symbol_table[self.__expr.get_name()] = False
+                return False
             else:
-                symbol_table[self.__expr.get_name()] = data
+                return data
+
+    def evaluate(self, symbol_table: dict):
+        symbol_table[self.__expr.get_name()] = ASTNodeReadKeyword.convert(read_line(symbol_table, "> "))
 
 
 class ASTNodePrintKeyword(ASTNode):
@@ -77,8 +116,11 @@ class ASTNodePrintKeyword(ASTNode):
         super().__init__()
         self.__expr = ex
 
+    def get_expression(self) -> ASTNode:
+        return self.__expr
+
     def evaluate(self, symbol_table: dict):
-        return print(str(self.__expr.evaluate(symbol_table)))
+        return write_line(symbol_table, str(self.__expr.evaluate(symbol_table)))
 
 
 #####################################################
@@ -93,6 +135,9 @@ class ASTNodeConstant(ASTNode, Generic[CT]):
         super().__init__()
         self.__value__ = value
 
+    def get_value(self) -> CT:
+        return self.__value__
+
     def evaluate(self, symbol_table: dict) -> CT:
         return self.__value__
 
@@ -105,6 +150,15 @@ class ASTNodeNumConst(ASTNodeConstant[int]):
     pass
 
 
+class ASTNodeFloatConst(ASTNodeNumConst):
+    """
+    Desetinná číselná konstanta
+
+    Je to číselná konstanta, podle typu hodnoty se ale může specializovat
+    jinak než celé číslo.
+    """
+
+
 class ASTNodeStringConst(ASTNodeConstant[str]):
     pass
 
@@ -117,13 +171,40 @@ class ASTNodeProg(ASTNode):
     def __init__(self):
         super().__init__()
         self.__expressions = []
+        self.__steps = None
 
     def add_expression(self, expression: ASTNode):
         self.__expressions.append(expression)
 
+    def get_expressions(self) -> list:
+        return self.__expressions
+
+    def get_steps(self) -> int:
+        """
+        :return: Počet kroků, které blok započítává do limitů běhu. Obvykle
+        je to počet jeho příkazů; blok upravený optimalizací (viz Optimizer)
+        započítává tolik kroků jako blok, ze kterého vznikl.
+        """
+        return len(self.__expressions) if self.__steps is None else self.__steps
+
+    def set_steps(self, steps: int) -> None:
+        self.__steps = steps
+
     def evaluate(self, symbol_table: dict):
+        # Limity běhu dodržuje kopie stromu z BudgetedTree.make_budgeted.
+        self.evaluate_statements(symbol_table)
+
+    def evaluate_statements(self, symbol_table: dict):
+        """
+        Vykoná příkazy bloku, aniž by je započítal do limitů běhu.
+        """
         for e in self.__expressions:
-            e.evaluate(symbol_table)
+            try:
+                e.evaluate(symbol_table)
+            except GJKError:
+                raise
+            except Exception as ex:
+                raise GJKRuntimeError.from_exception(ex, e.get_position()) from ex
 
 
 class ASTNodeCondStatement(ASTNode):
@@ -141,6 +222,15 @@ class ASTNodeCondStatement(ASTNode):
             raise TypeError
         self.__else = expressions
 
+    def get_condition(self) -> ASTNode:
+        return self.__condition
+
+    def get_then(self) -> ASTNode:
+        return self.__then
+
+    def get_else(self):
+        return self.__else
+
     def evaluate(self, symbol_table: dict):
         if self.__condition.evaluate(symbol_table) is True:
             self.__then.evaluate(symbol_table)
@@ -161,6 +251,15 @@ class ASTNodeTernStatement(ASTNode):
             raise TypeError
         self.__else_ternary = else_ternary
 
+    def get_condition(self) -> ASTNode:
+        return self.__condition
+
+    def get_then(self) -> ASTNode:
+        return self.__then_ternary
+
+    def get_else(self) -> ASTNode:
+        return self.__else_ternary
+
     def evaluate(self, symbol_table: dict):
         if self.__condition.evaluate(symbol_table) is True:
             self.__then_ternary.evaluate(symbol_table)
@@ -168,6 +267,124 @@ class ASTNodeTernStatement(ASTNode):
             self.__else_ternary.evaluate(symbol_table)
 
 
+class ASTNodeWhileLoop(ASTNode):
+
+    def __init__(self, condition: ASTNode, body: ASTNode):
+        super().__init__()
+        self.__condition = condition
+        if isinstance(body, ASTNodeProg) is False:
+            raise TypeError
+        self.__body = body
+
+    def get_condition(self) -> ASTNode:
+        return self.__condition
+
+    def get_body(self) -> ASTNode:
+        return self.__body
+
+    def evaluate(self, symbol_table: dict):
+        while self.__condition.evaluate(symbol_table) is True:
+            self.__body.evaluate_statements(symbol_table)
+
+
+#####################################################
+# FUNCTIONS                                         #
+#####################################################
+class ASTNodeFunctionDef(ASTNode):
+    """
+    Definice uživatelské funkce
+
+    Funkce jsou známé v celém programu už od jeho překladu, vyhodnocení
+    definice proto nic nedělá. Tělo funkce vykonává Functions.Function.
+    """
+
+    def __init__(self, name: str, parameters: list, body: ASTNode):
+        super().__init__()
+        if isinstance(body, ASTNodeProg) is False:
+            raise TypeError
+        self.__name = name
+        self.__parameters = list(parameters)
+        self.__body = body
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_parameters(self) -> list:
+        return self.__parameters
+
+    def get_body(self) -> ASTNodeProg:
+        return self.__body
+
+    def evaluate(self, symbol_table: dict):
+        pass
+
+
+class ASTNodeCall(ASTNode):
+    """
+    Volání uživatelské funkce
+
+    Volaná funkce se hledá podle jména v tabulce funkcí programu, kterou
+    sdílí všechna volání. Při prvním volání se najde a přeloží a místo
+    volání si ji pamatuje (zvlášť pro běh s limity a bez nich).
+    """
+
+    def __init__(self, name: str, arguments: list, functions: dict):
+        """
+        Konstruktor
+
+        :param name: Jméno volané funkce.
+        :param arguments: Výrazy, jejichž hodnoty se předají jako argumenty.
+        :param functions: Tabulka funkcí programu (jméno -> ASTNodeFunctionDef).
+        """
+        super().__init__()
+        self.__name = name
+        self.__arguments = list(arguments)
+        self.__functions = functions
+        self.__sites = [None, None]
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_arguments(self) -> list:
+        return self.__arguments
+
+    def get_functions(self) -> dict:
+        return self.__functions
+
+    def get_function(self):
+        """
+        :return: Definice volané funkce, případně None, pokud neexistuje.
+        """
+        return self.__functions.get(self.__name)
+
+    def evaluate(self, symbol_table: dict):
+        budgeted = get_budget(symbol_table) is not None
+        site = self.__sites[budgeted]
+        if site is None:
+            from Functions import call_site
+
+            site = self.__sites[budgeted] = call_site(self, budgeted)
+        return site([a.evaluate(symbol_table) for a in self.__arguments], symbol_table)
+
+
+class ASTNodeReturn(ASTNode):
+    """
+    Návrat z funkce, případně s hodnotou (bez hodnoty funkce vrací False)
+
+    Příkaz se vyskytuje jen v tělech funkcí, vykonává ho Functions.Function.
+    """
+
+    def __init__(self, ex: ASTNode = None):
+        super().__init__()
+        self.__expr = ex
+
+    def get_expression(self):
+        return self.__expr
+
+    def evaluate(self, symbol_table: dict):
+        raise GJKRuntimeError("Return outside of a function", *self.get_position())
+
+
 #####################################################
 # OPERATORS                                         #
 #####################################################
@@ -183,6 +400,15 @@ class ASTNodeBinaryOp(ASTNode, ABC):
     def change_right_child(self, right_child: ASTNode):
         self.__right_child = right_child
 
+    def get_left_child(self) -> ASTNode:
+        return self.__left_child
+
+    def get_right_child(self) -> ASTNode:
+        return self.__right_child
+
+    def get_op(self):
+        return self.__op
+
     def evaluate(self, symbol_table: dict):
         return self.__op(self.__left_child.evaluate(symbol_table),
                          self.__right_child.evaluate(symbol_table))
@@ -195,8 +421,14 @@ class ASTNodeUnaryOp(ASTNode, ABC):
         self.__child = child
         self.__op = op
 
+    def get_child(self) -> ASTNode:
+        return self.__child
+
+    def get_op(self):
+        return self.__op
+
     def evaluate(self, symbol_table: dict):
-        return self.__op(self.__child)
+        return self.__op(self.__child.evaluate(symbol_table))
 
 
 class ASTNodeOpAssign(ASTNodeBinaryOp):
@@ -215,7 +447,9 @@ class ASTNodeOpAssign(ASTNodeBinaryOp):
 class ASTNodeOpSum(ASTNodeBinaryOp):
 
     def __init__(self, left_child: ASTNode, right_child: ASTNode):
-        super().__init__(left_child, right_child, lambda x, y: x + y)
+        # Dlouhé řetězce se spojují líně (viz Rope), aby hromadění řetězce
+        # v cyklu nebylo kvadratické.
+        super().__init__(left_child, right_child, concat)
 
 
 class ASTNodeOpSub(ASTNodeBinaryOp):
@@ -237,15 +471,35 @@ class ASTNodeOpDiv(ASTNodeBinaryOp):
 
 
 class ASTNodeOpAnd(ASTNodeBinaryOp):
+    """
+    Logický součin se zkráceným vyhodnocením
+
+    Pravý operand se vyhodnocuje pouze tehdy, pokud o výsledku nerozhodl
+    už levý operand.
+    """
 
     def __init__(self, left_child: ASTNode, right_child: ASTNode):
-        super().__init__(left_child, right_child, lambda x, y: x and y)
+        super().__init__(left_child, right_child, None)
+
+    def evaluate(self, symbol_table: dict):
+        return self._ASTNodeBinaryOp__left_child.evaluate(symbol_table) \
+            and self._ASTNodeBinaryOp__right_child.evaluate(symbol_table)
 
 
 class ASTNodeOpOr(ASTNodeBinaryOp):
+    """
+    Logický součet se zkráceným vyhodnocením
+
+    Pravý operand se vyhodnocuje pouze tehdy, pokud o výsledku nerozhodl
+    už levý operand.
+    """
 
     def __init__(self, left_child: ASTNode, right_child: ASTNode):
-        super().__init__(left_child, right_child, lambda x, y: x or y)
+        super().__init__(left_child, right_child, None)
+
+    def evaluate(self, symbol_table: dict):
+        return self._ASTNodeBinaryOp__left_child.evaluate(symbol_table) \
+            or self._ASTNodeBinaryOp__right_child.evaluate(symbol_table)
 
 
 class ASTNodeOpGrThan(ASTNodeBinaryOp):
@@ -0,0 +1,390 @@
+import threading
+import weakref
+
+from AST import *
+from BudgetedTree import compile_tree
+from Rope import Rope, concat
+from Instrumentation import Instrumentation
+
+"""Počet vyhodnocení, po kterých se místo programu pokusí specializovat."""
+WARMUP_THRESHOLD = 16
+
+"""Horní mez pro prodlužování zahřívací fáze po neúspěšné specializaci."""
+MAX_BACKOFF = 1024
+
+"""Šablona specializované implementace binárního operátoru se strážemi typů."""
+_FAST_TEMPLATE = """
+def factory(left, right, left_type, right_type, fallback):
+    {left_setup}
+    {right_setup}
+
+    def fast(symbol_table):
+        l = {left_expr}
+        r = {right_expr}
+        if {guard}:
+            return l {op} r
+        return fallback(l, r)
+    return fast
+"""
+
+"""Cache vygenerovaných továren podle operátoru a druhů operandů."""
+_factories = {}
+
+"""
+Zámek přechodů mezi stavy míst (specializace a deoptimalizace). Přechody
+jsou vzácné, stačí proto jeden zámek pro všechna místa.
+"""
+_transitions = threading.Lock()
+
+"""
+Adaptivní stromy přeložených programů spolu s jejich čítači (viz
+compile_adaptive). Položka zaniká spolu se syntaktickým stromem.
+"""
+_trees = weakref.WeakKeyDictionary()
+
+
+def _operand_kind(node: ASTNode) -> str:
+    if isinstance(node, ASTNodeConstant):
+        return "const"
+    if isinstance(node, ASTNodeIdent):
+        return "ident"
+    return "node"
+
+
+def fast_factory(op: str, left: ASTNode, right: ASTNode):
+    """
+    Vrátí továrnu na specializovanou implementaci operátoru.
+
+    Konstantní operandy se do implementace vloží přímo a nehlídají se,
+    proměnné se čtou přímo z tabulky symbolů a ostatní uzly se vyhodnotí.
+    Továrna přijímá operandy, očekávané typy operandů a funkci, která
+    výsledek spočítá, pokud stráž typů selže.
+
+    :param op: Operátor Pythonu.
+    """
+    kinds = (op, _operand_kind(left), _operand_kind(right))
+    if kinds in _factories:
+        return _factories[kinds]
+
+    parts = {"op": op}
+    guards = []
+    for side, kind in (("left", kinds[1]), ("right", kinds[2])):
+        if kind == "const":
+            parts[side + "_setup"] = "{0:s}_value = {0:s}.get_value()".format(side)
+            parts[side + "_expr"] = side + "_value"
+        elif kind == "ident":
+            parts[side + "_setup"] = "{0:s}_name = {0:s}.get_name()".format(side)
+            parts[side + "_expr"] = "symbol_table[{:s}_name]".format(side)
+        else:
+            parts[side + "_setup"] = "pass"
+            parts[side + "_expr"] = "{:s}.evaluate(symbol_table)".format(side)
+        if kind != "const":
+            guards.append("type({:s}) is {:s}_type".format(side[0], side))
+    parts["guard"] = " and ".join(guards) or "True"
+
+    namespace = {}
+    exec(_FAST_TEMPLATE.format(**parts), namespace)
+    _factories[kinds] = namespace["factory"]
+    return namespace["factory"]
+
+
+class AdaptiveSite(ABC):
+    """
+    Společný předek míst programu, která sbírají informace o typech
+
+    Během zahřívací fáze si místo zaznamenává typy hodnot, které vidí. Po
+    dosažení prahu se, pokud vidělo jen jedinou kombinaci typů, nahradí
+    rychlou implementací (přepíše si metodu evaluate). Pokud se kombinace
+    typů později změní, specializaci zruší a zahřívání začne znovu s delším
+    prahem.
+
+    Místo, které specializovaný nadřazený operátor vložil do své
+    implementace (a které se proto nevyhodnocuje), je ve stavu "subsumed",
+    dokud se nadřazený operátor nedeoptimalizuje.
+
+    Program může běžet souběžně ve více vláknech. Záznam typů je proto jen
+    přibližný, přechody mezi stavy ale probíhají pod zámkem a každý se
+    provede jen jednou.
+    """
+
+    def _init_site(self, kind: str, instrumentation: Instrumentation, threshold: int):
+        self._kind = kind
+        self._threshold = threshold
+        self._backoff = threshold
+        self._warmup = 0
+        self._observed = {}
+        self._state = "warming"
+        self._resumed_state = None
+        self._specializations = 0
+        self._deoptimizations = 0
+        self._site = instrumentation.register_site(self) if instrumentation is not None else None
+
+    def _record(self, key) -> None:
+        self._observed[key] = self._observed.get(key, 0) + 1
+        self._warmup += 1
+        if self._warmup >= self._backoff:
+            with _transitions:
+                if self._warmup < self._backoff or self._state == "specialized":
+                    # Přechod už provedlo jiné vlákno.
+                    return
+                if len(self._observed) == 1:
+                    self._specialize(key)
+                    self._specializations += 1
+                    self._state = "specialized"
+                else:
+                    # Místo je polymorfní, zkusíme to znovu později.
+                    self._state = "generic"
+                    self._restart()
+
+    def _restart(self) -> None:
+        self._warmup = 0
+        self._observed = {}
+        self._backoff = min(self._backoff * 2, MAX_BACKOFF)
+
+    def _deoptimize(self) -> None:
+        with _transitions:
+            if self._state != "specialized":
+                # Stráž selhala ve více vláknech najednou.
+                return
+            # Odstraněním instančního atributu se vrátí obecná metoda třídy.
+            del self.evaluate
+            self._deoptimizations += 1
+            self._state = "warming"
+            self._restart()
+
+    def _specialize(self, key) -> None:
+        pass
+
+    def _subsume(self) -> None:
+        # Volá se pod zámkem přechodů ze specializace nadřazeného místa.
+        if self._state != "subsumed":
+            self._resumed_state = self._state
+            self._state = "subsumed"
+
+    def _resume(self) -> None:
+        # Volá se pod zámkem přechodů z deoptimalizace nadřazeného místa.
+        if self._state == "subsumed":
+            self._state = self._resumed_state
+
+    def get_counters(self) -> dict:
+        """
+        :return: Čítače místa programu.
+        """
+        return {
+            "site": self._site,
+            "kind": self._kind,
+            "state": self._state,
+            "types": {tuple(t.__name__ for t in key): n for key, n in self._observed.items()},
+            "specializations": self._specializations,
+            "deoptimizations": self._deoptimizations
+        }
+
+
+class ASTNodeAdaptiveIdent(ASTNodeIdent, AdaptiveSite):
+    """
+    Proměnná, která si během zahřívání zaznamenává typy svých hodnot a poté
+    přejde na čtení, které jen hlídá typ hodnoty. Pokud stráž selže, místo
+    se deoptimalizuje.
+    """
+
+    def __init__(self, name: str, instrumentation: Instrumentation = None, threshold: int = WARMUP_THRESHOLD):
+        super().__init__(name)
+        self._init_site("Ident:" + name, instrumentation, threshold)
+
+    def evaluate(self, symbol_table: dict):
+        value = symbol_table[self.get_name()]
+        self._record((type(value),))
+        return value
+
+    def _specialize(self, key) -> None:
+        name = self.get_name()
+        expected = key[0]
+        guard_failed = self.__guard_failed
+
+        def fast(symbol_table):
+            value = symbol_table[name]
+            if type(value) is expected:
+                return value
+            return guard_failed(value)
+        self.evaluate = fast
+
+    def __guard_failed(self, value):
+        self._deoptimize()
+        self._record((type(value),))
+        return value
+
+
+class ASTNodeAdaptiveBinaryOp(ASTNode, AdaptiveSite):
+    """
+    Binární operátor, který se po zahřátí nahradí implementací specializovanou
+    na pozorované typy operandů
+
+    Specializovaná implementace má operátor vložený přímo ve svém těle a
+    hlídá typy operandů, které nejsou konstantní. Pokud stráž selže,
+    výsledek se dopočítá obecným operátorem a místo se deoptimalizuje.
+    """
+
+    """Pomocná konstanta s podporovanými operátory a jim odpovídajícími operátory Pythonu."""
+    __operators = {
+        ASTNodeOpSum: '+',
+        ASTNodeOpSub: '-',
+        ASTNodeOpMul: '*',
+        ASTNodeOpDiv: '/',
+        ASTNodeOpGrThan: '>',
+        ASTNodeOpGrOrEqual: '>=',
+        ASTNodeOpEqual: '==',
+        ASTNodeOpNotEq: '!=',
+        ASTNodeOpLess: '<',
+        ASTNodeOpLesOrEqual: '<='
+    }
+
+    def __init__(self, generic: ASTNodeBinaryOp, instrumentation: Instrumentation = None,
+                 threshold: int = WARMUP_THRESHOLD):
+        super().__init__()
+        self.__generic = generic
+        self.__left = generic.get_left_child()
+        self.__right = generic.get_right_child()
+        self.__op = generic.get_op()
+        self.__inlined = ()
+        self._init_site(type(generic).__name__[len("ASTNode"):], instrumentation, threshold)
+
+    @staticmethod
+    def is_supported(node: ASTNode) -> bool:
+        return type(node) in ASTNodeAdaptiveBinaryOp.__operators
+
+    def get_generic(self) -> ASTNodeBinaryOp:
+        return self.__generic
+
+    def evaluate(self, symbol_table: dict):
+        l = self.__left.evaluate(symbol_table)
+        r = self.__right.evaluate(symbol_table)
+        self._record((type(l), type(r)))
+        return self.__op(l, r)
+
+    def _specialize(self, key) -> None:
+        if isinstance(self.__generic, ASTNodeOpSum) and (str in key or Rope in key):
+            # Spojování řetězců se neinlinuje, aby dlouhé řetězce vznikaly jako Rope.
+            left, right = self.__left, self.__right
+            self.evaluate = lambda symbol_table: concat(left.evaluate(symbol_table), right.evaluate(symbol_table))
+            return
+        op = ASTNodeAdaptiveBinaryOp.__operators[type(self.__generic)]
+        factory = fast_factory(op, self.__left, self.__right)
+        self.evaluate = factory(self.__left, self.__right, key[0], key[1], self.__guard_failed)
+        # Proměnné čte specializovaná implementace přímo, jejich místa se nevyhodnocují.
+        self.__inlined = tuple(c for c in (self.__left, self.__right) if isinstance(c, AdaptiveSite))
+        for child in self.__inlined:
+            child._subsume()
+
+    def _deoptimize(self) -> None:
+        super()._deoptimize()
+        with _transitions:
+            for child in self.__inlined:
+                child._resume()
+            self.__inlined = ()
+
+    def __guard_failed(self, l, r):
+        self._deoptimize()
+        self._record((type(l), type(r)))
+        return self.__op(l, r)
+
+
+class AdaptiveRewriter:
+    """
+    Nahradí proměnné a binární operátory ve stromu adaptivními místy
+
+    Adaptivní místa se vyhodnocují nad tabulkou symbolů, přepisuje se proto
+    jen kód nejvyšší úrovně včetně argumentů volání. Těla funkcí zůstávají
+    beze změny: vykonává je Functions.Function, která je překládá do closures
+    nad rámcem volání s lokálními proměnnými na pevných místech.
+
+    Původní strom zůstává nezměněn, vzniká strom nový.
+    """
+
+    def __init__(self, instrumentation: Instrumentation = None, threshold: int = WARMUP_THRESHOLD):
+        self.__instrumentation = instrumentation
+        self.__threshold = threshold
+
+    def rewrite(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, ASTNodeProg):
+            prog = ASTNodeProg()
+            for e in node.get_expressions():
+                statement = self.rewrite(e)
+                statement.set_position(*e.get_position())
+                prog.add_expression(statement)
+            prog.set_steps(node.get_steps())
+            return prog
+        if isinstance(node, ASTNodeIdent):
+            return ASTNodeAdaptiveIdent(node.get_name(), self.__instrumentation, self.__threshold)
+        if isinstance(node, ASTNodeOpAssign):
+            return ASTNodeOpAssign(node.get_left_child(), self.rewrite(node.get_right_child()))
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return type(node)(self.rewrite(node.get_left_child()), self.rewrite(node.get_right_child()))
+        if ASTNodeAdaptiveBinaryOp.is_supported(node):
+            generic = type(node)(self.rewrite(node.get_left_child()), self.rewrite(node.get_right_child()))
+            return ASTNodeAdaptiveBinaryOp(generic, self.__instrumentation, self.__threshold)
+        if isinstance(node, ASTNodeOpNot):
+            return ASTNodeOpNot(self.rewrite(node.get_child()))
+        if isinstance(node, ASTNodeCondStatement):
+            root = ASTNodeCondStatement(self.rewrite(node.get_condition()), self.rewrite(node.get_then()))
+            if node.get_else() is not None:
+                root.set_else(self.rewrite(node.get_else()))
+            return root
+        if isinstance(node, ASTNodeTernStatement):
+            return ASTNodeTernStatement(self.rewrite(node.get_condition()),
+                                        self.rewrite(node.get_then()),
+                                        self.rewrite(node.get_else()))
+        if isinstance(node, ASTNodeWhileLoop):
+            return ASTNodeWhileLoop(self.rewrite(node.get_condition()), self.rewrite(node.get_body()))
+        if isinstance(node, ASTNodePrintKeyword):
+            return ASTNodePrintKeyword(self.rewrite(node.get_expression()))
+        if isinstance(node, ASTNodeCall):
+            call = ASTNodeCall(node.get_name(), [self.rewrite(a) for a in node.get_arguments()],
+                               node.get_functions())
+            call.set_position(*node.get_position())
+            return call
+        return node
+
+
+def make_adaptive(ast: ASTNode, instrumentation: Instrumentation = None,
+                  threshold: int = WARMUP_THRESHOLD) -> ASTNode:
+    """
+    Vrátí kopii programu, jejíž proměnné a operátory se za běhu samy specializují.
+
+    :param ast: Kořen syntaktického stromu.
+    :param instrumentation: Kam se mají registrovat čítače jednotlivých míst.
+    :param threshold: Počet vyhodnocení před pokusem o specializaci.
+    :return: Adaptivní syntaktický strom.
+    """
+    return AdaptiveRewriter(instrumentation, threshold).rewrite(ast)
+
+
+def adaptive_tree(ast: ASTNode) -> tuple:
+    """
+    Vrátí (a případně vytvoří) adaptivní strom programu.
+
+    :return: Dvojice (adaptivní strom, čítače jeho míst).
+    """
+    if ast not in _trees:
+        instrumentation = Instrumentation()
+        _trees[ast] = (make_adaptive(ast, instrumentation), instrumentation)
+    return _trees[ast]
+
+
+def compile_adaptive(ast: ASTNode, budgeted: bool = False):
+    """
+    Vrátí funkci, která program vykoná adaptivním stromem. Běhy bez limitů i
+    s limity sdílí výrazy jednoho stromu (a tedy i jejich specializace), běh
+    s limity jen vyhodnocuje kopii bloků a cyklů z BudgetedTree.make_budgeted.
+
+    :param ast: Kořen syntaktického stromu.
+    :param budgeted: Zda má program dodržovat limity běhu.
+    :return: Funkce přijímající tabulku symbolů, která program spustí.
+    """
+    return compile_tree(adaptive_tree(ast)[0], budgeted)
+
+
+def get_instrumentation(ast: ASTNode) -> Instrumentation:
+    """
+    :return: Čítače míst adaptivního stromu programu.
+    """
+    return adaptive_tree(ast)[1]
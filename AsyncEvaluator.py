@@ -0,0 +1,432 @@
+import asyncio
+import inspect
+import sys
+from typing import Callable, Optional
+
+from AST import *
+from Budget import Budget
+from Compiler import ClosureCompiler
+from Errors import GJKError, GJKRuntimeError
+from Functions import MAX_CALL_DEPTH, FrameCompiler, Function, resolve
+from SymbolTable import SymbolTable
+
+"""Výchozí počet iterací cyklu, po kterých běh dobrovolně předá řízení smyčce událostí."""
+YIELD_INTERVAL = 1000
+
+"""Požadavek těla funkce na výpis řádku (viz AsyncFrameCompiler)."""
+_WRITE = object()
+
+"""Požadavek těla funkce na čtení řádku (viz AsyncFrameCompiler)."""
+_READ = object()
+
+
+class AsyncSymbolTable(SymbolTable):
+    """
+    Tabulka symbolů běhu v režimu asyncio
+
+    Vstup a výstup běhu se čtou a zapisují asynchronně, takže čekání na ně
+    neblokuje vlákno, ale jen pozastaví daný běh. Jedna smyčka událostí tak
+    může obsluhovat mnoho souběžných běhů.
+    """
+
+    def __init__(self, values: dict = None, input_provider: Callable = None,
+                 output_sink=None, budget: Budget = None):
+        """
+        Konstruktor
+
+        :param values: Počáteční hodnoty proměnných.
+        :param input_provider: Funkce, která dostane výzvu a vrátí řádek vstupu
+        (nebo awaitable, jehož výsledkem je řádek). Pokud není zadána, čte se ze
+        standardního vstupu v samostatném vlákně.
+        :param output_sink: Objekt s metodou write(), kam se zapisuje výstup.
+        Pokud write() vrací awaitable nebo má objekt metodu drain() (například
+        asyncio.StreamWriter), běh na ně počká.
+        :param budget: Limity běhu. Pokud nejsou zadány, běh není nijak omezen.
+        """
+        super().__init__(values, input_provider, output_sink, budget)
+
+    async def read_line_async(self, prompt: str) -> str:
+        provider = self.get_input_provider()
+        if provider is None:
+            return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+
+        line = provider(prompt)
+        if inspect.isawaitable(line):
+            line = await line
+        return line
+
+    async def write_line_async(self, text: str) -> None:
+        budget = self.get_budget()
+        if budget is not None:
+            budget.charge_output(len(text) + 1)
+
+        sink = self.get_output_sink() or sys.stdout
+        result = sink.write(text + "\n")
+        if inspect.isawaitable(result):
+            await result
+        drain = getattr(sink, "drain", None)
+        if drain is not None:
+            await drain()
+        else:
+            # I zápis, na který není třeba čekat, je místem přepnutí běhu.
+            await asyncio.sleep(0)
+
+
+class AsyncCompiler:
+    """
+    Překladač syntaktického stromu do closures pro běh v režimu asyncio
+
+    Asynchronní (a tedy dražší) jsou jen uzly, které mohou běh pozastavit:
+    čtení, výpis, cykly a uzly, které některý z nich obsahují. Všechny ostatní
+    podstromy se přeloží běžným ClosureCompiler a vykonávají se synchronně.
+
+    Cykly předají řízení smyčce událostí po každých yield_interval iteracích,
+    aby dlouho běžící program nezdržoval ostatní běhy. Volání funkce je také
+    asynchronní, protože tělo funkce může číst a vypisovat (viz run_function).
+    """
+
+    def __init__(self, budgeted: bool = False, yield_interval: int = YIELD_INTERVAL):
+        """
+        Konstruktor
+
+        :param budgeted: Zda má přeložený program započítávat kroky do limitů běhu.
+        :param yield_interval: Počet iterací cyklu mezi předáním řízení.
+        """
+        if yield_interval < 1:
+            raise ValueError("yield_interval must be positive")
+        self.__budgeted = budgeted
+        self.__yield_interval = yield_interval
+        self.__sync = ClosureCompiler(budgeted)
+        self.__suspending = {}
+
+    def compile(self, node: ASTNode):
+        """
+        Přeloží zadaný uzel na korutinovou funkci přijímající tabulku symbolů.
+        """
+        if self.is_suspending(node) is False:
+            closure = self.__sync.compile(node)
+
+            async def sync(st):
+                return closure(st)
+            return sync
+
+        if isinstance(node, ASTNodeProg):
+            return self.compile_prog(node)
+        if isinstance(node, ASTNodeOpAssign):
+            return self.compile_assign(node)
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return self.compile_logical_operator(node)
+        if isinstance(node, ASTNodeBinaryOp):
+            return self.compile_binary_operator(node)
+        if isinstance(node, ASTNodeUnaryOp):
+            return self.compile_unary_operator(node)
+        if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            return self.compile_if_statement(node)
+        if isinstance(node, ASTNodeWhileLoop):
+            return self.compile_while(node)
+        if isinstance(node, ASTNodePrintKeyword):
+            return self.compile_print_keyword(node)
+        if isinstance(node, ASTNodeReadKeyword):
+            return self.compile_read_keyword(node)
+        if isinstance(node, ASTNodeCall):
+            return self.compile_call(node)
+        raise TypeError("Node {:s} cannot be evaluated asynchronously".format(type(node).__name__))
+
+    def compile_prog(self, node: ASTNodeProg):
+        return self.compile_statements(node, self.__budgeted)
+
+    def compile_statements(self, node: ASTNodeProg, charge: bool = False):
+        """
+        Přeloží příkazy bloku; do limitů běhu je započítá jen při zadaném charge.
+        """
+        statements = tuple((self.__compile_maybe_async(e), self.is_suspending(e), e.get_position())
+                           for e in node.get_expressions())
+        steps = node.get_steps() if charge else 0
+
+        async def prog(st):
+            if steps:
+                st.get_budget().charge(steps)
+            for e, suspending, position in statements:
+                try:
+                    if suspending:
+                        await e(st)
+                    else:
+                        e(st)
+                except GJKError:
+                    raise
+                except Exception as ex:
+                    raise GJKRuntimeError.from_exception(ex, position) from ex
+        return prog
+
+    def compile_assign(self, node: ASTNodeOpAssign):
+        name = node.get_left_child().get_name()
+        right = self.compile(node.get_right_child())
+
+        async def assign(st):
+            st[name] = await right(st)
+        return assign
+
+    def compile_logical_operator(self, node: ASTNodeBinaryOp):
+        left = self.compile(node.get_left_child())
+        right = self.compile(node.get_right_child())
+        is_and = isinstance(node, ASTNodeOpAnd)
+
+        async def logical(st):
+            value = await left(st)
+            if bool(value) is not is_and:
+                return value
+            return await right(st)
+        return logical
+
+    def compile_binary_operator(self, node: ASTNodeBinaryOp):
+        left = self.compile(node.get_left_child())
+        right = self.compile(node.get_right_child())
+        op = node.get_op()
+
+        async def binary(st):
+            return op(await left(st), await right(st))
+        return binary
+
+    def compile_unary_operator(self, node: ASTNodeUnaryOp):
+        child = self.compile(node.get_child())
+        op = node.get_op()
+
+        async def unary(st):
+            return op(await child(st))
+        return unary
+
+    def compile_if_statement(self, node: ASTNode):
+        condition = self.__compile_maybe_async(node.get_condition())
+        condition_suspends = self.is_suspending(node.get_condition())
+        then = self.compile(node.get_then())
+        otherwise = self.compile(node.get_else()) if node.get_else() is not None else None
+
+        async def if_statement(st):
+            if (await condition(st) if condition_suspends else condition(st)) is True:
+                await then(st)
+            elif otherwise is not None:
+                await otherwise(st)
+        return if_statement
+
+    def compile_while(self, node: ASTNodeWhileLoop):
+        condition = self.__compile_maybe_async(node.get_condition())
+        condition_suspends = self.is_suspending(node.get_condition())
+        body_suspends = self.is_suspending(node.get_body())
+        if body_suspends:
+            body = self.compile_statements(node.get_body())
+        else:
+            body = self.__sync.compile_statements(node.get_body())
+        # Příkazy těla se započítají jedním voláním spolu s iterací.
+        steps = 1 + node.get_body().get_steps() if self.__budgeted else 0
+        interval = self.__yield_interval
+
+        async def while_loop(st):
+            countdown = interval
+            while (await condition(st) if condition_suspends else condition(st)) is True:
+                if steps:
+                    st.get_budget().charge(steps)
+                if body_suspends:
+                    await body(st)
+                else:
+                    body(st)
+                countdown -= 1
+                if countdown == 0:
+                    countdown = interval
+                    await asyncio.sleep(0)
+        return while_loop
+
+    def compile_print_keyword(self, node: ASTNodePrintKeyword):
+        expr = self.__compile_maybe_async(node.get_expression())
+        expr_suspends = self.is_suspending(node.get_expression())
+
+        async def print_keyword(st):
+            value = await expr(st) if expr_suspends else expr(st)
+            await st.write_line_async(str(value))
+        return print_keyword
+
+    def compile_read_keyword(self, node: ASTNodeReadKeyword):
+        name = node.get_expression().get_name()
+        convert = ASTNodeReadKeyword.convert
+
+        async def read(st):
+            st[name] = convert(await st.read_line_async("> "))
+        return read
+
+    def compile_call(self, node: ASTNodeCall):
+        arguments = tuple(self.__compile_maybe_async(a) for a in node.get_arguments())
+        suspends = tuple(self.is_suspending(a) for a in node.get_arguments())
+        budgeted = self.__budgeted
+        interval = self.__yield_interval
+        callee = None
+
+        async def call(st):
+            nonlocal callee
+            if callee is None:
+                callee = resolve(node, budgeted, asynchronous=True)
+            values = [(await a(st)) if suspending else a(st) for a, suspending in zip(arguments, suspends)]
+            return await run_function(callee, values, st, interval)
+        return call
+
+    def is_suspending(self, node: ASTNode) -> bool:
+        """
+        Zjistí, zda může vyhodnocení uzlu pozastavit běh (obsahuje čtení,
+        výpis, cyklus nebo volání funkce).
+        """
+        if node in self.__suspending:
+            return self.__suspending[node]
+
+        if isinstance(node, (ASTNodeReadKeyword, ASTNodePrintKeyword, ASTNodeWhileLoop, ASTNodeCall)):
+            result = True
+        elif isinstance(node, ASTNodeProg):
+            result = any([self.is_suspending(e) for e in node.get_expressions()])
+        elif isinstance(node, ASTNodeBinaryOp):
+            result = any([self.is_suspending(node.get_left_child()), self.is_suspending(node.get_right_child())])
+        elif isinstance(node, ASTNodeUnaryOp):
+            result = self.is_suspending(node.get_child())
+        elif isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            branches = [node.get_condition(), node.get_then(), node.get_else()]
+            result = any([self.is_suspending(b) for b in branches if b is not None])
+        else:
+            result = False
+        self.__suspending[node] = result
+        return result
+
+    def __compile_maybe_async(self, node: ASTNode):
+        """
+        Přeloží uzel na korutinovou funkci, pokud může běh pozastavit, jinak
+        na obyčejnou closure.
+        """
+        if self.is_suspending(node):
+            return self.compile(node)
+        return self.__sync.compile(node)
+
+
+class AsyncFrameCompiler(FrameCompiler):
+    """
+    Překladač těla funkce pro běh v režimu asyncio
+
+    Výpis a čtení v těle funkce se přeloží na generátory, které místo
+    synchronního zápisu nebo čtení předají (yield) požadavek smyčce v
+    run_function. Ta počká na asynchronní vstup nebo výstup běhu a pokračuje
+    tělem funkce.
+    """
+
+    def compile(self, node: ASTNode):
+        if isinstance(node, ASTNodeReadKeyword):
+            return self.generate_read_keyword(node)
+        return super().compile(node)
+
+    def generate_print_keyword(self, node: ASTNodePrintKeyword):
+        expr = self.compile(node.get_expression())
+        expr_suspends = self.is_suspending(node.get_expression())
+
+        def print_keyword(f):
+            value = (yield from expr(f)) if expr_suspends else expr(f)
+            yield _WRITE, str(value)
+        return print_keyword
+
+    def generate_read_keyword(self, node: ASTNodeReadKeyword):
+        slot = self.get_slot(node.get_expression().get_name())
+        convert = ASTNodeReadKeyword.convert
+
+        def read(f):
+            f[slot] = convert((yield _READ, "> "))
+        return read
+
+    def resolve_call(self, node: ASTNodeCall) -> Function:
+        return resolve(node, self.get_budgeted(), asynchronous=True)
+
+    def is_suspending(self, node: ASTNode) -> bool:
+        if isinstance(node, (ASTNodePrintKeyword, ASTNodeReadKeyword)):
+            return True
+        return super().is_suspending(node)
+
+
+async def run_function(function: Function, arguments: list, symbol_table: AsyncSymbolTable,
+                       yield_interval: int = YIELD_INTERVAL):
+    """
+    Vykoná volání funkce i všechna vnořená volání v režimu asyncio.
+
+    Funguje jako Functions.run, navíc obsluhuje požadavky těla funkce na
+    vstup a výstup. Chyba vstupu nebo výstupu se předá zpět do těla funkce,
+    aby nesla pozici příkazu. Po každých yield_interval voláních předá
+    řízení smyčce událostí.
+
+    :return: Návratová hodnota funkce.
+    """
+    generator, frame = function.start(symbol_table, arguments)
+    stack = []
+    value = None
+    error = None
+    countdown = yield_interval
+    while True:
+        try:
+            if error is None:
+                request = generator.send(value)
+            else:
+                request, error = generator.throw(error), None
+        except StopIteration as stop:
+            function.finish(frame)
+            value = False if stop.value is None else stop.value[0]
+            if not stack:
+                return value
+            generator, function, frame = stack.pop()
+            continue
+
+        kind = request[0]
+        if kind is _WRITE or kind is _READ:
+            value = None
+            try:
+                if kind is _WRITE:
+                    await symbol_table.write_line_async(request[1])
+                else:
+                    value = await symbol_table.read_line_async(request[1])
+            except Exception as ex:
+                error = ex
+            continue
+
+        if len(stack) >= MAX_CALL_DEPTH:
+            raise GJKRuntimeError("Maximum call depth {:d} exceeded".format(MAX_CALL_DEPTH))
+        stack.append((generator, function, frame))
+        function, arguments = request
+        generator, frame = function.start(symbol_table, arguments)
+        value = None
+        countdown -= 1
+        if countdown == 0:
+            countdown = yield_interval
+            await asyncio.sleep(0)
+
+
+def compile_async(ast: ASTNode, budgeted: bool = False, yield_interval: int = YIELD_INTERVAL):
+    """
+    Přeloží celý program na jedinou korutinovou funkci.
+
+    :param ast: Kořen syntaktického stromu.
+    :param budgeted: Zda má program započítávat kroky do limitů běhu.
+    :param yield_interval: Počet iterací cyklu mezi předáním řízení smyčce událostí.
+    :return: Korutinová funkce, jejíž zavolání s AsyncSymbolTable program spustí.
+    """
+    return AsyncCompiler(budgeted, yield_interval).compile(ast)
+
+
+def async_input_provider(source) -> Optional[Callable]:
+    """
+    Převede zadaný vstup na funkci, která vrací jednotlivé řádky.
+
+    Kromě funkcí a posloupností řádků přijímá i asynchronní iterátory (například
+    asyncio.StreamReader); řádky v bytes se dekódují jako UTF-8.
+    """
+    if source is None or callable(source) or hasattr(source, "__aiter__") is False:
+        return source
+
+    lines = source.__aiter__()
+
+    async def provider(prompt: str) -> str:
+        try:
+            line = await lines.__anext__()
+        except StopAsyncIteration:
+            raise EOFError("No more input") from None
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        return line.rstrip("\n")
+    return provider
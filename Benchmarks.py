@@ -0,0 +1,523 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+from AST import *
+from Adaptive import make_adaptive
+from Compiler import compile_program
+from ForkServer import run_script
+from InputStream import InputStream
+from Instrumentation import Instrumentation
+import Rope
+import Serializer
+from Interpreter import Interpreter
+from LexicalAnalysis import Tokenizer
+from Transpiler import compile_python
+
+
+class CountingNode(ASTNode):
+    """
+    Pomocný uzel, který počítá, kolikrát byl vyhodnocen
+
+    Obaluje libovolný jiný uzel a slouží k tomu, abychom v benchmarcích
+    viděli, kolik práce interpret skutečně provedl.
+    """
+
+    def __init__(self, inner: ASTNode):
+        super().__init__()
+        self.__inner = inner
+        self.count = 0
+
+    def evaluate(self, symbol_table: dict):
+        self.count += 1
+        return self.__inner.evaluate(symbol_table)
+
+
+def expensive_expression(depth: int) -> ASTNode:
+    """
+    Vytvoří drahý výraz tvaru (((x + 1) + 1) + ...) > 0 o zadané hloubce.
+    """
+    node = ASTNodeIdent("x")
+    for _ in range(depth):
+        node = ASTNodeOpSum(node, ASTNodeNumConst(1))
+    return ASTNodeOpGrThan(node, ASTNodeNumConst(0))
+
+
+def bench_short_circuit(repeat: int = 2000, depth: int = 200) -> None:
+    """
+    Měří podmínky typu "stráž" (ready ? drahý_výraz, done | drahý_výraz), u
+    kterých o výsledku rozhoduje levý operand a pravý se díky zkrácenému
+    vyhodnocení vůbec nepočítá.
+    """
+    cases = [
+        ("ready ? expensive", ASTNodeOpAnd, False),
+        ("done | expensive", ASTNodeOpOr, True),
+    ]
+    for label, op, guard in cases:
+        expensive = CountingNode(expensive_expression(depth))
+        node = op(ASTNodeIdent("guard"), expensive)
+        symbol_table = {"guard": guard, "x": 0}
+
+        skipped = timeit.timeit(lambda: node.evaluate(symbol_table), number=repeat)
+        skipped_count = expensive.count
+
+        symbol_table["guard"] = not guard
+        expensive.count = 0
+        taken = timeit.timeit(lambda: node.evaluate(symbol_table), number=repeat)
+
+        print("{:s}: guard decides {:.4f} s ({:d} RHS evaluations), "
+              "RHS needed {:.4f} s ({:d} RHS evaluations)"
+              .format(label, skipped, skipped_count, taken, expensive.count))
+
+
+def arithmetic_program(statements: int) -> ASTNodeProg:
+    """
+    Vytvoří program složený z přiřazení a podmínek nad celými čísly.
+    """
+    prog = ASTNodeProg()
+    prog.add_expression(ASTNodeOpAssign(ASTNodeIdent("a"), ASTNodeNumConst(0)))
+    for i in range(statements):
+        prog.add_expression(ASTNodeOpAssign(
+            ASTNodeIdent("a"),
+            ASTNodeOpSum(ASTNodeIdent("a"), ASTNodeOpMul(ASTNodeNumConst(i), ASTNodeNumConst(2)))))
+        then = ASTNodeProg()
+        then.add_expression(ASTNodeOpAssign(ASTNodeIdent("b"), ASTNodeIdent("a")))
+        otherwise = ASTNodeProg()
+        otherwise.add_expression(ASTNodeOpAssign(ASTNodeIdent("b"), ASTNodeNumConst(0)))
+        cond = ASTNodeCondStatement(ASTNodeOpGrThan(ASTNodeIdent("a"), ASTNodeNumConst(i)), then)
+        cond.set_else(otherwise)
+        prog.add_expression(cond)
+    return prog
+
+
+def bench_backends(repeat: int = 200, statements: int = 200) -> None:
+    """
+    Porovnává vyhodnocování stromu s během programu přeloženého do closures
+    a do zdrojového kódu Pythonu.
+    """
+    prog = arithmetic_program(statements)
+    compiled = compile_program(prog)
+    transpiled = compile_python(prog)
+
+    tree = timeit.timeit(lambda: prog.evaluate({}), number=repeat)
+    closures = timeit.timeit(lambda: compiled({}), number=repeat)
+    python = timeit.timeit(lambda: transpiled({}), number=repeat)
+    print("backends: tree-walker {:.4f} s, closures {:.4f} s ({:.2f}x), transpiled {:.4f} s ({:.2f}x)"
+          .format(tree, closures, tree / closures, python, tree / python))
+
+
+def bench_adaptive(repeat: int = 200, statements: int = 200) -> None:
+    """
+    Porovnává obecné vyhodnocování stromu s adaptivně specializovaným stromem.
+    """
+    prog = arithmetic_program(statements)
+    instrumentation = Instrumentation()
+    adaptive = make_adaptive(prog, instrumentation)
+
+    tree = min(timeit.repeat(lambda: prog.evaluate({}), number=repeat, repeat=5))
+    specialized = min(timeit.repeat(lambda: adaptive.evaluate({}), number=repeat, repeat=5))
+    print("adaptive: tree-walker {:.4f} s, adaptive {:.4f} s ({:.2f}x), {!r}"
+          .format(tree, specialized, tree / specialized, instrumentation.summary()))
+
+
+def bench_budget(iterations: int = 100000, repeat: int = 20) -> None:
+    """
+    Měří režii limitů běhu na cyklu s krátkým tělem pro všechny způsoby vykonávání.
+
+    Běhy bez limitů limity nehledají vůbec (strom i adaptivní strom vyhodnocují
+    uzly bez limitů, překlady mají vlastní variantu bez započítávání). Při
+    posledním měření stály limity strom zhruba +3 až +12 %, closures +13 až
+    +18 %, Python +5 až +22 % a adaptivní strom +17 až +29 %; rozptyl je dán
+    hlavně rušením od okolí. Zbytek režie tvoří započítání iterace a bloku v
+    podmínce, které strom i closures dělají voláním Budget.charge, aby limit
+    kroků zůstal přesný.
+    """
+    source = """
+        i = 0;
+        s = 0;
+        while (i < {:d}) {{
+            s = s + i * 2;
+            if (s > 1000) then {{ s = s - 1000; }};
+            i = i + 1;
+        }};
+    """.format(iterations)
+    for backend in Interpreter.BACKENDS:
+        program = Interpreter(backend).compile(source)
+        free, limited = float("inf"), float("inf")
+        # Běhy se střídají, aby oba způsoby postihlo stejné rušení od okolí.
+        for _ in range(repeat):
+            free = min(free, timeit.timeit(lambda: program.run(), number=1))
+            limited = min(limited, timeit.timeit(lambda: program.run(max_steps=10 ** 9, max_time=3600), number=1))
+        print("budget ({:s}): unlimited {:.4f} s, limited {:.4f} s ({:+.1f} %)"
+              .format(backend, free, limited, (limited / free - 1) * 100))
+
+
+def bench_async(sessions: int = 10000) -> None:
+    """
+    Měří souběžný běh mnoha interaktivních programů v jedné smyčce událostí.
+
+    Každý běh třikrát čte vstup, který přichází se zpožděním (jako ze sítě),
+    mezi čteními počítá a průběžně vypisuje.
+    """
+    source = """
+        read a;
+        read b;
+        i = 0;
+        s = 0;
+        while (i < a) {
+            s = s + b;
+            i = i + 1;
+        };
+        print s;
+        read c;
+        print s + c;
+    """
+    program = Interpreter().compile(source)
+
+    async def session(index: int) -> str:
+        lines = iter([str(50 + index % 50), str(index), "1"])
+
+        async def provider(prompt: str) -> str:
+            await asyncio.sleep(0.001)
+            return next(lines)
+        output = io.StringIO()
+        await program.run_async(input=provider, output=output, yield_interval=16)
+        return output.getvalue()
+
+    async def run_all() -> list:
+        return await asyncio.gather(*[session(i) for i in range(sessions)])
+
+    start = time.perf_counter()
+    outputs = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+    assert all(out.count("\n") == 2 for out in outputs)
+    print("async: {:d} concurrent sessions in {:.4f} s ({:.0f} sessions/s)"
+          .format(sessions, elapsed, sessions / elapsed))
+
+
+"""Cílová doba startu interpretu (načtení modulů a překlad krátkého skriptu) v sekundách."""
+STARTUP_BUDGET = 0.05
+
+
+def bench_startup(repeat: int = 20) -> None:
+    """
+    Měří dobu startu krátkého skriptu v novém procesu a přes fork server.
+    """
+    def spawn(code: str) -> float:
+        return min(timeit.repeat(lambda: subprocess.run([sys.executable, "-c", code], check=True),
+                                 number=1, repeat=repeat))
+
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "script.gjk")
+        with open(script, "w") as file:
+            file.write("a = 1; b = a + 2; c = b * 3;")
+        python = spawn("pass")
+        imports = spawn("import Interpreter")
+        cold = spawn("from Interpreter import Interpreter; Interpreter().compile_file({!r}).run()".format(script))
+
+        socket_path = os.path.join(directory, "server.sock")
+        server = subprocess.Popen([sys.executable, "ForkServer.py", "serve", socket_path])
+        try:
+            while os.path.exists(socket_path) is False:
+                time.sleep(0.01)
+            warm = min(timeit.repeat(lambda: run_script(script, socket_path), number=1, repeat=repeat))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print("startup: python {:.4f} s, imports +{:.4f} s, script +{:.4f} s (budget {:.4f} s, {:s}), "
+          "fork server {:.4f} s"
+          .format(python, imports - python, cold - python, STARTUP_BUDGET,
+                  "ok" if cold - python <= STARTUP_BUDGET else "exceeded", warm))
+
+
+def bench_optimizer(iterations: int = 50000) -> None:
+    """
+    Měří cyklus s invariantními a opakovanými výrazy bez optimalizace a s ní.
+    """
+    source = """
+        limit = {:d};
+        scale = 3;
+        offset = 7;
+        i = 0;
+        s = 0;
+        while (i < limit * 2) {{
+            s = s + scale * offset + i;
+            t = s - scale * offset;
+            i = i + 1;
+        }};
+    """.format(iterations // 2)
+    for backend in Interpreter.BACKENDS:
+        plain = Interpreter(backend).compile(source)
+        optimized = Interpreter(backend, optimize=True).compile(source)
+        assert plain.run() == optimized.run()
+        before = min(timeit.repeat(lambda: plain.run(), number=1, repeat=5))
+        after = min(timeit.repeat(lambda: optimized.run(), number=1, repeat=5))
+        print("optimizer ({:s}): plain {:.4f} s, optimized {:.4f} s ({:.2f}x)"
+              .format(backend, before, after, before / after))
+
+
+def bench_rope(appends: int = 10 ** 6, plain_appends: int = 10 ** 5) -> None:
+    """
+    Měří hromadění řetězce v cyklu (s = s + x) se spojováním přes Rope a s
+    obyčejným spojováním řetězců, které je kvadratické. Obyčejné spojování
+    se kvůli délce běhu měří jen na menším počtu připojení.
+    """
+    source = "i = 0; while (i < n) { s = s + x; i = i + 1; }; print s == s;"
+    threshold = Rope.ROPE_THRESHOLD
+    for backend in ("tree", "closures"):
+        program = Interpreter(backend).compile(source)
+
+        def run(n: int) -> float:
+            start = time.perf_counter()
+            program.run({"n": n, "s": "", "x": "ab"}, output=io.StringIO())
+            return time.perf_counter() - start
+
+        rope = run(appends)
+        small = run(plain_appends)
+        Rope.ROPE_THRESHOLD = float("inf")
+        try:
+            plain = run(plain_appends)
+        finally:
+            Rope.ROPE_THRESHOLD = threshold
+        print("rope ({:s}): {:d} appends {:.4f} s; {:d} appends {:.4f} s with rope, {:.4f} s without ({:.1f}x)"
+              .format(backend, appends, rope, plain_appends, small, plain, plain / small))
+
+
+def bench_batch(records: int = 100000) -> None:
+    """
+    Měří rozhodovací skript nad dávkou záznamů: po sloupcích (NumPy) a
+    každý záznam zvlášť.
+    """
+    source = """
+        read age;
+        read income;
+        read debt;
+        score = income / 1000 - debt / 500;
+        if (age < 18) then { print 0; } else {
+            if (score > 40) then { print 2; } else { print 1; };
+        };
+        [ debt > income ]? print 9 : print 3;
+    """
+    program = Interpreter().compile(source)
+    data = [[str(18 + i % 60), str(20000 + (i * 7919) % 80000), str((i * 104729) % 50000)]
+            for i in range(records)]
+
+    start = time.perf_counter()
+    batch = program.run_batch(data)
+    vectorized = time.perf_counter() - start
+
+    sample = data[:records // 10]
+    start = time.perf_counter()
+    for i, record in enumerate(sample):
+        output = io.StringIO()
+        program.run(input=record, output=output)
+        assert output.getvalue() == batch.get_outputs()[i]
+    single = (time.perf_counter() - start) * records / len(sample)
+    print("batch: {:d} records vectorized {:.4f} s ({:d} fallbacks), one by one {:.4f} s ({:.1f}x)"
+          .format(records, vectorized, batch.get_fallbacks(), single, single / vectorized))
+
+
+def bench_memo(iterations: int = 100000) -> None:
+    """
+    Měří cyklus, ve kterém se počítá dlouhý výraz nad proměnnými, které se
+    mění jen občas: strom bez memoizace a strom s cache výsledků podvýrazů.
+    """
+    source = """
+        i = 0;
+        j = 0;
+        s = 0;
+        while (i < {:d}) {{
+            t = a * b * a - b * a * a + b * b * a - a * b * b + a * a * a;
+            s = s + t;
+            j = j + 1;
+            if (j > 99) then {{ a = a + 1; j = 0; }};
+            i = i + 1;
+        }};
+        print s;
+    """.format(iterations)
+    plain = Interpreter("tree").compile(source)
+    memoized = Interpreter("tree", memoize=64).compile(source)
+
+    def run(program) -> float:
+        start = time.perf_counter()
+        program.run({"a": 3, "b": 7}, output=io.StringIO())
+        return time.perf_counter() - start
+
+    tree = run(plain)
+    memo = run(memoized)
+    print("memo: tree-walker {:.4f} s, memoized {:.4f} s ({:.2f}x), {!r}"
+          .format(tree, memo, tree / memo, memoized.get_cache().summary()))
+
+
+def bench_serialize(nodes: int = 10 ** 6) -> None:
+    """
+    Měří zápis a načtení programu s hlubokým výrazem o zadaném počtu uzlů
+    do souboru v obou formátech.
+    """
+    expression = ASTNodeNumConst(0)
+    for _ in range(nodes // 2):
+        expression = ASTNodeOpSum(expression, ASTNodeIdent("x"))
+    prog = ASTNodeProg()
+    prog.add_expression(ASTNodePrintKeyword(expression))
+
+    for format in Serializer.FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ast." + format)
+            start = time.perf_counter()
+            with open(path, "w") as file:
+                count = Serializer.dump(prog, file, format)
+            dumped = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with open(path) as file:
+                Serializer.load(file, format)
+            loaded = time.perf_counter() - start
+            print("serialize ({:s}): {:d} nodes, dump {:.4f} s, load {:.4f} s, {:.1f} MB"
+                  .format(format, count, dumped, loaded, os.path.getsize(path) / 2 ** 20))
+
+
+def bench_string_literal(size: int = 2 ** 20) -> None:
+    """
+    Měří lexikální analýzu programu s řetězcovými literály o velikosti
+    megabajtu: bez escape sekvencí a s escape sekvencí na každém řádku.
+    """
+    plain = "x" * size
+    line = "y" * 62 + "\\n"
+    escaped = line * (size // len(line))
+    for name, literal in (("plain", plain), ("escaped", escaped)):
+        source = 's = "{:s}"; print s;'.format(literal)
+        start = time.perf_counter()
+        tokens = 0
+        tokenizer = Tokenizer(InputStream(source))
+        while not tokenizer.is_eof():
+            tokenizer.next()
+            tokens += 1
+        elapsed = time.perf_counter() - start
+        print("string_literal ({:s}): {:.1f} MB literal, {:d} tokens in {:.4f} s ({:.0f} MB/s)"
+              .format(name, len(literal) / 2 ** 20, tokens, elapsed, len(literal) / 2 ** 20 / elapsed))
+
+
+def bench_numeric_literal(digits: int = 10 ** 5, literals: int = 10 ** 5) -> None:
+    """
+    Měří lexikální analýzu celočíselného literálu se zadaným počtem číslic a
+    programu s mnoha krátkými literály všech druhů.
+    """
+    def tokenize(source: str) -> float:
+        start = time.perf_counter()
+        tokenizer = Tokenizer(InputStream(source))
+        while not tokenizer.is_eof():
+            tokenizer.next()
+        return time.perf_counter() - start
+
+    big = tokenize("x = {:s};".format("7" * digits))
+    forms = ("12345", "1_000_000", "0xdead_beef", "3.25", "6.02e23")
+    many = tokenize(" ".join("x = {:s};".format(forms[i % len(forms)]) for i in range(literals)))
+    print("numeric_literal: {:d} digits {:.4f} s, {:d} literals {:.4f} s"
+          .format(digits, big, literals, many))
+
+
+def bench_functions(n: int = 22, depth: int = 50000) -> None:
+    """
+    Měří rekurzivní výpočet Fibonacciho čísla (mnoho krátkých volání) a
+    hlubokou rekurzi, která by zásobník Pythonu přetekla, na všech backendech.
+    """
+    source = """
+        function fib(n) {{
+            if (n < 2) then {{ return n; }};
+            return fib(n - 1) + fib(n - 2);
+        }};
+        function depth(n) {{
+            if (n == 0) then {{ return 0; }};
+            return 1 + depth(n - 1);
+        }};
+        print fib({:d});
+        print depth({:d});
+    """.format(n, depth)
+    for backend in ("tree", "closures", "python"):
+        program = Interpreter(backend).compile(source)
+        output = io.StringIO()
+        start = time.perf_counter()
+        program.run(output=output)
+        elapsed = time.perf_counter() - start
+        print("functions: {:s} {:.4f} s, {!r}".format(backend, elapsed, output.getvalue().split()))
+
+
+def bench_tracing(iterations: int = 100000) -> None:
+    """
+    Porovnává běh bez traceru, s tracerem bez odběratelů (má stát stejně
+    jako běh bez něj) a se sběrem pokrytí.
+    """
+    from Tracing import Tracer, Coverage
+
+    source = """
+        i = 0;
+        s = 0;
+        while (i < {:d}) {{
+            if (i > 10) then {{ s = s + i; }} else {{ s = s - 1; }};
+            i = i + 1;
+        }};
+        print s;
+    """.format(iterations)
+    program = Interpreter("closures").compile(source, "<bench>")
+    idle = Tracer()
+    traced = Tracer()
+    coverage = Coverage(program.get_ast(), "<bench>")
+    coverage.subscribe(traced)
+    for label, tracer in (("no tracer", None), ("idle tracer", idle), ("coverage", traced)):
+        output = io.StringIO()
+        start = time.perf_counter()
+        program.run(output=output, tracer=tracer)
+        print("tracing: {:s} {:.4f} s".format(label, time.perf_counter() - start))
+    print(coverage.report(), end="")
+
+
+def bench_parallel(loops: int = 4, iterations: int = 300000, workers: int = 4) -> None:
+    """
+    Měří program z několika nezávislých výpočetních cyklů vykonaný sériově a
+    souběžně v pracovních procesech. Zrychlení závisí na počtu jader.
+    """
+    source = "".join("""
+        s{0:s} = 0;
+        i{0:s} = 0;
+        while (i{0:s} < {1:d}) {{ s{0:s} = s{0:s} + i{0:s}; i{0:s} = i{0:s} + 1; }};
+    """.format(chr(ord("a") + k), iterations) for k in range(loops))
+    source += "print " + " + ".join("s" + chr(ord("a") + k) for k in range(loops)) + ";"
+    for label, count in (("serial", 0), ("{:d} workers".format(workers), workers)):
+        program = Interpreter("closures", workers=count).compile(source)
+        program.run(output=io.StringIO())
+        output = io.StringIO()
+        start = time.perf_counter()
+        program.run(output=output)
+        print("parallel: {:s} {:.4f} s, {!r}".format(label, time.perf_counter() - start, output.getvalue().split()))
+
+
+BENCHMARKS = {
+    "short_circuit": bench_short_circuit,
+    "backends": bench_backends,
+    "adaptive": bench_adaptive,
+    "budget": bench_budget,
+    "async": bench_async,
+    "startup": bench_startup,
+    "optimizer": bench_optimizer,
+    "rope": bench_rope,
+    "batch": bench_batch,
+    "memo": bench_memo,
+    "serialize": bench_serialize,
+    "string_literal": bench_string_literal,
+    "numeric_literal": bench_numeric_literal,
+    "functions": bench_functions,
+    "tracing": bench_tracing,
+    "parallel": bench_parallel,
+}
+
+
+if __name__ == "__main__":
+    # Bez argumentů spustíme všechny benchmarky, jinak jen ty vyjmenované.
+    for name in sys.argv[1:] or BENCHMARKS.keys():
+        BENCHMARKS[name]()
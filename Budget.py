@@ -0,0 +1,89 @@
+import time
+from typing import Optional
+
+from Errors import BudgetExceededError
+
+
+class Budget:
+    """
+    Limity jednoho běhu programu
+
+    Vyhodnocovač za každý vykonaný blok příkazů (a každou iteraci cyklu)
+    odečte počet kroků z průběžného čítače. Teprve když čítač dojde, porovná
+    se celkový počet kroků s limitem a zkontroluje se čas, takže se hodiny
+    nečtou při každém kroku. Velikost výstupu se kontroluje při každém zápisu.
+    """
+
+    """Počet kroků mezi dvěma kontrolami času."""
+    CHECK_INTERVAL = 1024
+
+    def __init__(self, max_steps: Optional[int] = None, max_time: Optional[float] = None,
+                 max_output: Optional[int] = None, check_interval: int = CHECK_INTERVAL):
+        """
+        Konstruktor
+
+        Měření času začíná vytvořením objektu.
+
+        :param max_steps: Maximální počet vykonaných příkazů a iterací cyklů.
+        :param max_time: Maximální doba běhu v sekundách.
+        :param max_output: Maximální počet znaků zapsaných na výstup.
+        :param check_interval: Počet kroků mezi dvěma kontrolami času.
+        """
+        self.__max_steps = max_steps
+        self.__max_output = max_output
+        self.__check_interval = check_interval
+        self.__deadline = time.monotonic() + max_time if max_time is not None else None
+        self.__executed = 0
+        self.__output = 0
+        self.__window = 0
+        self.__countdown = 0
+        self.__refill()
+
+    def get_steps(self) -> int:
+        """
+        :return: Počet dosud vykonaných kroků.
+        """
+        return self.__executed + self.__window - self.__countdown
+
+    def get_output_size(self) -> int:
+        """
+        :return: Počet dosud zapsaných znaků.
+        """
+        return self.__output
+
+    def charge(self, steps: int) -> None:
+        """
+        Započítá vykonané kroky.
+
+        :param steps: Počet kroků.
+        :raises BudgetExceededError: Pokud byl překročen limit kroků nebo času.
+        """
+        self.__countdown -= steps
+        if self.__countdown <= 0:
+            self.__refill()
+
+    def charge_output(self, size: int) -> None:
+        """
+        Započítá znaky zapsané na výstup.
+
+        :param size: Počet znaků.
+        :raises BudgetExceededError: Pokud byl překročen limit výstupu.
+        """
+        self.__output += size
+        if self.__max_output is not None and self.__output > self.__max_output:
+            raise BudgetExceededError("Output limit of {:d} characters exceeded".format(self.__max_output),
+                                      "output")
+
+    def __refill(self) -> None:
+        self.__executed += self.__window - self.__countdown
+
+        if self.__max_steps is not None and self.__executed > self.__max_steps:
+            raise BudgetExceededError("Step limit of {:d} exceeded".format(self.__max_steps), "steps")
+        if self.__deadline is not None and time.monotonic() > self.__deadline:
+            raise BudgetExceededError("Time limit exceeded", "time")
+
+        # Okno nesmí přesáhnout zbývající počet kroků, aby byl limit kroků přesný.
+        self.__window = self.__check_interval
+        if self.__max_steps is not None:
+            self.__window = min(self.__window, self.__max_steps - self.__executed + 1)
+        self.__countdown = self.__window
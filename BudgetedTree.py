@@ -0,0 +1,100 @@
+from AST import *
+
+
+class ASTNodeBudgetedProg(ASTNodeProg):
+    """
+    Blok, který své příkazy započítává do limitů běhu
+
+    Vyhodnocuje se jen s tabulkou symbolů, která limity má (viz compile_tree).
+    """
+
+    def __init__(self, steps: int):
+        """
+        Konstruktor
+
+        :param steps: Počet kroků bloku (viz ASTNodeProg.get_steps).
+        """
+        super().__init__()
+        self.set_steps(steps)
+
+    def set_steps(self, steps: int) -> None:
+        super().set_steps(steps)
+        self.__steps = steps
+
+    def evaluate(self, symbol_table: dict):
+        # Kroky se započítávají za celý blok najednou.
+        symbol_table.get_budget().charge(self.__steps)
+        self.evaluate_statements(symbol_table)
+
+
+class ASTNodeBudgetedWhileLoop(ASTNodeWhileLoop):
+    """
+    Cyklus, který své iterace započítává do limitů běhu
+
+    Každá iterace je krok navíc k příkazům těla, aby byl omezen i cyklus s
+    prázdným tělem. Vše se započítá jedním voláním.
+    """
+
+    def evaluate(self, symbol_table: dict):
+        charge = symbol_table.get_budget().charge
+        condition, body = self.get_condition(), self.get_body()
+        steps = 1 + body.get_steps()
+        while condition.evaluate(symbol_table) is True:
+            charge(steps)
+            body.evaluate_statements(symbol_table)
+
+
+class BudgetRewriter:
+    """
+    Nahradí bloky a cykly programu uzly, které se započítávají do limitů běhu
+
+    Výrazy bloky neobsahují, sdílí je proto původní i nový strom (i se
+    specializacemi adaptivních uzlů). Původní strom zůstává nezměněn.
+    """
+
+    def rewrite(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, ASTNodeProg):
+            prog = ASTNodeBudgetedProg(node.get_steps())
+            for e in node.get_expressions():
+                statement = self.rewrite(e)
+                if statement is not e:
+                    statement.set_position(*e.get_position())
+                prog.add_expression(statement)
+            return prog
+        if isinstance(node, ASTNodeCondStatement):
+            root = ASTNodeCondStatement(node.get_condition(), self.rewrite(node.get_then()))
+            if node.get_else() is not None:
+                root.set_else(self.rewrite(node.get_else()))
+            return root
+        if isinstance(node, ASTNodeTernStatement):
+            return ASTNodeTernStatement(node.get_condition(), self.rewrite(node.get_then()),
+                                        self.rewrite(node.get_else()))
+        if isinstance(node, ASTNodeWhileLoop):
+            return ASTNodeBudgetedWhileLoop(node.get_condition(), self.rewrite(node.get_body()))
+        return node
+
+
+def make_budgeted(ast: ASTNode) -> ASTNode:
+    """
+    Vrátí kopii programu, která dodržuje limity běhu.
+
+    :param ast: Kořen syntaktického stromu.
+    :return: Syntaktický strom s limity.
+    """
+    return BudgetRewriter().rewrite(ast)
+
+
+def compile_tree(ast: ASTNode, budgeted: bool = False):
+    """
+    Vrátí funkci, která program vykoná vyhodnocováním stromu.
+
+    Běh bez limitů vyhodnocuje přímo původní strom, jehož uzly limity vůbec
+    nehledají. Běh s limity vyhodnocuje jeho kopii z make_budgeted.
+
+    :param ast: Kořen syntaktického stromu.
+    :param budgeted: Zda má program dodržovat limity běhu.
+    :return: Funkce přijímající tabulku symbolů, která program spustí.
+    """
+    if budgeted:
+        return make_budgeted(ast).evaluate
+    return ast.evaluate
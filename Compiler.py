@@ -0,0 +1,305 @@
+from typing import Callable
+
+from AST import *
+from Errors import CompileError, GJKError, GJKRuntimeError, ParseError
+from Rope import concat
+from SymbolTable import read_line, write_line
+
+"""Typ přeloženého uzlu: funkce, která dostane tabulku symbolů a vrátí výsledek uzlu."""
+Closure = Callable[[dict], object]
+
+
+class ClosureCompiler:
+    """
+    Překladač syntaktického stromu do vnořených Python closures
+
+    Strom se projde jen jednou a každý uzel se nahradí specializovanou funkcí,
+    která má své potomky už navázané a operátor vložený přímo ve svém těle.
+    Spuštění programu pak znamená pouze zavolat kořenovou funkci, čímž odpadá
+    virtuální volání metody evaluate() a čtení atributů uzlů za běhu.
+
+    Chování přeloženého programu je totožné s vyhodnocením stromu. Pokud má
+    program dodržovat limity běhu (Budget), musí být přeložen s parametrem
+    budgeted, jinak se kroky nepočítají vůbec.
+    """
+
+    """Pomocná konstanta s binárními operátory a továrnami na jim odpovídající closures."""
+    __binary = {
+        ASTNodeOpSub: lambda l, r: lambda st: l(st) - r(st),
+        ASTNodeOpMul: lambda l, r: lambda st: l(st) * r(st),
+        ASTNodeOpDiv: lambda l, r: lambda st: l(st) / r(st),
+        ASTNodeOpAnd: lambda l, r: lambda st: l(st) and r(st),
+        ASTNodeOpOr: lambda l, r: lambda st: l(st) or r(st),
+        ASTNodeOpGrThan: lambda l, r: lambda st: l(st) > r(st),
+        ASTNodeOpGrOrEqual: lambda l, r: lambda st: l(st) >= r(st),
+        ASTNodeOpEqual: lambda l, r: lambda st: l(st) == r(st),
+        ASTNodeOpNotEq: lambda l, r: lambda st: l(st) != r(st),
+        ASTNodeOpLess: lambda l, r: lambda st: l(st) < r(st),
+        ASTNodeOpLesOrEqual: lambda l, r: lambda st: l(st) <= r(st)
+    }
+
+    """Uzly, jejichž výsledkem je vždy pravdivostní hodnota (pokud jsou jimi i jejich operandy)."""
+    __comparisons = (ASTNodeOpGrThan, ASTNodeOpGrOrEqual, ASTNodeOpEqual,
+                     ASTNodeOpNotEq, ASTNodeOpLess, ASTNodeOpLesOrEqual)
+
+    def __init__(self, budgeted: bool = False):
+        """
+        Konstruktor
+
+        :param budgeted: Zda má přeložený program započítávat kroky do limitů
+        běhu. Takový program musí dostat tabulku symbolů s nastaveným Budget.
+        """
+        self.__budgeted = budgeted
+        self.__position = (None, None)
+
+    def get_budgeted(self) -> bool:
+        return self.__budgeted
+
+    def compile(self, node: ASTNode) -> Closure:
+        """
+        Přeloží zadaný uzel (a rekurzivně celý jeho podstrom) na closure.
+
+        :param node: Uzel syntaktického stromu.
+        :return: Funkce přijímající tabulku symbolů.
+        """
+        if isinstance(node, ASTNodeProg):
+            return self.compile_prog(node)
+        if isinstance(node, ASTNodeConstant):
+            return self.compile_constant(node)
+        if isinstance(node, ASTNodeIdent):
+            return self.compile_identifier(node)
+        if isinstance(node, ASTNodeOpAssign):
+            return self.compile_assign(node)
+        if isinstance(node, ASTNodeOpSum):
+            return self.compile_sum(node)
+        if type(node) in ClosureCompiler.__binary:
+            return self.compile_binary_operator(node)
+        if isinstance(node, ASTNodeOpNot):
+            return self.compile_not(node)
+        if isinstance(node, ASTNodeCondStatement):
+            return self.compile_if_statement(node)
+        if isinstance(node, ASTNodeTernStatement):
+            return self.compile_ternary(node)
+        if isinstance(node, ASTNodeWhileLoop):
+            return self.compile_while(node)
+        if isinstance(node, ASTNodePrintKeyword):
+            return self.compile_print_keyword(node)
+        if isinstance(node, ASTNodeReadKeyword):
+            return self.compile_read_keyword(node)
+        if isinstance(node, ASTNodeCall):
+            return self.compile_call(node)
+
+        if isinstance(node, ASTNode) is False:
+            # Strom z jiného zdroje než z parseru (např. načtený nebo upravený
+            # ručně) může obsahovat neplatného potomka; ohlásí se u příkazu.
+            raise CompileError([ParseError("Cannot compile node {:s}".format(type(node).__name__),
+                                           *self.__position)])
+
+        # Uzly, které překladač nezná, se vyhodnocují původním způsobem.
+        return node.evaluate
+
+    def compile_prog(self, node: ASTNodeProg) -> Closure:
+        if self.__budgeted is False or node.get_steps() == 0:
+            return self.compile_statements(node)
+
+        statements = tuple((self.compile_statement(e), e.get_position()) for e in node.get_expressions())
+        steps = node.get_steps()
+        get_budget = self.get_budget
+
+        def prog_budgeted(st):
+            # Kroky se započítávají za celý blok najednou.
+            get_budget(st).charge(steps)
+            for e, position in statements:
+                try:
+                    e(st)
+                except GJKError:
+                    raise
+                except Exception as ex:
+                    raise GJKRuntimeError.from_exception(ex, position) from ex
+        return prog_budgeted
+
+    def compile_statements(self, node: ASTNodeProg) -> Closure:
+        """
+        Přeloží příkazy bloku, aniž by je započítával do limitů běhu.
+        """
+        statements = tuple((self.compile_statement(e), e.get_position()) for e in node.get_expressions())
+
+        if len(statements) == 0:
+            return lambda st: None
+
+        def prog(st):
+            for e, position in statements:
+                try:
+                    e(st)
+                except GJKError:
+                    raise
+                except Exception as ex:
+                    raise GJKRuntimeError.from_exception(ex, position) from ex
+        return prog
+
+    def compile_statement(self, node: ASTNode) -> Closure:
+        """
+        Přeloží jeden příkaz bloku. Potomci mohou příkaz obalit (viz Tracing).
+        """
+        position = self.__position
+        if isinstance(node, ASTNode):
+            self.__position = node.get_position()
+        try:
+            return self.compile(node)
+        finally:
+            self.__position = position
+
+    def compile_constant(self, node: ASTNodeConstant) -> Closure:
+        value = node.get_value()
+        return lambda st: value
+
+    def compile_identifier(self, node: ASTNodeIdent) -> Closure:
+        name = node.get_name()
+        return lambda st: st[name]
+
+    def compile_assign(self, node: ASTNodeOpAssign) -> Closure:
+        name = node.get_left_child().get_name()
+        right = self.compile(node.get_right_child())
+
+        def assign(st):
+            st[name] = right(st)
+        return assign
+
+    def compile_binary_operator(self, node: ASTNodeBinaryOp) -> Closure:
+        factory = ClosureCompiler.__binary[type(node)]
+        return factory(self.compile(node.get_left_child()), self.compile(node.get_right_child()))
+
+    def compile_sum(self, node: ASTNodeOpSum) -> Closure:
+        left = self.compile(node.get_left_child())
+        right = self.compile(node.get_right_child())
+
+        def sum_operator(st):
+            l = left(st)
+            # Sčítání celých čísel nemusí řešit spojování řetězců (Rope).
+            if type(l) is int:
+                return l + right(st)
+            return concat(l, right(st))
+        return sum_operator
+
+    def compile_not(self, node: ASTNodeOpNot) -> Closure:
+        child = self.compile(node.get_child())
+        return lambda st: not child(st)
+
+    def compile_if_statement(self, node: ASTNodeCondStatement) -> Closure:
+        condition = self.compile_condition(node.get_condition())
+        then = self.compile(node.get_then())
+
+        if node.get_else() is None:
+            def if_then(st):
+                if condition(st):
+                    then(st)
+            return if_then
+
+        otherwise = self.compile(node.get_else())
+
+        def if_then_else(st):
+            if condition(st):
+                then(st)
+            else:
+                otherwise(st)
+        return if_then_else
+
+    def compile_ternary(self, node: ASTNodeTernStatement) -> Closure:
+        condition = self.compile_condition(node.get_condition())
+        then = self.compile(node.get_then())
+        otherwise = self.compile(node.get_else())
+
+        def ternary(st):
+            if condition(st):
+                then(st)
+            else:
+                otherwise(st)
+        return ternary
+
+    def compile_while(self, node: ASTNodeWhileLoop) -> Closure:
+        condition = self.compile_condition(node.get_condition())
+        body = self.compile_statements(node.get_body())
+
+        if self.__budgeted:
+            # Iterace i příkazy těla se započítají jedním voláním.
+            steps = 1 + node.get_body().get_steps()
+            get_budget = self.get_budget
+
+            def while_loop_budgeted(st):
+                charge = get_budget(st).charge
+                while condition(st):
+                    charge(steps)
+                    body(st)
+            return while_loop_budgeted
+
+        def while_loop(st):
+            while condition(st):
+                body(st)
+        return while_loop
+
+    def compile_condition(self, node: ASTNode) -> Closure:
+        """
+        Přeloží podmínku tak, aby ji šlo přímo použít v příkazu if.
+
+        Strom větví jen v případě, že je podmínka rovna True. Pokud víme, že
+        podmínka vždy vrací pravdivostní hodnotu, stačí běžný test pravdivosti,
+        jinak musíme porovnání s True zachovat.
+        """
+        condition = self.compile(node)
+        if ClosureCompiler.is_boolean(node):
+            return condition
+        return lambda st: condition(st) is True
+
+    def compile_print_keyword(self, node: ASTNodePrintKeyword) -> Closure:
+        expr = self.compile(node.get_expression())
+        return lambda st: write_line(st, str(expr(st)))
+
+    def compile_read_keyword(self, node: ASTNodeReadKeyword) -> Closure:
+        name = node.get_expression().get_name()
+        convert = ASTNodeReadKeyword.convert
+
+        def read(st):
+            st[name] = convert(read_line(st, "> "))
+        return read
+
+    def compile_call(self, node: ASTNodeCall) -> Closure:
+        from Functions import call_site
+
+        site = call_site(node, self.__budgeted)
+        arguments = tuple(self.compile(a) for a in node.get_arguments())
+        return lambda st: site([a(st) for a in arguments], st)
+
+    @staticmethod
+    def get_budget(st):
+        """
+        Vrátí limity běhu z argumentu přeložené closure. Překladače, jejichž
+        closures nedostávají přímo tabulku symbolů, metodu překryjí.
+        """
+        return st.get_budget()
+
+    @staticmethod
+    def is_boolean(node: ASTNode) -> bool:
+        """
+        Zjistí, zda vyhodnocení uzlu vždy skončí pravdivostní hodnotou.
+        """
+        if isinstance(node, ASTNodeBoolConst):
+            return True
+        if isinstance(node, ASTNodeOpNot):
+            return True
+        if isinstance(node, ClosureCompiler.__comparisons):
+            return True
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return ClosureCompiler.is_boolean(node.get_left_child()) \
+                and ClosureCompiler.is_boolean(node.get_right_child())
+        return False
+
+
+def compile_program(ast: ASTNode, budgeted: bool = False) -> Closure:
+    """
+    Přeloží celý program na jedinou closure.
+
+    :param ast: Kořen syntaktického stromu.
+    :param budgeted: Zda má program započítávat kroky do limitů běhu.
+    :return: Funkce, jejíž zavolání s tabulkou symbolů program spustí.
+    """
+    return ClosureCompiler(budgeted).compile(ast)
@@ -0,0 +1,116 @@
+from typing import Optional
+
+
+class GJKError(Exception):
+    """
+    Společný předek všech chyb, ke kterým dojde při zpracování programu
+
+    Chyba nese popis a (pokud je známa) pozici ve zdrojovém kódu, na které
+    k ní došlo. Na rozdíl od ukončení procesu ji může aplikace, do které je
+    interpret vložen, zachytit a pokračovat dál.
+    """
+
+    def __init__(self, msg: str, line: Optional[int] = None, column: Optional[int] = None):
+        """
+        Konstruktor
+
+        :param msg: Detailní chybová zpráva zobrazená uživateli.
+        :param line: Číslo řádku, na kterém k chybě došlo.
+        :param column: Číslo sloupce, na kterém k chybě došlo.
+        """
+        super().__init__(msg)
+        self.__msg = msg
+        self.__line = line
+        self.__column = column
+
+    def get_message(self) -> str:
+        return self.__msg
+
+    def get_line(self) -> Optional[int]:
+        return self.__line
+
+    def get_column(self) -> Optional[int]:
+        return self.__column
+
+    def __str__(self):
+        if self.__line is None:
+            return "Error occurred: {:s}".format(self.__msg)
+        return "Error occurred [l:{:d}, c:{:d}]: {:s}".format(self.__line, self.__column, self.__msg)
+
+
+class LexError(GJKError):
+    """
+    Chyba lexikální analýzy (neznámý znak, neukončený řetězec, ...)
+    """
+    pass
+
+
+class ParseError(GJKError):
+    """
+    Chyba syntaktické analýzy (neočekávaný token, neukončený blok, ...)
+    """
+    pass
+
+
+class CompileError(ParseError):
+    """
+    Souhrn všech chyb nalezených během jednoho průchodu zdrojovým kódem
+
+    Pozice odpovídá první nalezené chybě.
+    """
+
+    def __init__(self, errors: list):
+        """
+        Konstruktor
+
+        :param errors: Seznam chyb (LexError, ParseError) v pořadí nalezení.
+        """
+        super().__init__("\n".join(str(e) for e in errors), errors[0].get_line(), errors[0].get_column())
+        self.__errors = list(errors)
+
+    def get_errors(self) -> list:
+        return self.__errors
+
+    def __str__(self):
+        return self.get_message()
+
+
+class GJKRuntimeError(GJKError):
+    """
+    Chyba, ke které došlo při běhu programu (nedefinovaná proměnná, dělení
+    nulou, nekompatibilní typy, ...)
+    """
+
+    @staticmethod
+    def from_exception(e: Exception, position: tuple = (None, None)):
+        """
+        Vytvoří chybu běhu programu z výjimky Pythonu.
+
+        :param e: Původní výjimka.
+        :param position: Dvojice (řádek, sloupec) příkazu, při kterém k chybě došlo.
+        """
+        if isinstance(e, KeyError):
+            msg = "Undefined variable {:s}".format(str(e))
+        else:
+            msg = "{:s}: {:s}".format(type(e).__name__, str(e))
+        return GJKRuntimeError(msg, *position)
+
+
+class BudgetExceededError(GJKRuntimeError):
+    """
+    Běh programu překročil některý z nastavených limitů (počet kroků, čas
+    nebo velikost výstupu)
+    """
+
+    def __init__(self, msg: str, limit: str):
+        """
+        Konstruktor
+
+        :param msg: Detailní chybová zpráva zobrazená uživateli.
+        :param limit: Název překročeného limitu ("steps", "time" nebo "output").
+        """
+        super().__init__(msg)
+        self.__limit = limit
+
+    def get_limit(self) -> str:
+        return self.__limit
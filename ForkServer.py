@@ -0,0 +1,246 @@
+import os
+import socket
+import stat
+import sys
+import tempfile
+
+"""Název socketu serveru v soukromém adresáři uživatele (viz default_socket)."""
+SOCKET_NAME = "gjk.sock"
+
+"""Maximální velikost požadavku klienta (pracovní adresář a cesta ke skriptu)."""
+MAX_REQUEST = 65536
+
+"""Jak dlouho (v sekundách) čeká server na požadavek klienta, kterého odmítá."""
+REFUSE_TIMEOUT = 1.0
+
+
+def private_directory() -> str:
+    """
+    Vrátí adresář, do kterého smí zapisovat jen aktuální uživatel.
+
+    Přednost má $XDG_RUNTIME_DIR. Jinak se v dočasném adresáři systému
+    použije (a případně vytvoří) adresář gjk-<uid> s právy 0700. Adresář,
+    který patří jinému uživateli, je odkazem nebo je přístupný ostatním, se
+    odmítne, protože by v něm socket mohl podvrhnout někdo jiný.
+
+    :raises PermissionError: Pokud adresář není soukromý.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return runtime
+
+    path = os.path.join(tempfile.gettempdir(), "gjk-{:d}".format(os.getuid()))
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(path)
+    if stat.S_ISDIR(info.st_mode) is False or info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError("Directory {:s} is not private to the current user".format(path))
+    return path
+
+
+def default_socket() -> str:
+    """
+    Vrátí výchozí cestu k socketu serveru. Lze ji změnit proměnnou prostředí
+    GJK_SOCKET, jinak leží v soukromém adresáři uživatele (viz private_directory).
+    """
+    return os.environ.get("GJK_SOCKET") or os.path.join(private_directory(), SOCKET_NAME)
+
+
+def remove_stale_socket(path: str) -> None:
+    """
+    Odstraní socket, který na zadané cestě zůstal po ukončeném serveru.
+
+    Odstraní se jen socket, na kterém nikdo nepřijímá spojení. Jiný soubor
+    ani socket běžícího serveru se nemaže.
+
+    :raises FileExistsError: Pokud na cestě je jiný soubor než socket nebo
+    na socketu běží jiný server.
+    """
+    try:
+        info = os.lstat(path)
+    except FileNotFoundError:
+        return
+    if stat.S_ISSOCK(info.st_mode) is False:
+        raise FileExistsError("{:s} exists and is not a socket".format(path))
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except ConnectionRefusedError:
+        os.unlink(path)
+        return
+    finally:
+        probe.close()
+    raise FileExistsError("Another server is listening on {:s}".format(path))
+
+
+class ForkServer:
+    """
+    Rezidentní proces, který má interpret načtený a pro každý skript vytvoří
+    připraveného potomka
+
+    Klient se připojí přes lokální Unix socket a spolu s cestou ke skriptu
+    pošle své deskriptory standardního vstupu, výstupu a chybového výstupu.
+    Server se rozvětví (fork) a potomek, který už má všechny moduly načtené,
+    přesměruje deskriptory klienta na své a skript přeloží a spustí. Start
+    skriptu tak nestojí načítání interpretu, ale jen fork procesu.
+
+    Na konci běhu pošle potomek klientovi návratový kód. Pokud se potomka
+    nepodaří vytvořit, pošle server klientovi návratový kód 1 spolu s
+    popisem chyby a obsluhuje další klienty.
+    """
+
+    def __init__(self, socket_path: str = None, backend: str = "closures"):
+        """
+        Konstruktor
+
+        :param socket_path: Cesta k Unix socketu, na kterém server poslouchá.
+        Pokud není zadána, použije se default_socket().
+        :param backend: Způsob vykonávání skriptů (viz Interpreter.BACKENDS).
+        """
+        self.__socket_path = socket_path or default_socket()
+        self.__backend = backend
+        self.__interpreter = None
+
+    def preload(self) -> None:
+        """
+        Načte interpret a zvolený backend, aby je potomci už měli připravené.
+        """
+        import gc
+        from Interpreter import Interpreter
+
+        self.__interpreter = Interpreter(self.__backend)
+        # Přeložením prázdného programu se načte i backend.
+        self.__interpreter.compile("")
+        # Objekty načtené před forkem už garbage collector neprochází, takže
+        # zůstanou sdílené s potomky a nekopírují se (copy-on-write).
+        gc.freeze()
+
+    def serve_forever(self) -> None:
+        import signal
+
+        self.preload()
+        # Skončené potomky po nás uklidí jádro.
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        # Při ukončení serveru se provede úklid socketu.
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+        remove_stale_socket(self.__socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.__socket_path)
+        server.listen(128)
+        try:
+            while True:
+                connection, _ = server.accept()
+                try:
+                    pid = os.fork()
+                except OSError as e:
+                    # Např. EAGAIN při vyčerpání procesů; server běží dál.
+                    ForkServer.__refuse(connection, "Cannot start worker: {:s}".format(str(e)))
+                    continue
+                if pid == 0:
+                    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                    server.close()
+                    os._exit(self.__work(connection))
+                connection.close()
+        finally:
+            server.close()
+            try:
+                os.unlink(self.__socket_path)
+            except FileNotFoundError:
+                # Socket mezitím odstranil někdo jiný.
+                pass
+
+    @staticmethod
+    def __refuse(connection: socket.socket, msg: str) -> None:
+        """
+        Pošle klientovi návratový kód 1 a popis chyby a spojení uzavře.
+
+        Požadavek klienta se nejprve přečte (a jeho deskriptory zavřou), aby
+        klient při odesílání nenarazil na uzavřené spojení.
+        """
+        try:
+            connection.settimeout(REFUSE_TIMEOUT)
+            _, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST, 3)
+            for fd in fds:
+                os.close(fd)
+            connection.sendall(bytes([1]) + msg.encode("utf-8"))
+        except OSError:
+            pass
+        finally:
+            connection.close()
+
+    def __work(self, connection: socket.socket) -> int:
+        """
+        Vykoná jeden skript v potomkovi serveru.
+
+        :return: Návratový kód skriptu.
+        """
+        from Errors import GJKError
+
+        code = 1
+        try:
+            request, fds, _, _ = socket.recv_fds(connection, MAX_REQUEST, 3)
+            cwd, script = request.decode("utf-8").split("\0", 1)
+            os.chdir(cwd)
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            try:
+                self.__interpreter.compile_file(script).run()
+                code = 0
+            except GJKError as e:
+                print(e, file=sys.stderr)
+        except BaseException as e:
+            print("Worker failed: {!r}".format(e), file=sys.stderr)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            try:
+                connection.sendall(bytes([code]))
+            finally:
+                connection.close()
+        return code
+
+
+def run_script(script: str, socket_path: str = None) -> int:
+    """
+    Nechá běžící server vykonat skript se vstupem a výstupem tohoto procesu.
+
+    :param script: Cesta ke zdrojovému souboru.
+    :param socket_path: Cesta k Unix socketu serveru. Pokud není zadána,
+    použije se default_socket().
+    :return: Návratový kód skriptu.
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path or default_socket())
+        request = "{:s}\0{:s}".format(os.getcwd(), script).encode("utf-8")
+        socket.send_fds(client, [request], [0, 1, 2])
+        # Za návratovým kódem může server poslat popis chyby.
+        response = b""
+        while True:
+            chunk = client.recv(MAX_REQUEST)
+            if not chunk:
+                break
+            response += chunk
+        if len(response) > 1:
+            print(response[1:].decode("utf-8", "replace"), file=sys.stderr)
+        return response[0] if response else 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    # python ForkServer.py serve [socket]      spustí server
+    # python ForkServer.py run skript [socket] vykoná skript na serveru
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        ForkServer(*sys.argv[2:3]).serve_forever()
+    elif len(sys.argv) >= 3 and sys.argv[1] == "run":
+        sys.exit(run_script(*sys.argv[2:4]))
+    else:
+        print("usage: ForkServer.py serve [socket] | run script [socket]", file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,547 @@
+import weakref
+from typing import Callable
+
+from AST import *
+from Compiler import ClosureCompiler, Closure
+from Errors import GJKError, GJKRuntimeError
+from Optimizer import Optimizer
+from SymbolTable import read_line, write_line
+
+"""Maximální hloubka zanoření volání funkcí."""
+MAX_CALL_DEPTH = 100000
+
+"""Maximální počet uvolněných rámců, které si funkce schová pro další volání."""
+POOL_SIZE = 64
+
+"""Pomocná konstanta označující lokální proměnnou, která zatím nemá hodnotu."""
+_UNSET = object()
+
+
+class Function:
+    """
+    Přeložená uživatelská funkce
+
+    Lokální proměnné funkce (parametry a proměnné, do kterých tělo zapisuje)
+    mají místa přidělená už při překladu. Rámec volání je seznam pevné
+    délky: na indexu 0 je tabulka symbolů běhu (globální proměnné, vstup a
+    výstup), za ní parametry a ostatní lokální proměnné. Uvolněné rámce si
+    funkce schovává a použije je pro další volání.
+
+    Tělo funkce je přeloženo na generátor (viz FrameCompiler), takže vnořená
+    volání nezabírají zásobník Pythonu, ale vykonává je smyčka v run().
+    """
+
+    def __init__(self, definition: ASTNodeFunctionDef, budgeted: bool = False, tracer=None,
+                 asynchronous: bool = False):
+        """
+        Konstruktor
+
+        :param definition: Definice funkce.
+        :param budgeted: Zda má tělo funkce započítávat kroky do limitů běhu.
+        :param tracer: Tracer (viz Tracing), kterému má tělo funkce hlásit
+        události. Pokud není zadán, tělo se přeloží bez sledování.
+        :param asynchronous: Zda se funkce volá z běhu v režimu asyncio (viz
+        AsyncEvaluator.AsyncFrameCompiler).
+        """
+        names = local_names(definition)
+        self.__name = definition.get_name()
+        self.__arity = len(definition.get_parameters())
+        self.__blank = [None] + [_UNSET] * len(names)
+        self.__pool = []
+        slots = {name: slot for slot, name in enumerate(names, 1)}
+        if asynchronous:
+            from AsyncEvaluator import AsyncFrameCompiler
+
+            compiler = AsyncFrameCompiler(slots, self.__arity, budgeted)
+        elif tracer is None:
+            compiler = FrameCompiler(slots, self.__arity, budgeted)
+        else:
+            from Tracing import TracingFrameCompiler
+
+            compiler = TracingFrameCompiler(tracer, slots, self.__arity, budgeted)
+        self.__code = compiler.compile_body(definition.get_body())
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_arity(self) -> int:
+        return self.__arity
+
+    def start(self, symbol_table: dict, arguments: list) -> tuple:
+        """
+        Připraví rámec volání a vytvoří generátor, který vykoná tělo funkce.
+
+        :return: Dvojice (generátor, rámec).
+        """
+        try:
+            frame = self.__pool.pop()
+        except IndexError:
+            frame = self.__blank[:]
+        frame[0] = symbol_table
+        frame[1:self.__arity + 1] = arguments
+        return self.__code(frame), frame
+
+    def finish(self, frame: list) -> None:
+        """
+        Vrátí rámec skončeného volání do zásobárny.
+        """
+        if len(self.__pool) < POOL_SIZE:
+            frame[:] = self.__blank
+            self.__pool.append(frame)
+
+
+class FrameCompiler(ClosureCompiler):
+    """
+    Překladač těla funkce, jehož closures dostávají místo tabulky symbolů
+    rámec volání
+
+    Uzly, které obsahují volání funkce nebo příkaz return, se přeloží na
+    generátory. Volání předá (yield) volanou funkci a argumenty smyčce v
+    run() a pokračuje s hodnotou, kterou od ní dostane zpět. Příkazy vrací
+    None, případně n-tici (hodnota,), pokud vykonaly return. Ostatní podstromy
+    se přeloží jako v ClosureCompiler.
+    """
+
+    def __init__(self, slots: dict, arity: int, budgeted: bool = False):
+        """
+        Konstruktor
+
+        :param slots: Místa lokálních proměnných v rámci (jméno -> index).
+        :param arity: Počet parametrů (mají místa 1 až arity).
+        :param budgeted: Zda má tělo započítávat kroky do limitů běhu.
+        """
+        super().__init__(budgeted)
+        self.__slots = slots
+        self.__arity = arity
+        self.__budgeted = budgeted
+        self.__suspending = {}
+
+    def compile_body(self, node: ASTNodeProg):
+        """
+        Přeloží tělo funkce na generátorovou funkci přijímající rámec.
+        """
+        return self.generate_block(node, self.__budgeted)
+
+    def compile(self, node: ASTNode):
+        if self.is_suspending(node) is False:
+            return super().compile(node)
+
+        if isinstance(node, ASTNodeProg):
+            return self.generate_block(node, self.__budgeted)
+        if isinstance(node, ASTNodeCall):
+            return self.generate_call(node)
+        if isinstance(node, ASTNodeOpAssign):
+            return self.generate_assign(node)
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return self.generate_logical_operator(node)
+        if isinstance(node, ASTNodeBinaryOp):
+            return self.generate_binary_operator(node)
+        if isinstance(node, ASTNodeUnaryOp):
+            return self.generate_unary_operator(node)
+        if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            return self.generate_if_statement(node)
+        if isinstance(node, ASTNodeWhileLoop):
+            return self.generate_while(node)
+        if isinstance(node, ASTNodePrintKeyword):
+            return self.generate_print_keyword(node)
+        raise TypeError("Node {:s} cannot be used in a function".format(type(node).__name__))
+
+    #####################################################
+    # FRAME ACCESS                                      #
+    #####################################################
+    def compile_identifier(self, node: ASTNodeIdent) -> Closure:
+        name = node.get_name()
+        slot = self.__slots.get(name)
+        if slot is None:
+            return lambda f: f[0][name]
+        if slot <= self.__arity:
+            return lambda f: f[slot]
+
+        def local(f):
+            value = f[slot]
+            if value is _UNSET:
+                raise KeyError(name)
+            return value
+        return local
+
+    def compile_assign(self, node: ASTNodeOpAssign) -> Closure:
+        slot = self.__slots[node.get_left_child().get_name()]
+        right = self.compile(node.get_right_child())
+
+        def assign(f):
+            f[slot] = right(f)
+        return assign
+
+    def compile_print_keyword(self, node: ASTNodePrintKeyword) -> Closure:
+        expr = self.compile(node.get_expression())
+        return lambda f: write_line(f[0], str(expr(f)))
+
+    def compile_read_keyword(self, node: ASTNodeReadKeyword) -> Closure:
+        slot = self.__slots[node.get_expression().get_name()]
+        convert = ASTNodeReadKeyword.convert
+
+        def read(f):
+            f[slot] = convert(read_line(f[0], "> "))
+        return read
+
+    def get_slot(self, name: str) -> int:
+        """
+        :return: Místo lokální proměnné v rámci.
+        """
+        return self.__slots[name]
+
+    @staticmethod
+    def get_budget(f):
+        return f[0].get_budget()
+
+    def resolve_call(self, node: ASTNodeCall) -> Function:
+        """
+        Najde funkci volanou z těla. Překladače, které funkce překládají
+        jinak, metodu překryjí.
+        """
+        return resolve(node, self.__budgeted)
+
+    #####################################################
+    # GENERATORS                                        #
+    #####################################################
+    def generate_block(self, node: ASTNodeProg, charge: bool = False):
+        """
+        Přeloží příkazy bloku; do limitů běhu je započítá jen při zadaném charge.
+
+        Každý příkaz má druh: 0 obyčejná closure, 1 generátor, 2 return s
+        obyčejnou closure, 3 return s generátorem. Výraz příkazu return se
+        vyhodnotí přímo v bloku.
+        """
+        statements = tuple(self.compile_block_statement(e) + (e.get_position(),) for e in node.get_expressions())
+        steps = node.get_steps() if charge else 0
+        get_budget = self.get_budget
+
+        def block(f):
+            if steps:
+                get_budget(f).charge(steps)
+            for e, kind, position in statements:
+                try:
+                    if kind == 0:
+                        e(f)
+                    elif kind == 1:
+                        result = yield from e(f)
+                        if result is not None:
+                            return result
+                    elif kind == 2:
+                        return e(f),
+                    else:
+                        return (yield from e(f)),
+                except GJKError:
+                    raise
+                except Exception as ex:
+                    raise GJKRuntimeError.from_exception(ex, position) from ex
+        return block
+
+    def compile_block_statement(self, node: ASTNode) -> tuple:
+        """
+        Přeloží jeden příkaz bloku těla funkce.
+
+        :return: Dvojice (closure, druh příkazu), viz generate_block.
+        """
+        if self.is_suspending(node) is False:
+            return self.compile(node), 0
+        if isinstance(node, ASTNodeReturn):
+            expression = node.get_expression()
+            if expression is None:
+                return (lambda f: False), 2
+            return self.compile(expression), 3 if self.is_suspending(expression) else 2
+        if isinstance(node, (ASTNodeProg, ASTNodeCondStatement, ASTNodeTernStatement, ASTNodeWhileLoop,
+                             ASTNodeOpAssign, ASTNodePrintKeyword, ASTNodeReadKeyword)):
+            return self.compile(node), 1
+
+        # Hodnota výrazu použitého jako příkaz se zahodí.
+        expr = self.compile(node)
+
+        def discard(f):
+            yield from expr(f)
+        return discard, 1
+
+    def generate_call(self, node: ASTNodeCall):
+        arguments = tuple(self.compile(a) for a in node.get_arguments())
+        suspends = tuple(self.is_suspending(a) for a in node.get_arguments())
+        resolve_call = self.resolve_call
+        callee = None
+
+        if any(suspends) is False:
+            def call(f):
+                nonlocal callee
+                if callee is None:
+                    callee = resolve_call(node)
+                return (yield callee, [a(f) for a in arguments])
+            return call
+
+        def call_nested(f):
+            nonlocal callee
+            if callee is None:
+                callee = resolve_call(node)
+            values = []
+            for a, suspending in zip(arguments, suspends):
+                values.append((yield from a(f)) if suspending else a(f))
+            return (yield callee, values)
+        return call_nested
+
+    def generate_assign(self, node: ASTNodeOpAssign):
+        slot = self.__slots[node.get_left_child().get_name()]
+        right = self.compile(node.get_right_child())
+
+        def assign(f):
+            f[slot] = yield from right(f)
+        return assign
+
+    def generate_logical_operator(self, node: ASTNodeBinaryOp):
+        left = self.compile(node.get_left_child())
+        right = self.compile(node.get_right_child())
+        left_suspends = self.is_suspending(node.get_left_child())
+        right_suspends = self.is_suspending(node.get_right_child())
+        is_and = isinstance(node, ASTNodeOpAnd)
+
+        def logical(f):
+            value = (yield from left(f)) if left_suspends else left(f)
+            if bool(value) is not is_and:
+                return value
+            return (yield from right(f)) if right_suspends else right(f)
+        return logical
+
+    def generate_binary_operator(self, node: ASTNodeBinaryOp):
+        left = self.compile(node.get_left_child())
+        right = self.compile(node.get_right_child())
+        op = node.get_op()
+
+        if self.is_suspending(node.get_left_child()) is False:
+            def binary_right(f):
+                l = left(f)
+                return op(l, (yield from right(f)))
+            return binary_right
+        if self.is_suspending(node.get_right_child()) is False:
+            def binary_left(f):
+                return op((yield from left(f)), right(f))
+            return binary_left
+
+        def binary(f):
+            return op((yield from left(f)), (yield from right(f)))
+        return binary
+
+    def generate_unary_operator(self, node: ASTNodeUnaryOp):
+        child = self.compile(node.get_child())
+        op = node.get_op()
+
+        def unary(f):
+            return op((yield from child(f)))
+        return unary
+
+    def generate_if_statement(self, node: ASTNode):
+        condition, condition_suspends = self.__condition(node.get_condition())
+        then, then_suspends = self.__branch(node.get_then())
+        otherwise, otherwise_suspends = self.__branch(node.get_else())
+
+        def if_statement(f):
+            if (yield from condition(f)) if condition_suspends else condition(f):
+                if then_suspends:
+                    return (yield from then(f))
+                then(f)
+            elif otherwise_suspends:
+                return (yield from otherwise(f))
+            elif otherwise is not None:
+                otherwise(f)
+        return if_statement
+
+    def generate_while(self, node: ASTNodeWhileLoop):
+        condition, condition_suspends = self.__condition(node.get_condition())
+        body_suspends = self.is_suspending(node.get_body())
+        if body_suspends:
+            body = self.generate_block(node.get_body())
+        else:
+            body = self.compile_statements(node.get_body())
+        # Příkazy těla se započítají jedním voláním spolu s iterací.
+        steps = 1 + node.get_body().get_steps() if self.__budgeted else 0
+        get_budget = self.get_budget
+
+        def while_loop(f):
+            while (yield from condition(f)) if condition_suspends else condition(f):
+                if steps:
+                    get_budget(f).charge(steps)
+                if body_suspends:
+                    result = yield from body(f)
+                    if result is not None:
+                        return result
+                else:
+                    body(f)
+        return while_loop
+
+    def generate_print_keyword(self, node: ASTNodePrintKeyword):
+        expr = self.compile(node.get_expression())
+
+        def print_keyword(f):
+            write_line(f[0], str((yield from expr(f))))
+        return print_keyword
+
+    def __condition(self, node: ASTNode) -> tuple:
+        """
+        :return: Dvojice (podmínka, zda je generátorem). Podmínka má stejnou
+        sémantiku jako ClosureCompiler.compile_condition.
+        """
+        if self.is_suspending(node) is False:
+            return self.compile_condition(node), False
+
+        expr = self.compile(node)
+        if ClosureCompiler.is_boolean(node):
+            return expr, True
+
+        def condition(f):
+            return (yield from expr(f)) is True
+        return condition, True
+
+    def __branch(self, node: ASTNode) -> tuple:
+        """
+        :return: Dvojice (větev, zda je generátorem), případně (None, False).
+        """
+        if node is None:
+            return None, False
+        return self.compile(node), self.is_suspending(node)
+
+    def is_suspending(self, node: ASTNode) -> bool:
+        """
+        Zjistí, zda musí být uzel přeložen na generátor (obsahuje volání
+        funkce nebo příkaz return).
+        """
+        if node in self.__suspending:
+            return self.__suspending[node]
+
+        if isinstance(node, (ASTNodeCall, ASTNodeReturn)):
+            result = True
+        else:
+            result = any([self.is_suspending(child) for child in Optimizer.children(node)])
+        self.__suspending[node] = result
+        return result
+
+
+"""
+Přeložené funkce (zvlášť bez limitů a s limity běhu). Položka zaniká spolu
+s definicí funkce.
+"""
+_functions = {False: weakref.WeakKeyDictionary(), True: weakref.WeakKeyDictionary()}
+
+"""Přeložené funkce hlásící události, zvlášť pro každý Tracer (viz _functions)."""
+_traced_functions = weakref.WeakKeyDictionary()
+
+"""Přeložené funkce pro běh v režimu asyncio (viz _functions)."""
+_async_functions = {False: weakref.WeakKeyDictionary(), True: weakref.WeakKeyDictionary()}
+
+
+def resolve(node: ASTNodeCall, budgeted: bool = False, tracer=None, asynchronous: bool = False) -> Function:
+    """
+    Najde (a případně přeloží) funkci volanou zadaným voláním.
+
+    Funkce volané ze sledovaného běhu (se zadaným tracer) se překládají
+    zvlášť, aby běhy bez sledování nic nestály. Stejně tak funkce volané z
+    běhu v režimu asyncio (se zadaným asynchronous).
+
+    :raises GJKRuntimeError: Pokud funkce neexistuje nebo nesedí počet argumentů.
+    """
+    definition = node.get_function()
+    if definition is None:
+        raise GJKRuntimeError("Undefined function {:s}".format(node.get_name()), *node.get_position())
+
+    if asynchronous:
+        functions = _async_functions[budgeted]
+    elif tracer is None:
+        functions = _functions[budgeted]
+    else:
+        if tracer not in _traced_functions:
+            _traced_functions[tracer] = {False: weakref.WeakKeyDictionary(), True: weakref.WeakKeyDictionary()}
+        functions = _traced_functions[tracer][budgeted]
+    function = functions.get(definition)
+    if function is None:
+        function = functions[definition] = Function(definition, budgeted, tracer, asynchronous)
+    if function.get_arity() != len(node.get_arguments()):
+        raise GJKRuntimeError("Function {:s} expects {:d} arguments, {:d} given".format(
+            node.get_name(), function.get_arity(), len(node.get_arguments())), *node.get_position())
+    return function
+
+
+def run(function: Function, arguments: list, symbol_table: dict):
+    """
+    Vykoná volání funkce i všechna vnořená volání.
+
+    Rozpracovaná volání jsou na explicitním zásobníku, hloubka rekurze
+    programu proto není omezena zásobníkem Pythonu, ale jen MAX_CALL_DEPTH.
+
+    :return: Návratová hodnota funkce.
+    """
+    generator, frame = function.start(symbol_table, arguments)
+    stack = []
+    value = None
+    while True:
+        try:
+            request = generator.send(value)
+        except StopIteration as stop:
+            function.finish(frame)
+            value = False if stop.value is None else stop.value[0]
+            if not stack:
+                return value
+            generator, function, frame = stack.pop()
+            continue
+
+        if len(stack) >= MAX_CALL_DEPTH:
+            raise GJKRuntimeError("Maximum call depth {:d} exceeded".format(MAX_CALL_DEPTH))
+        stack.append((generator, function, frame))
+        function, arguments = request
+        generator, frame = function.start(symbol_table, arguments)
+        value = None
+
+
+def call_site(node: ASTNodeCall, budgeted: bool = False, tracer=None) -> Callable[[list, dict], object]:
+    """
+    Vytvoří místo volání, které volanou funkci najde při prvním volání a
+    dále už ji jen volá.
+
+    :param tracer: Tracer, kterému má volaná funkce hlásit události.
+    :return: Funkce přijímající hodnoty argumentů a tabulku symbolů.
+    """
+    callee = None
+
+    def site(arguments: list, symbol_table: dict):
+        nonlocal callee
+        if callee is None:
+            callee = resolve(node, budgeted, tracer)
+        return run(callee, arguments, symbol_table)
+    return site
+
+
+def local_names(definition: ASTNodeFunctionDef) -> list:
+    """
+    Vrátí lokální proměnné funkce: parametry a poté (abecedně) proměnné, do
+    kterých tělo funkce zapisuje.
+    """
+    parameters = definition.get_parameters()
+    return list(parameters) + sorted(Optimizer.writes(definition.get_body()) - set(parameters))
+
+
+def global_reads(definition: ASTNodeFunctionDef) -> set:
+    """
+    Vrátí globální proměnné, které může funkce přečíst, včetně proměnných
+    čtených funkcemi, které volá.
+    """
+    result = set()
+    seen = set()
+    pending = [definition]
+    while pending:
+        definition = pending.pop()
+        if definition in seen:
+            continue
+        seen.add(definition)
+        local = set(local_names(definition))
+        stack = [definition.get_body()]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ASTNodeIdent) and node.get_name() not in local:
+                result.add(node.get_name())
+            elif isinstance(node, ASTNodeCall) and node.get_function() is not None:
+                pending.append(node.get_function())
+            stack.extend(Optimizer.children(node))
+    return result
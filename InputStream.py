@@ -1,5 +1,4 @@
-import sys
-from pathlib import Path
+from Errors import LexError
 
 
 class InputStream:
@@ -15,7 +14,8 @@ class InputStream:
         """
         Vytvoří instanci vstupního streamu pro zadaný soubor
         """
-        return InputStream(Path(file_name).read_text())
+        with open(file_name) as file:
+            return InputStream(file.read())
 
     def __init__(self, buffer: str):
         """
@@ -41,6 +41,8 @@ class InputStream:
 
         :return: Znak na aktuální pozici ve zdrojovém kódu.
         """
+        if self.__pos >= len(self.__buffer):
+            self.raise_error("Unexpected end of file")
         return self.__buffer[self.__pos]
 
     def next(self) -> str:
@@ -55,7 +57,7 @@ class InputStream:
         char = self.peek()
         self.__pos += 1
 
-        if char == '>' or char == '<' or char == '!' or char == '=':
+        if (char == '>' or char == '<' or char == '!' or char == '=') and self.is_eof() is False:
             nextChar = self.peek()
             if nextChar == '=':
                 char = char + nextChar
@@ -65,10 +67,66 @@ class InputStream:
             self.__line += 1
             self.__col = 0
         else:
-            self.__col += 1
+            self.__col += len(char)
 
         return char
 
+    def find(self, sub: str, start: int = 0, end: int = None) -> int:
+        """
+        Najde podřetězec ve zbytku vstupu, aniž by se v bufferu posunula
+
+        :param sub: Hledaný podřetězec.
+        :param start: Od kolikátého znaku za aktuální pozicí se hledá.
+        :param end: Po kolikátý znak za aktuální pozicí se hledá. Pokud není
+        zadán, hledá se až do konce vstupu.
+        :return: Vzdálenost nalezeného podřetězce od aktuální pozice, nebo -1.
+        """
+        pos = self.__pos
+        found = self.__buffer.find(sub, pos + start, len(self.__buffer) if end is None else pos + end)
+        return found - pos if found >= 0 else -1
+
+    def peek_at(self, offset: int) -> str:
+        """
+        :param offset: Vzdálenost znaku od aktuální pozice.
+        :return: Znak v zadané vzdálenosti, případně prázdný řetězec za koncem vstupu.
+        """
+        return self.__buffer[self.__pos + offset:self.__pos + offset + 1]
+
+    def match(self, pattern) -> str:
+        """
+        Porovná regulární výraz se vstupem od aktuální pozice, aniž by se v
+        bufferu posunula
+
+        :param pattern: Přeložený regulární výraz.
+        :return: Text, který výraz pokryl, případně None.
+        """
+        match = pattern.match(self.__buffer, self.__pos)
+        return match.group() if match is not None else None
+
+    def read(self, length: int = None) -> str:
+        """
+        Vrátí zadaný počet znaků od aktuální pozice jedním řezem bufferu a
+        přesune se za ně
+
+        Na rozdíl od opakovaného volání next() trvá přečtení dlouhého úseku
+        jen tolik, kolik stojí jeho zkopírování.
+
+        :param length: Počet přečtených znaků. Pokud není zadán, přečte se
+        celý zbytek vstupu.
+        :return: Přečtené znaky.
+        """
+        end = len(self.__buffer) if length is None else self.__pos + length
+        text = self.__buffer[self.__pos:end]
+        self.__pos += len(text)
+
+        lines = text.count('\n')
+        if lines:
+            self.__line += lines
+            self.__col = len(text) - text.rfind('\n') - 1
+        else:
+            self.__col += len(text)
+        return text
+
     def is_eof(self) -> bool:
         """
         Testuje, zda se již nacházíme na konci zdrojového souboru
@@ -77,16 +135,37 @@ class InputStream:
         """
         return self.__pos >= len(self.__buffer)
 
+    def get_line(self) -> int:
+        """
+        :return: Číslo řádku aktuálně čteného znaku (číslováno od 1).
+        """
+        return self.__line
+
+    def get_column(self) -> int:
+        """
+        :return: Číslo sloupce aktuálně čteného znaku (číslováno od 1).
+        """
+        return self.__col + 1
+
+    def error(self, msg: str) -> LexError:
+        """
+        Vytvoří výjimku popisující chybu, ke které došlo během lexikální analýzy.
+
+        Součástí výjimky je i pozice aktuálně čteného znaku ve zdrojovém kódu.
+
+        :param msg: Detailní chybová zpráva zobrazená uživateli.
+        :return: Výjimka připravená k vyhození.
+        """
+        return LexError(msg, self.get_line(), self.get_column())
+
     def raise_error(self, msg: str) -> None:
         """
-        Vypíše na chybový výstup detail chyby, ke které došlo během lexikální analýzy.
+        Vyhodí výjimku s detailem chyby, ke které došlo během lexikální analýzy.
 
         Součástí chybové hlášky jsou i detaily toho, ve které části zdrojového kódu se právě
-        nacházíme.
+        nacházíme. Proces interpretu přitom zůstává běžet a chybu může zachytit volající.
 
         :param msg: Detailní chybová zpráva zobrazená uživateli.
-        :return: None
+        :raises LexError: Vždy.
         """
-        print("Error occurred [l:{:d}, c:{:d}]: {:s}".format(self.__line, self.__col, msg),
-              file=sys.stderr)
-        exit()
+        raise self.error(msg)
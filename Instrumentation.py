@@ -0,0 +1,49 @@
+class Instrumentation:
+    """
+    Sběr čítačů z běhu interpretu
+
+    Uzly, které o sobě vedou statistiky (např. adaptivně specializovaná místa
+    programu), se zde zaregistrují a jejich čítače lze kdykoliv přečíst.
+    """
+
+    def __init__(self):
+        """
+        Konstruktor
+        """
+        self.__sites = []
+
+    def register_site(self, site) -> int:
+        """
+        Zaregistruje místo programu, které vede čítače.
+
+        :param site: Objekt s metodou get_counters().
+        :return: Pořadové číslo místa.
+        """
+        self.__sites.append(site)
+        return len(self.__sites) - 1
+
+    def get_sites(self) -> list:
+        """
+        :return: Čítače všech zaregistrovaných míst.
+        """
+        return [site.get_counters() for site in self.__sites]
+
+    def get_specialized_sites(self) -> list:
+        """
+        :return: Čítače míst, která jsou právě specializovaná.
+        """
+        return [counters for counters in self.get_sites() if counters["state"] == "specialized"]
+
+    def summary(self) -> dict:
+        """
+        :return: Souhrnné počty míst (i specializovaných a vložených do
+        nadřazeného místa), specializací a deoptimalizací.
+        """
+        sites = self.get_sites()
+        return {
+            "sites": len(sites),
+            "specialized": sum(1 for c in sites if c["state"] == "specialized"),
+            "subsumed": sum(1 for c in sites if c["state"] == "subsumed"),
+            "specializations": sum(c["specializations"] for c in sites),
+            "deoptimizations": sum(c["deoptimizations"] for c in sites)
+        }
@@ -0,0 +1,361 @@
+import importlib
+import threading
+import weakref
+from typing import Callable, Iterable, TextIO, Union
+
+from AST import ASTNode
+from Budget import Budget
+from InputStream import InputStream
+from LexicalAnalysis import Tokenizer
+from Rope import Rope
+from SymbolTable import SymbolTable
+from SyntacticAnalysis import Parser
+
+
+def lazy(module: str, name: str) -> Callable:
+    """
+    Vrátí funkci, která při prvním zavolání načte zadaný modul a předá volání
+    jeho funkci name.
+
+    Volitelné části interpretu (backendy, asyncio, typová inference) se tak
+    načítají až ve chvíli, kdy je program opravdu použije, a nezdržují start.
+    """
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    return call
+
+
+class Program:
+    """
+    Přeložený program připravený k opakovanému spouštění
+
+    Program vzniká jednou (lexikální a syntaktická analýza a překlad) a poté
+    ho lze spouštět libovolně mnohokrát, i souběžně z více vláken. Každý běh
+    dostane vlastní tabulku symbolů, vlastní vstup a vlastní výstup. Program
+    sám se po vytvoření nemění.
+    """
+
+    def __init__(self, ast: ASTNode, runner: Callable[[dict], object],
+                 budgeted_runner: Callable[[dict], object], name: str, temporaries: Iterable[str] = (),
+                 cache=None, instrumentation=None):
+        """
+        Konstruktor
+
+        :param ast: Kořen syntaktického stromu.
+        :param runner: Přeložený program; funkce přijímající tabulku symbolů.
+        :param budgeted_runner: Přeložený program, který dodržuje limity běhu.
+        :param name: Název programu (obvykle jméno zdrojového souboru).
+        :param temporaries: Dočasné proměnné zavedené optimalizací, které se po
+        skončení běhu z tabulky symbolů odstraní.
+        :param cache: Cache výsledků podvýrazů (MemoCache), pokud program
+        používá memoizaci.
+        :param instrumentation: Čítače adaptivně specializovaných míst
+        (Instrumentation), pokud program běží na backendu "adaptive".
+        """
+        self.__ast = ast
+        self.__runner = runner
+        self.__budgeted_runner = budgeted_runner
+        self.__name = name
+        self.__temporaries = tuple(temporaries)
+        self.__async_runners = {}
+        self.__traced_runners = weakref.WeakKeyDictionary()
+        # Program může běžet ve více vláknech, varianty se ale přeloží jen jednou.
+        self.__runners_lock = threading.Lock()
+        self.__cache = cache
+        self.__instrumentation = instrumentation
+
+    def get_ast(self) -> ASTNode:
+        return self.__ast
+
+    def get_name(self) -> str:
+        return self.__name
+
+    def get_cache(self):
+        """
+        :return: Cache výsledků podvýrazů (MemoCache), případně None, pokud
+        program memoizaci nepoužívá.
+        """
+        return self.__cache
+
+    def get_instrumentation(self):
+        """
+        :return: Čítače adaptivně specializovaných míst (Instrumentation),
+        případně None, pokud program neběží na backendu "adaptive".
+        """
+        return self.__instrumentation
+
+    def run(self, symbol_table: dict = None,
+            input: Union[Callable[[str], str], Iterable[str]] = None,
+            output: TextIO = None, max_steps: int = None, max_time: float = None,
+            max_output: int = None, tracer=None) -> SymbolTable:
+        """
+        Spustí program.
+
+        :param symbol_table: Počáteční hodnoty proměnných. Slovník se nemění,
+        běh pracuje s jeho kopií.
+        :param input: Vstup běhu. Buď funkce, která dostane výzvu a vrátí řádek,
+        nebo posloupnost řádků. Pokud není zadán, čte se ze standardního vstupu.
+        :param output: Objekt s metodou write(), kam se zapisuje výstup běhu.
+        Pokud není zadán, zapisuje se na standardní výstup.
+        :param max_steps: Maximální počet vykonaných příkazů a iterací cyklů.
+        :param max_time: Maximální doba běhu v sekundách.
+        :param max_output: Maximální počet znaků zapsaných na výstup.
+        :param tracer: Tracer (viz Tracing), kterému běh hlásí události. Pokud
+        nemá žádné odběratele, běh probíhá, jako by zadán nebyl.
+        :return: Tabulka symbolů po skončení běhu.
+        :raises BudgetExceededError: Pokud běh překročil některý z limitů.
+        """
+        if max_steps is None and max_time is None and max_output is None:
+            table = SymbolTable(symbol_table, Program.input_provider(input), output)
+            runner = self.__runner
+        else:
+            budget = Budget(max_steps, max_time, max_output)
+            table = SymbolTable(symbol_table, Program.input_provider(input), output, budget)
+            runner = self.__budgeted_runner
+        if tracer is not None and tracer.is_active():
+            runner = self.__traced_runner(tracer, table.get_budget() is not None)
+        runner(table)
+        self.__finish(table)
+        return table
+
+    async def run_async(self, symbol_table: dict = None, input=None, output=None,
+                        max_steps: int = None, max_time: float = None, max_output: int = None,
+                        yield_interval: int = None) -> SymbolTable:
+        """
+        Spustí program v režimu asyncio.
+
+        Běh se pozastaví při každém čtení a výpisu a také po každých
+        yield_interval iteracích cyklu, takže jedna smyčka událostí může
+        obsluhovat mnoho souběžných běhů.
+
+        :param symbol_table: Počáteční hodnoty proměnných. Slovník se nemění,
+        běh pracuje s jeho kopií.
+        :param input: Vstup běhu. Funkce (i korutinová), která dostane výzvu a
+        vrátí řádek, posloupnost řádků nebo asynchronní iterátor řádků.
+        :param output: Objekt s metodou write(), kam se zapisuje výstup běhu.
+        Pokud write() vrací awaitable nebo má objekt metodu drain(), běh na ně počká.
+        :param max_steps: Maximální počet vykonaných příkazů a iterací cyklů.
+        :param max_time: Maximální doba běhu v sekundách.
+        :param max_output: Maximální počet znaků zapsaných na výstup.
+        :param yield_interval: Počet iterací cyklu mezi předáním řízení smyčce
+        událostí. Pokud není zadán, použije se AsyncEvaluator.YIELD_INTERVAL.
+        :return: Tabulka symbolů po skončení běhu.
+        :raises BudgetExceededError: Pokud běh překročil některý z limitů.
+        """
+        from AsyncEvaluator import YIELD_INTERVAL, AsyncSymbolTable, async_input_provider
+
+        provider = Program.input_provider(async_input_provider(input))
+        if max_steps is None and max_time is None and max_output is None:
+            table = AsyncSymbolTable(symbol_table, provider, output)
+        else:
+            table = AsyncSymbolTable(symbol_table, provider, output, Budget(max_steps, max_time, max_output))
+        runner = self.__async_runner(table.get_budget() is not None, yield_interval or YIELD_INTERVAL)
+        await runner(table)
+        self.__finish(table)
+        return table
+
+    def __async_runner(self, budgeted: bool, yield_interval: int):
+        # Asynchronní varianta se překládá až při prvním použití.
+        key = (budgeted, yield_interval)
+        with self.__runners_lock:
+            if key not in self.__async_runners:
+                self.__async_runners[key] = lazy("AsyncEvaluator", "compile_async")(self.__ast, budgeted,
+                                                                                   yield_interval)
+            return self.__async_runners[key]
+
+    def __traced_runner(self, tracer, budgeted: bool):
+        # Sledovaný běh je vždy přeložen do closures, a to až při prvním použití
+        # daného traceru.
+        with self.__runners_lock:
+            if tracer not in self.__traced_runners:
+                self.__traced_runners[tracer] = {}
+            runners = self.__traced_runners[tracer]
+            if budgeted not in runners:
+                runners[budgeted] = lazy("Tracing", "compile_traced")(self.__ast, tracer, budgeted)
+            return runners[budgeted]
+
+    def run_batch(self, records: Iterable[Iterable[str]], symbol_table: dict = None):
+        """
+        Spustí program pro každý záznam dávky.
+
+        Pokud je nainstalován NumPy (volitelná závislost), vyhodnotí se celá
+        dávka najednou po sloupcích (viz Vectorized.VectorEvaluator). Záznamy,
+        u kterých to nejde, a bez NumPy všechny záznamy, se vyhodnotí každý
+        zvlášť.
+
+        :param records: Vstup každého záznamu jako posloupnost řádků.
+        :param symbol_table: Počáteční hodnoty proměnných (stejné pro všechny záznamy).
+        :return: Výstupy a chyby jednotlivých záznamů (BatchResult).
+        """
+        from Vectorized import run_batch
+
+        return run_batch(self, [list(record) for record in records], symbol_table)
+
+    def __finish(self, table: SymbolTable) -> None:
+        """
+        Připraví tabulku symbolů skončeného běhu pro volajícího: odstraní
+        dočasné proměnné a řetězce uložené jako Rope převede na str.
+        """
+        for name in self.__temporaries:
+            table.pop(name, None)
+        for name, value in table.items():
+            if type(value) is Rope:
+                table[name] = value.flatten()
+
+    @staticmethod
+    def input_provider(source) -> Callable[[str], str]:
+        """
+        Převede zadaný vstup na funkci, která vrací jednotlivé řádky.
+        """
+        if source is None or callable(source):
+            return source
+
+        lines = iter(source)
+
+        def provider(prompt: str) -> str:
+            try:
+                return next(lines).rstrip("\n")
+            except StopIteration:
+                raise EOFError("No more input") from None
+        return provider
+
+
+class Interpreter:
+    """
+    Vstupní bod pro vložení interpretu do jiné aplikace
+
+    Interpret překládá zdrojový kód (řetězec nebo soubor) na objekty Program.
+    Ty je pak možné opakovaně spouštět, aniž by se znovu prováděla lexikální
+    a syntaktická analýza.
+    """
+
+    """Dostupné způsoby vykonávání programu."""
+    BACKENDS = {
+        "tree": lazy("BudgetedTree", "compile_tree"),
+        "closures": lazy("Compiler", "compile_program"),
+        "python": lazy("Transpiler", "compile_python"),
+        "adaptive": lazy("Adaptive", "compile_adaptive")
+    }
+
+    def __init__(self, backend: str = "closures", optimize: bool = False, memoize: int = 0, workers: int = 0):
+        """
+        Konstruktor
+
+        :param backend: Způsob vykonávání programu: "tree" (vyhodnocování
+        stromu), "closures" (překlad do closures), "python" (převod do
+        zdrojového kódu Pythonu) nebo "adaptive" (strom, jehož proměnné a
+        operátory se za běhu specializují podle pozorovaných typů).
+        :param optimize: Zda se má na program použít optimalizační průchod
+        (vynesení invariantů z cyklů, eliminace společných podvýrazů a
+        odstranění mrtvých zápisů).
+        :param memoize: Velikost cache výsledků čistých podvýrazů. Výsledek
+        podvýrazu se znovu použije, dokud se nezmění proměnné, které čte, a
+        pokud jsou jejich hodnoty čísla, i v jiném běhu se stejnými hodnotami.
+        Hodnota 0 memoizaci vypíná. Memoizaci podporuje jen backend "tree".
+        :param workers: Počet pracovních procesů, mezi které se rozdělí
+        náročné nezávislé příkazy nejvyšší úrovně (viz Parallel). Hodnota 0
+        souběžné vykonávání vypíná. Běhy s limity se vykonávají vždy sériově.
+        """
+        if backend not in Interpreter.BACKENDS:
+            raise ValueError("Unknown backend '{:s}'".format(backend))
+        if memoize and backend != "tree":
+            raise ValueError("Memoization is only supported by the tree backend")
+        if memoize and workers:
+            raise ValueError("Memoization cannot be combined with parallel evaluation")
+        self.__backend = backend
+        self.__optimize = optimize
+        self.__memoize = memoize
+        self.__workers = workers
+
+    def get_backend(self) -> str:
+        return self.__backend
+
+    def supports_specialization(self) -> bool:
+        """
+        :return: Zda interpret umí specializovat programy na typy proměnných
+        (viz parametr symbol_table metody compile).
+        """
+        return self.__backend in ("tree", "closures") and not self.__memoize
+
+    def compile(self, source: str, name: str = "<string>", symbol_table: dict = None) -> Program:
+        """
+        Přeloží zdrojový kód na program.
+
+        :param source: Zdrojový kód.
+        :param name: Název programu.
+        :param symbol_table: Proměnné, se kterými bude program spouštěn.
+        Specializace na typy je volitelná: strom se specializuje (viz
+        TypeInference) jen tehdy, když jsou proměnné zadány, a to i prázdným
+        slovníkem. Specializaci podporují jen backendy "tree" a "closures" bez
+        memoizace.
+        :return: Přeložený program.
+        :raises ValueError: Pokud jsou proměnné zadány backendu, který
+        specializaci nepodporuje.
+        """
+        if symbol_table is not None and self.supports_specialization() is False:
+            raise ValueError("Type specialization is only supported by the tree and closures backends "
+                             "without memoization")
+        return self.__compile_stream(InputStream(source), name, symbol_table)
+
+    def compile_file(self, file_name: str) -> Program:
+        """
+        Přeloží zdrojový soubor na program.
+
+        :param file_name: Cesta ke zdrojovému souboru.
+        :return: Přeložený program.
+        """
+        return self.__compile_stream(InputStream.from_file(file_name), file_name)
+
+    def snapshot(self, prefix: Union[str, Program], symbol_table: dict = None, max_programs: int = None,
+                 **kwargs) -> "Snapshot":
+        """
+        Vykoná společný úvod programů a zachytí výsledný stav interpretu.
+
+        :param prefix: Úvod jako přeložený program nebo zdrojový kód.
+        :param symbol_table: Počáteční hodnoty proměnných.
+        :param max_programs: Nejvyšší počet přeložených programů v cache
+        snímku. Pokud není zadán, platí Snapshot.MAX_PROGRAMS.
+        :param kwargs: Další parametry metody Program.run (input, output, limity).
+        :return: Snímek, nad kterým lze opakovaně spouštět další programy.
+        """
+        from Snapshot import Snapshot, MAX_PROGRAMS
+
+        if isinstance(prefix, str):
+            prefix = self.compile(prefix, "<prefix>")
+        return Snapshot(self, prefix.run(symbol_table, **kwargs),
+                        MAX_PROGRAMS if max_programs is None else max_programs)
+
+    def __compile_stream(self, stream: InputStream, name: str, symbol_table: dict = None) -> Program:
+        ast = Parser(Tokenizer(stream)).parse()
+        temporaries = ()
+        if self.__optimize:
+            from Optimizer import Optimizer
+
+            optimizer = Optimizer()
+            ast = optimizer.optimize(ast)
+            temporaries = optimizer.get_temporaries()
+        if self.__memoize:
+            # Strom s memoizací se vyhodnocuje jen při běhu, ostatní způsoby
+            # vykonávání (asyncio, dávky) dostanou původní strom. Specializované
+            # uzly memoizace nezná, typy se proto nespecializují.
+            from BudgetedTree import make_budgeted
+            from Memoization import MemoCache, make_memoized
+
+            cache = MemoCache(self.__memoize)
+            memoized = make_memoized(ast, cache)
+            return Program(ast, memoized.evaluate, make_budgeted(memoized).evaluate, name, temporaries, cache)
+        backend = Interpreter.BACKENDS[self.__backend]
+        if symbol_table is not None:
+            # Specializované uzly zná jen strom a překladač TypeInference.TypedCompiler.
+            ast = lazy("TypeInference", "specialize")(ast, symbol_table)
+            if self.__backend == "closures":
+                backend = lazy("TypeInference", "compile_typed")
+        instrumentation = None
+        if self.__backend == "adaptive":
+            instrumentation = lazy("Adaptive", "get_instrumentation")(ast)
+        if self.__workers:
+            runner = lazy("Parallel", "compile_parallel")(ast, lambda node: backend(node, False),
+                                                         self.__backend, self.__workers)
+            return Program(ast, runner, backend(ast, True), name, temporaries, instrumentation=instrumentation)
+        return Program(ast, backend(ast, False), backend(ast, True), name, temporaries,
+                       instrumentation=instrumentation)
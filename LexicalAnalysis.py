@@ -1,3 +1,5 @@
+import math
+import re
 from typing import Optional, Union
 
 from InputStream import InputStream
@@ -17,6 +19,9 @@ class Tokenizer:
         "else": ElseKeywordToken,
         "print": PrintKeywordToken,
         "read": ReadKeywordToken,
+        "while": WhileKeywordToken,
+        "function": FunctionKeywordToken,
+        "return": ReturnKeywordToken,
         "true": BoolConstantToken.true,
         "false": BoolConstantToken.false
     }
@@ -43,6 +48,7 @@ class Tokenizer:
     __delimiters = {
         '(': LeftParToken,
         ')': RightParToken,
+        ',': CommaToken,
         '{': BlockStartToken,
         '}': BlockEndToken,
         ';': ExprEndToken,
@@ -51,6 +57,25 @@ class Tokenizer:
         ':': TernaryDivider
     }
 
+    """Pomocná konstanta s escape sekvencemi v řetězcích a znaky, které zastupují."""
+    __escapes = {
+        '"': '"',
+        'n': '\n',
+        '\\': '\\'
+    }
+
+    """Pomocná konstanta s regulárním výrazem pro nalezení escape sekvence."""
+    __escape_sequence = re.compile(r'\\(.)', re.DOTALL)
+
+    """Pomocná konstanta s regulárním výrazem číselné konstanty (šestnáctková, celá nebo desetinná)."""
+    __number = re.compile(r'0[xX](?:_?[0-9a-fA-F])+|\d(?:_?\d)*(?:\.\d(?:_?\d)*)?(?:[eE][+-]?\d(?:_?\d)*)?')
+
+    """Pomocná konstanta s regulárním výrazem zbytku chybné číselné konstanty."""
+    __number_tail = re.compile(r'[\w.]*')
+
+    """Nejvyšší počet číslic, které lze převést jediným voláním int()."""
+    __max_digits = 4000
+
     def __init__(self, istream: InputStream):
         """
         Konstruktor
@@ -89,14 +114,27 @@ class Tokenizer:
         """
         return self.peek() is None
 
+    def get_position(self) -> tuple:
+        """
+        :return: Pozice (řádek, sloupec) aktuálně čteného znaku ve zdrojovém kódu.
+        """
+        return self.__is.get_line(), self.__is.get_column()
+
     def __get_next_token(self) -> Optional[Token]:
-        if self.__is.is_eof():
-            return None
+        while self.__is.is_eof() is False:
+            char = self.__is.peek()
+            if char == '#':
+                self.__skip_comment()
+            elif char.isspace():
+                self.__is.next()
+            else:
+                line, column = self.__is.get_line(), self.__is.get_column()
+                token = self.__read_token(char)
+                token.set_position(line, column)
+                return token
+        return None
 
-        char = self.__is.peek()
-        if char == '#':
-            self.__skip_comment()
-            return self.__get_next_token()
+    def __read_token(self, char: str) -> Token:
         if char.isdigit():
             return self.__read_number()
         if char == '"':
@@ -107,32 +145,90 @@ class Tokenizer:
             return self.__read_operator()
         if self.__is_delimiter(char):
             return self.__read_delimiter()
-        if char.isspace():
-            self.__is.next()
-            return self.__get_next_token()
 
-        self.__is.raise_error("Unexpected character '{:s}' was found.".format(char))
+        # Neznámý znak přeskočíme, aby mohla analýza po chybě pokračovat.
+        error = self.__is.error("Unexpected character '{:s}' was found.".format(char))
+        self.__is.next()
+        raise error
 
     def __skip_comment(self) -> None:
         while self.__is.is_eof() is False and self.__is.peek() != '\n':
             self.__is.next()
 
     def __read_number(self) -> Token:
-        value = 0
-        while self.__is.peek().isdigit():
-            value *= 10
-            value += int(self.__is.next())
-        return NumericConstantToken(value)
+        # Celá konstanta se najde jedním regulárním výrazem a převede jedním
+        # voláním int(), případně float().
+        text = self.__is.match(Tokenizer.__number)
+        tail = self.__is.peek_at(len(text))
+        if tail.isalnum() or tail in ('_', '.'):
+            # Celou chybnou konstantu přeskočíme, aby mohla analýza po chybě pokračovat.
+            error = self.__is.error("Malformed numeric constant")
+            self.__is.read(len(self.__is.match(Tokenizer.__number_tail)))
+            raise error
+
+        if text[1:2] in ('x', 'X'):
+            token = NumericConstantToken(int(text, 16))
+        elif '.' in text or 'e' in text or 'E' in text:
+            token = FloatConstantToken(float(text))
+            if math.isinf(token.get_value()):
+                error = self.__is.error("Numeric constant out of range")
+                self.__is.read(len(text))
+                raise error
+        else:
+            token = NumericConstantToken(Tokenizer.__parse_int(text.replace('_', '')))
+        self.__is.read(len(text))
+        return token
+
+    @staticmethod
+    def __parse_int(digits: str) -> int:
+        """
+        Převede desítkové číslice na celé číslo.
+
+        Python odmítá převádět příliš dlouhé řetězce číslic najednou (viz
+        sys.get_int_max_str_digits()), takové číslo se proto převede po
+        polovinách.
+        """
+        if len(digits) <= Tokenizer.__max_digits:
+            return int(digits)
+        half = len(digits) // 2
+        return Tokenizer.__parse_int(digits[:half]) * 10 ** (len(digits) - half) \
+            + Tokenizer.__parse_int(digits[half:])
 
     def __read_string(self) -> Token:
-        string = "", self.__is.next()
-        while self.__is.is_eof() is False and self.__is.peek() != '"':
-            string = self.__is.next()
+        self.__is.next()
 
-        if self.__is.is_eof():
+        # Konec řetězce hledáme po celých úsecích mezi zpětnými lomítky, znaky
+        # se neprocházejí jednotlivě. Uvozovka za zpětným lomítkem konec není.
+        start = 0
+        unknown = None
+        end = self.__is.find('"')
+        while end >= 0:
+            escape = self.__is.find('\\', start, end)
+            if escape < 0:
+                break
+            if unknown is None and self.__is.peek_at(escape + 1) not in Tokenizer.__escapes:
+                unknown = escape
+            start = escape + 2
+            if end < start:
+                end = self.__is.find('"', start)
+
+        if end < 0:
+            self.__is.read()
             self.__is.raise_error("EOF found while reading string constant")
 
-        return StringConstantToken(str(string))
+        if unknown is not None:
+            # Celý řetězec přeskočíme, aby mohla analýza po chybě pokračovat.
+            self.__is.read(unknown)
+            error = self.__is.error("Unknown escape sequence in string constant")
+            self.__is.read(end - unknown)
+            self.__is.next()
+            raise error
+
+        string = self.__is.read(end)
+        self.__is.next()
+        if start > 0:
+            string = Tokenizer.__escape_sequence.sub(lambda m: Tokenizer.__escapes[m.group(1)], string)
+        return StringConstantToken(string)
 
     def __read_identifier_or_keyword(self) -> Token:
         name = ""
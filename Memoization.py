@@ -0,0 +1,340 @@
+import threading
+from collections import OrderedDict
+
+from AST import *
+
+"""Výchozí maximální počet výsledků uložených v cache."""
+CACHE_SIZE = 1024
+
+"""Minimální počet operátorů podvýrazu, od kterého se vyplatí ukládat jeho výsledek."""
+MIN_OPERATORS = 2
+
+"""Pomocná konstanta označující, že výsledek v cache není."""
+_MISSING = object()
+
+
+class MemoCache:
+    """
+    Omezená cache výsledků čistých podvýrazů s vyřazováním nejdéle
+    nepoužitých záznamů (LRU)
+
+    Klíčem záznamu je místo programu (podvýraz) a verze proměnných, které
+    podvýraz čte (viz SymbolTable.get_versions), nebo jejich hodnoty (viz
+    value_key). Verze jsou jedinečné napříč tabulkami symbolů a stejné
+    hodnoty dávají stejný výsledek v každém běhu, cache proto sdílí všechny
+    běhy téhož programu, i souběžné z více vláken.
+
+    Cache vede pro každé místo programu počty zásahů a minutí.
+    """
+
+    def __init__(self, max_size: int = CACHE_SIZE):
+        """
+        Konstruktor
+
+        :param max_size: Maximální počet uložených výsledků.
+        """
+        if max_size < 1:
+            raise ValueError("Cache size must be positive")
+        self.__max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.__sites = []
+        self.__hits = []
+        self.__misses = []
+        self.__evictions = 0
+
+    def register_site(self, reads: tuple) -> int:
+        """
+        Zaregistruje podvýraz, jehož výsledky se budou ukládat.
+
+        :param reads: Jména proměnných, které podvýraz čte.
+        :return: Pořadové číslo místa.
+        """
+        self.__sites.append(reads)
+        self.__hits.append(0)
+        self.__misses.append(0)
+        return len(self.__sites) - 1
+
+    def lookup(self, site: int, key: tuple, count_miss: bool = True):
+        """
+        :param site: Pořadové číslo místa.
+        :param key: Verze nebo hodnoty proměnných, které místo čte.
+        :param count_miss: Zda se má minutí započítat. Minutí, po kterém se
+        hledá ještě podle jiného klíče, se nezapočítává.
+        :return: Uložený výsledek, případně _MISSING.
+        """
+        with self.__lock:
+            value = self.__entries.get((site, key), _MISSING)
+            if value is _MISSING:
+                if count_miss:
+                    self.__misses[site] += 1
+            else:
+                self.__entries.move_to_end((site, key))
+                self.__hits[site] += 1
+            return value
+
+    def record_miss(self, site: int) -> None:
+        """
+        Započítá minutí, po kterém se už podle dalšího klíče nehledá.
+        """
+        with self.__lock:
+            self.__misses[site] += 1
+
+    def store(self, site: int, key: tuple, value) -> None:
+        """
+        Uloží výsledek podvýrazu. Pokud je cache plná, vyřadí nejdéle
+        nepoužitý záznam.
+        """
+        with self.__lock:
+            self.__entries[(site, key)] = value
+            if len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def clear(self) -> None:
+        """
+        Odstraní všechny uložené výsledky. Čítače zůstávají.
+        """
+        with self.__lock:
+            self.__entries.clear()
+
+    def get_sites(self) -> list:
+        """
+        :return: Čítače jednotlivých míst programu.
+        """
+        return [{
+            "site": site,
+            "reads": reads,
+            "hits": self.__hits[site],
+            "misses": self.__misses[site],
+            "hit_rate": MemoCache.rate(self.__hits[site], self.__misses[site])
+        } for site, reads in enumerate(self.__sites)]
+
+    def summary(self) -> dict:
+        """
+        :return: Souhrnné počty zásahů, minutí a vyřazených záznamů.
+        """
+        hits = sum(self.__hits)
+        misses = sum(self.__misses)
+        return {
+            "sites": len(self.__sites),
+            "size": len(self.__entries),
+            "max_size": self.__max_size,
+            "hits": hits,
+            "misses": misses,
+            "evictions": self.__evictions,
+            "hit_rate": MemoCache.rate(hits, misses)
+        }
+
+    @staticmethod
+    def rate(hits: int, misses: int) -> float:
+        return hits / (hits + misses) if hits + misses else 0.0
+
+
+#####################################################
+# MEMOIZED NODES                                    #
+#####################################################
+"""Typy hodnot, podle kterých se výsledky hledají i napříč běhy (klíč z nich je levný)."""
+_SCALARS = (int, float, bool)
+
+
+def value_key(value):
+    """
+    Vrátí část klíče cache odpovídající hodnotě proměnné.
+
+    Hodnoty, které si jsou rovny, ale dávají různé výsledky (1, 1.0 a True;
+    0.0 a -0.0), mají různé klíče.
+    """
+    if type(value) is float:
+        return float, value.hex()
+    return type(value), value
+
+
+class ASTNodeMemo(ASTNode):
+    """
+    Čistý podvýraz, jehož výsledek se ukládá do cache
+
+    Výsledek se znovu použije, dokud se nezmění verze žádné z proměnných,
+    které podvýraz čte. Pokud jsou všechny čtené hodnoty čísla nebo
+    pravdivostní hodnoty, hledá se výsledek navíc podle hodnot, takže se
+    znovu použije i v jiném běhu. Tabulka symbolů musí být SymbolTable,
+    protože jen ta verze proměnných vede.
+    """
+
+    def __init__(self, expression: ASTNode, reads: frozenset, cache: MemoCache):
+        super().__init__()
+        self.__expression = expression
+        self.__reads = tuple(sorted(reads))
+        self.__cache = cache
+        self.__site = cache.register_site(self.__reads)
+
+    def get_expression(self) -> ASTNode:
+        return self.__expression
+
+    def get_reads(self) -> tuple:
+        return self.__reads
+
+    def evaluate(self, symbol_table: dict):
+        versions = symbol_table.get_versions(self.__reads)
+        value = self.__cache.lookup(self.__site, versions, False)
+        if value is not _MISSING:
+            return value
+
+        try:
+            values = [symbol_table[name] for name in self.__reads]
+        except KeyError:
+            # Chybu nedefinované proměnné ohlásí podvýraz ve stejném pořadí jako strom.
+            return self.__expression.evaluate(symbol_table)
+        key = None
+        if all(type(v) in _SCALARS for v in values):
+            key = tuple([value_key(v) for v in values])
+            value = self.__cache.lookup(self.__site, key)
+        else:
+            self.__cache.record_miss(self.__site)
+        if value is _MISSING:
+            value = self.__expression.evaluate(symbol_table)
+            if key is not None:
+                self.__cache.store(self.__site, key, value)
+        self.__cache.store(self.__site, versions, value)
+        return value
+
+
+class ASTNodeMemoAssign(ASTNodeOpAssign):
+    """
+    Přiřazení, které po zápisu zvýší verzi proměnné
+    """
+
+    def evaluate(self, symbol_table: dict):
+        name = self.get_left_child().get_name()
+        symbol_table[name] = self.get_right_child().evaluate(symbol_table)
+        symbol_table.bump_version(name)
+
+
+class ASTNodeMemoReadKeyword(ASTNodeReadKeyword):
+    """
+    Čtení vstupu, které po zápisu zvýší verzi proměnné
+    """
+
+    def evaluate(self, symbol_table: dict):
+        super().evaluate(symbol_table)
+        symbol_table.bump_version(self.get_expression().get_name())
+
+
+class MemoRewriter:
+    """
+    Obalí čisté podvýrazy programu uzly ASTNodeMemo a zápisy do proměnných
+    nahradí zápisy, které vedou verze proměnných
+
+    Obalí se vždy největší podvýraz s dostatečným počtem operátorů. Jeho
+    podvýrazy se obalí jen tehdy, pokud čtou menší množinu proměnných, takže
+    jejich výsledek může zůstat platný, i když se výsledek celku změní.
+
+    Původní strom zůstává nezměněn, vzniká strom nový.
+    """
+
+    def __init__(self, cache: MemoCache, min_operators: int = MIN_OPERATORS):
+        """
+        Konstruktor
+
+        :param cache: Cache, do které se ukládají výsledky podvýrazů.
+        :param min_operators: Minimální počet operátorů obaleného podvýrazu.
+        """
+        self.__cache = cache
+        self.__min_operators = min_operators
+        self.__analysis = {}
+
+    def rewrite(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, ASTNodeProg):
+            prog = ASTNodeProg()
+            for e in node.get_expressions():
+                statement = self.rewrite(e)
+                statement.set_position(*e.get_position())
+                prog.add_expression(statement)
+            prog.set_steps(node.get_steps())
+            return prog
+        if isinstance(node, ASTNodeOpAssign):
+            return ASTNodeMemoAssign(node.get_left_child(), self.__expression(node.get_right_child()))
+        if isinstance(node, ASTNodeReadKeyword):
+            return ASTNodeMemoReadKeyword(node.get_expression())
+        if isinstance(node, ASTNodeCondStatement):
+            root = ASTNodeCondStatement(self.__expression(node.get_condition()), self.rewrite(node.get_then()))
+            if node.get_else() is not None:
+                root.set_else(self.rewrite(node.get_else()))
+            return root
+        if isinstance(node, ASTNodeTernStatement):
+            return ASTNodeTernStatement(self.__expression(node.get_condition()),
+                                        self.rewrite(node.get_then()),
+                                        self.rewrite(node.get_else()))
+        if isinstance(node, ASTNodeWhileLoop):
+            return ASTNodeWhileLoop(self.__expression(node.get_condition()), self.rewrite(node.get_body()))
+        if isinstance(node, ASTNodePrintKeyword):
+            return ASTNodePrintKeyword(self.__expression(node.get_expression()))
+        return self.__expression(node)
+
+    def __expression(self, node: ASTNode, outer: frozenset = None) -> ASTNode:
+        """
+        Přepíše výraz.
+
+        :param outer: Proměnné čtené nejbližším obaleným nadřazeným výrazem.
+        """
+        reads, operators = self.__analyse(node)
+        memoize = reads is not None and reads != outer and operators >= self.__min_operators
+        inner = reads if memoize else outer
+
+        if isinstance(node, ASTNodeOpAssign):
+            # Přiřazení uvnitř výrazu (a = b = 3) musí také zvýšit verzi.
+            root = ASTNodeMemoAssign(node.get_left_child(), self.__expression(node.get_right_child(), inner))
+        elif isinstance(node, ASTNodeBinaryOp):
+            root = type(node)(self.__expression(node.get_left_child(), inner),
+                              self.__expression(node.get_right_child(), inner))
+        elif isinstance(node, ASTNodeUnaryOp):
+            root = type(node)(self.__expression(node.get_child(), inner))
+        else:
+            return node
+        root.set_position(*node.get_position())
+
+        if memoize:
+            return ASTNodeMemo(root, reads, self.__cache)
+        return root
+
+    def __analyse(self, node: ASTNode) -> tuple:
+        """
+        :return: Dvojice (čtené proměnné, počet operátorů). Pokud výraz není
+        čistý (nebo ho neznáme), jsou čtené proměnné None.
+        """
+        if id(node) in self.__analysis:
+            return self.__analysis[id(node)]
+
+        if isinstance(node, ASTNodeIdent):
+            result = frozenset([node.get_name()]), 0
+        elif isinstance(node, ASTNodeConstant):
+            result = frozenset(), 0
+        elif isinstance(node, ASTNodeOpAssign):
+            result = None, 0
+        elif isinstance(node, ASTNodeBinaryOp):
+            left, left_operators = self.__analyse(node.get_left_child())
+            right, right_operators = self.__analyse(node.get_right_child())
+            pure = left is not None and right is not None
+            result = (left | right if pure else None), left_operators + right_operators + 1
+        elif isinstance(node, ASTNodeUnaryOp):
+            child, operators = self.__analyse(node.get_child())
+            result = child, operators + 1
+        else:
+            result = None, 0
+
+        self.__analysis[id(node)] = result
+        return result
+
+
+def make_memoized(ast: ASTNode, cache: MemoCache, min_operators: int = MIN_OPERATORS) -> ASTNode:
+    """
+    Vrátí kopii programu, která ukládá výsledky čistých podvýrazů do cache.
+
+    Program se musí vyhodnocovat nad tabulkou symbolů SymbolTable.
+
+    :param ast: Kořen syntaktického stromu.
+    :param cache: Cache výsledků podvýrazů.
+    :param min_operators: Minimální počet operátorů obaleného podvýrazu.
+    :return: Syntaktický strom s memoizací.
+    """
+    return MemoRewriter(cache, min_operators).rewrite(ast)
@@ -0,0 +1,550 @@
+from AST import *
+
+"""Předpona dočasných proměnných. Identifikátor programu číslicí začínat nemůže."""
+TEMPORARY_PREFIX = "0t"
+
+
+class Optimizer:
+    """
+    Optimalizační průchod syntaktickým stromem
+
+    Průchod provádí tři úpravy, které nemění výstup ani výslednou tabulku
+    symbolů programu:
+
+    - Vynesení invariantů z cyklů: čisté výrazy v cyklu, jejichž proměnné
+      cyklus nemění, se spočítají jen jednou. První iterace cyklu se vykoná
+      v původní podobě (výraz v ní tedy selže přesně tam, kde by selhal
+      původní program), hodnota se poté uloží do dočasné proměnné a zbylé
+      iterace už čtou jen ji.
+    - Eliminace společných podvýrazů: stejný čistý výraz vyhodnocený v bloku
+      vícekrát (a jehož proměnné se mezitím nemění) se spočítá jen jednou.
+      Dočasná proměnná se přiřadí před příkazem s prvním výskytem, a to jen
+      tehdy, pokud nic, co se v příkazu vyhodnotí před výrazem, nemůže
+      selhat (pořadí chyb se tedy nezmění).
+    - Odstranění mrtvých zápisů: přiřazení, jehož hodnotu před dalším
+      přiřazením téže proměnné nikdo nepřečte, se vynechá (pokud vyhodnocení
+      pravé strany nemůže selhat).
+
+    Upravené bloky započítávají do limitů běhu stejný počet kroků jako bloky
+    původní (viz ASTNodeProg.get_steps), limit kroků tedy platí stejně.
+
+    Výrazy se porovnávají strukturálně pomocí klíčů (vnořených n-tic), které
+    lze hashovat. Dočasné proměnné mají názvy, které program obsahovat nemůže;
+    Program je po skončení běhu z tabulky symbolů odstraní.
+    """
+
+    def __init__(self, live_out: set = None):
+        """
+        Konstruktor
+
+        :param live_out: Proměnné, jejichž hodnoty jsou po skončení programu
+        potřeba. Pokud nejsou zadány, jsou potřeba všechny.
+        """
+        self.__live_out = None if live_out is None else set(live_out)
+        self.__keys = {}
+        self.__temporaries = []
+        self.hoisted = 0
+        self.eliminated = 0
+        self.removed = 0
+
+    def get_temporaries(self) -> list:
+        """
+        :return: Názvy dočasných proměnných, které průchod zavedl.
+        """
+        return self.__temporaries
+
+    def optimize(self, node: ASTNode) -> ASTNode:
+        """
+        Vrátí optimalizovanou kopii programu. Původní strom zůstává nezměněn.
+        """
+        if isinstance(node, ASTNodeProg) is False:
+            return node
+        dead = set()
+        if self.__live_out is not None:
+            dead = (Optimizer.reads(node) | Optimizer.writes(node)) - self.__live_out
+        return self.__optimize_block(node, dead)
+
+    def __optimize_block(self, node: ASTNodeProg, dead: set) -> ASTNodeProg:
+        statements = [self.__optimize_statement(e) for e in node.get_expressions()]
+        statements = self.__eliminate_common(statements)
+        statements = self.__remove_dead_stores(statements, dead)
+        # Dočasné proměnné a vynechané zápisy nemění počet kroků bloku.
+        return Optimizer.block(statements, node.get_steps())
+
+    def __optimize_statement(self, node: ASTNode) -> ASTNode:
+        if isinstance(node, ASTNodeCondStatement):
+            result = ASTNodeCondStatement(node.get_condition(), self.__optimize_block(node.get_then(), set()))
+            if node.get_else() is not None:
+                result.set_else(self.__optimize_block(node.get_else(), set()))
+        elif isinstance(node, ASTNodeTernStatement):
+            result = ASTNodeTernStatement(node.get_condition(),
+                                          self.__optimize_block(node.get_then(), set()),
+                                          self.__optimize_block(node.get_else(), set()))
+        elif isinstance(node, ASTNodeWhileLoop):
+            result = self.__hoist(ASTNodeWhileLoop(node.get_condition(),
+                                                   self.__optimize_block(node.get_body(), set())))
+        else:
+            return node
+        result.set_position(*node.get_position())
+        return result
+
+    #####################################################
+    # LOOP-INVARIANT CODE MOTION                        #
+    #####################################################
+    def __hoist(self, loop: ASTNodeWhileLoop) -> ASTNode:
+        """
+        Vynese z cyklu invariantní výrazy.
+
+        Cyklus while (c) { B } se přepíše na
+        if (c) { B; t = e; while (c') { B' } }, kde c' a B' místo výrazu e
+        čtou dočasnou proměnnou t. Vynášejí se jen výrazy, které se v první
+        iteraci vyhodnotí vždy, takže jejich opětovné vyhodnocení už selhat
+        nemůže.
+        """
+        body = loop.get_body().get_expressions()
+        written = Optimizer.writes(loop.get_body())
+        candidates = {}
+        self.__collect_invariants(loop.get_condition(), written, candidates)
+        for e in body:
+            for expression in Optimizer.evaluated_first(e):
+                self.__collect_invariants(expression, written, candidates)
+        if len(candidates) == 0:
+            return loop
+
+        mapping = {}
+        peeled = list(body)
+        for key, expression in candidates.items():
+            mapping[key] = self.__new_temporary()
+            peeled.append(self.__assign(mapping[key], expression, loop.get_position()))
+        self.hoisted += len(candidates)
+
+        inner = ASTNodeWhileLoop(self.__replace(loop.get_condition(), mapping),
+                                 self.__replace(loop.get_body(), mapping))
+        inner.set_position(*loop.get_position())
+        peeled.append(inner)
+        # Vyloupnutá první iterace započítá stejně kroků jako iterace původního cyklu.
+        return ASTNodeCondStatement(loop.get_condition(), Optimizer.block(peeled, 1 + loop.get_body().get_steps()))
+
+    def __collect_invariants(self, node: ASTNode, written: set, candidates: dict) -> None:
+        """
+        Najde v nepodmíněně vyhodnocených částech výrazu největší podvýrazy,
+        jejichž proměnné cyklus nemění.
+        """
+        key = self.__key(node)
+        if key is None:
+            return
+        if Optimizer.is_computation(node) and not (Optimizer.reads(node) & written):
+            candidates.setdefault(key, node)
+            return
+        for child in Optimizer.unconditional_children(node):
+            self.__collect_invariants(child, written, candidates)
+
+    #####################################################
+    # COMMON SUBEXPRESSION ELIMINATION                  #
+    #####################################################
+    def __eliminate_common(self, statements: list) -> list:
+        while True:
+            common = self.__find_common(statements)
+            if common is None:
+                return statements
+            first, last, key, expression = common
+
+            name = self.__new_temporary()
+            variables = Optimizer.reads(expression)
+            result = statements[:first]
+            result.append(self.__assign(name, expression, statements[first].get_position()))
+            for s in statements[first:last + 1]:
+                if Optimizer.writes(s) & variables:
+                    # Výraz platí jen do zápisu, nahradí se tedy jen v části
+                    # příkazu, která se vyhodnotí před ním.
+                    s = self.__replace_before_write(s, {key: name})
+                else:
+                    s = self.__replace(s, {key: name})
+                result.append(s)
+            result.extend(statements[last + 1:])
+            statements = result
+            self.eliminated += 1
+
+    def __find_common(self, statements: list):
+        """
+        Najde největší výraz, který se v bloku vyhodnocuje vícekrát se stejnou
+        hodnotou.
+
+        :return: Čtveřice (index prvního příkazu, index posledního příkazu,
+        klíč výrazu, výraz) nebo None.
+        """
+        best = None
+        best_size = 0
+        defined = set()
+        for i, s in enumerate(statements):
+            for expression in Optimizer.evaluated_first(s):
+                for node in self.__computations(expression):
+                    size = Optimizer.size(node)
+                    if size <= best_size:
+                        continue
+                    before = Optimizer.evaluated_before(expression, node)
+                    if not all(Optimizer.is_total(e, defined) for e in before):
+                        continue
+                    key = self.__key(node)
+                    count, last = self.__count_group(statements, i, key, Optimizer.reads(node))
+                    if count >= 2:
+                        best = (i, last, key, node)
+                        best_size = size
+            if isinstance(s, (ASTNodeOpAssign, ASTNodeReadKeyword)):
+                defined.add(Optimizer.target(s))
+        return best
+
+    def __count_group(self, statements: list, first: int, key: tuple, variables: set) -> tuple:
+        """
+        Spočítá výskyty výrazu od příkazu first až po první zápis do některé
+        z jeho proměnných.
+
+        :return: Dvojice (počet výskytů, index posledního příkazu s výskytem).
+        """
+        count = 0
+        last = first
+        for j in range(first, len(statements)):
+            s = statements[j]
+            if Optimizer.writes(s) & variables:
+                before = Optimizer.evaluated_before_write(s)
+                occurrences = self.__count(before, key) if before is not None else 0
+                if occurrences:
+                    count += occurrences
+                    last = j
+                break
+            occurrences = self.__count(s, key)
+            if occurrences:
+                count += occurrences
+                last = j
+        return count, last
+
+    def __count(self, node: ASTNode, key: tuple) -> int:
+        if self.__key(node) == key:
+            return 1
+        return sum(self.__count(child, key) for child in Optimizer.children(node))
+
+    def __computations(self, node: ASTNode) -> list:
+        """
+        Vrátí všechny čisté výpočty v nepodmíněně vyhodnocených částech výrazu.
+        """
+        result = []
+        if self.__key(node) is None:
+            return result
+        if Optimizer.is_computation(node):
+            result.append(node)
+        for child in Optimizer.unconditional_children(node):
+            result.extend(self.__computations(child))
+        return result
+
+    #####################################################
+    # DEAD STORE ELIMINATION                            #
+    #####################################################
+    def __remove_dead_stores(self, statements: list, dead: set) -> list:
+        """
+        Vynechá přiřazení, jejichž hodnotu nikdo nepřečte.
+
+        :param dead: Proměnné, jejichž hodnota na konci bloku není potřeba.
+        """
+        defined = []
+        names = set()
+        for s in statements:
+            defined.append(set(names))
+            if isinstance(s, (ASTNodeOpAssign, ASTNodeReadKeyword)):
+                names.add(Optimizer.target(s))
+
+        dead = set(dead)
+        result = []
+        for i in range(len(statements) - 1, -1, -1):
+            s = statements[i]
+            if isinstance(s, ASTNodeOpAssign):
+                name = Optimizer.target(s)
+                if name in dead and Optimizer.is_total(s.get_right_child(), defined[i]):
+                    self.removed += 1
+                    continue
+                dead.add(name)
+                dead -= Optimizer.reads(s.get_right_child())
+            elif isinstance(s, ASTNodeReadKeyword):
+                dead.add(Optimizer.target(s))
+            else:
+                dead -= Optimizer.reads(s)
+            result.append(s)
+        result.reverse()
+        return result
+
+    #####################################################
+    # HELPERS                                           #
+    #####################################################
+    def __key(self, node: ASTNode):
+        """
+        Vrátí strukturální klíč čistého výrazu, nebo None, pokud uzel čistým
+        výrazem není (přiřazení, čtení, výpis, příkazy).
+        """
+        if node in self.__keys:
+            return self.__keys[node]
+
+        key = None
+        if isinstance(node, ASTNodeConstant):
+            # Typ je součástí klíče, protože True == 1.
+            key = ("const", type(node.get_value()), node.get_value())
+        elif isinstance(node, ASTNodeIdent):
+            key = ("ident", node.get_name())
+        elif isinstance(node, ASTNodeBinaryOp) and isinstance(node, ASTNodeOpAssign) is False:
+            left = self.__key(node.get_left_child())
+            right = self.__key(node.get_right_child())
+            if left is not None and right is not None:
+                key = (type(node), left, right)
+        elif isinstance(node, ASTNodeOpNot):
+            child = self.__key(node.get_child())
+            if child is not None:
+                key = (type(node), child)
+        self.__keys[node] = key
+        return key
+
+    def __replace(self, node: ASTNode, mapping: dict) -> ASTNode:
+        """
+        Nahradí v podstromu všechny výrazy se zadanými klíči proměnnými.
+
+        :param mapping: Slovník klíč výrazu -> název proměnné.
+        """
+        key = self.__key(node)
+        if key is not None and key in mapping:
+            return ASTNodeIdent(mapping[key])
+
+        if isinstance(node, ASTNodeProg):
+            return Optimizer.block([self.__replace(e, mapping) for e in node.get_expressions()], node.get_steps())
+        if isinstance(node, ASTNodeOpAssign):
+            result = ASTNodeOpAssign(node.get_left_child(), self.__replace(node.get_right_child(), mapping))
+        elif isinstance(node, ASTNodeBinaryOp):
+            result = type(node)(self.__replace(node.get_left_child(), mapping),
+                                self.__replace(node.get_right_child(), mapping))
+        elif isinstance(node, ASTNodeOpNot):
+            result = ASTNodeOpNot(self.__replace(node.get_child(), mapping))
+        elif isinstance(node, ASTNodeCondStatement):
+            result = ASTNodeCondStatement(self.__replace(node.get_condition(), mapping),
+                                          self.__replace(node.get_then(), mapping))
+            if node.get_else() is not None:
+                result.set_else(self.__replace(node.get_else(), mapping))
+        elif isinstance(node, ASTNodeTernStatement):
+            result = ASTNodeTernStatement(self.__replace(node.get_condition(), mapping),
+                                          self.__replace(node.get_then(), mapping),
+                                          self.__replace(node.get_else(), mapping))
+        elif isinstance(node, ASTNodeWhileLoop):
+            result = ASTNodeWhileLoop(self.__replace(node.get_condition(), mapping),
+                                      self.__replace(node.get_body(), mapping))
+        elif isinstance(node, ASTNodePrintKeyword):
+            result = ASTNodePrintKeyword(self.__replace(node.get_expression(), mapping))
+        elif isinstance(node, ASTNodeCall):
+            result = ASTNodeCall(node.get_name(), [self.__replace(a, mapping) for a in node.get_arguments()],
+                                 node.get_functions())
+        else:
+            return node
+        result.set_position(*node.get_position())
+        return result
+
+    def __replace_before_write(self, node: ASTNode, mapping: dict) -> ASTNode:
+        if isinstance(node, ASTNodeOpAssign):
+            result = ASTNodeOpAssign(node.get_left_child(), self.__replace(node.get_right_child(), mapping))
+        elif isinstance(node, ASTNodeCondStatement):
+            result = ASTNodeCondStatement(self.__replace(node.get_condition(), mapping), node.get_then())
+            if node.get_else() is not None:
+                result.set_else(node.get_else())
+        elif isinstance(node, ASTNodeTernStatement):
+            result = ASTNodeTernStatement(self.__replace(node.get_condition(), mapping),
+                                          node.get_then(), node.get_else())
+        else:
+            return node
+        result.set_position(*node.get_position())
+        return result
+
+    def __new_temporary(self) -> str:
+        name = TEMPORARY_PREFIX + str(len(self.__temporaries))
+        self.__temporaries.append(name)
+        return name
+
+    @staticmethod
+    def __assign(name: str, expression: ASTNode, position: tuple) -> ASTNodeOpAssign:
+        assign = ASTNodeOpAssign(ASTNodeIdent(name), expression)
+        assign.set_position(*position)
+        return assign
+
+    @staticmethod
+    def block(statements: list, steps: int = None) -> ASTNodeProg:
+        """
+        Vytvoří blok ze zadaných příkazů.
+
+        :param steps: Počet kroků bloku (viz ASTNodeProg.get_steps). Pokud není
+        zadán, odpovídá počtu příkazů.
+        """
+        prog = ASTNodeProg()
+        for e in statements:
+            prog.add_expression(e)
+        if steps is not None:
+            prog.set_steps(steps)
+        return prog
+
+    @staticmethod
+    def children(node: ASTNode) -> list:
+        """
+        Vrátí všechny přímé potomky uzlu.
+        """
+        if isinstance(node, ASTNodeProg):
+            return list(node.get_expressions())
+        if isinstance(node, ASTNodeBinaryOp):
+            return [node.get_left_child(), node.get_right_child()]
+        if isinstance(node, ASTNodeUnaryOp):
+            return [node.get_child()]
+        if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            return [c for c in (node.get_condition(), node.get_then(), node.get_else()) if c is not None]
+        if isinstance(node, ASTNodeWhileLoop):
+            return [node.get_condition(), node.get_body()]
+        if isinstance(node, (ASTNodePrintKeyword, ASTNodeReadKeyword)):
+            return [node.get_expression()]
+        if isinstance(node, ASTNodeCall):
+            return list(node.get_arguments())
+        if isinstance(node, ASTNodeReturn) and node.get_expression() is not None:
+            return [node.get_expression()]
+        return []
+
+    @staticmethod
+    def unconditional_children(node: ASTNode) -> list:
+        """
+        Vrátí potomky výrazu, které se vyhodnotí vždy, když se vyhodnotí výraz
+        (u zkráceného vyhodnocení jen levý operand).
+        """
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return [node.get_left_child()]
+        if isinstance(node, ASTNodeOpAssign):
+            return [node.get_right_child()]
+        return Optimizer.children(node)
+
+    @staticmethod
+    def evaluated_first(node: ASTNode) -> list:
+        """
+        Vrátí výrazy, které se při vykonání příkazu vyhodnotí vždy (alespoň jednou).
+        """
+        if isinstance(node, ASTNodeOpAssign):
+            return [node.get_right_child()]
+        if isinstance(node, ASTNodePrintKeyword):
+            return [node.get_expression()]
+        if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement, ASTNodeWhileLoop)):
+            return [node.get_condition()]
+        if isinstance(node, (ASTNodeProg, ASTNodeReadKeyword)):
+            return []
+        return [node]
+
+    @staticmethod
+    def evaluated_before(node: ASTNode, target: ASTNode) -> list:
+        """
+        Vrátí podvýrazy, které se vyhodnotí dříve než target, nepodmíněně
+        vyhodnocený potomek výrazu node.
+        """
+        before = []
+        while node is not target:
+            for child in Optimizer.unconditional_children(node):
+                if Optimizer.contains(child, target):
+                    node = child
+                    break
+                before.append(child)
+        return before
+
+    @staticmethod
+    def contains(node: ASTNode, target: ASTNode) -> bool:
+        return node is target or any(Optimizer.contains(c, target) for c in Optimizer.children(node))
+
+    @staticmethod
+    def evaluated_before_write(node: ASTNode):
+        """
+        Vrátí výraz příkazu, který se vyhodnotí dříve, než příkaz cokoliv
+        zapíše, nebo None.
+        """
+        if isinstance(node, ASTNodeOpAssign):
+            return node.get_right_child()
+        if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            return node.get_condition()
+        return None
+
+    @staticmethod
+    def is_computation(node: ASTNode) -> bool:
+        """
+        Zjistí, zda má smysl výraz počítat jen jednou (jde o operátor, ne jen
+        o konstantu nebo proměnnou).
+        """
+        return isinstance(node, (ASTNodeBinaryOp, ASTNodeUnaryOp)) and isinstance(node, ASTNodeOpAssign) is False
+
+    @staticmethod
+    def is_total(node: ASTNode, defined: set) -> bool:
+        """
+        Zjistí, zda vyhodnocení výrazu nemůže selhat.
+
+        :param defined: Proměnné, které v tomto místě mají jistě hodnotu.
+        """
+        if isinstance(node, ASTNodeConstant):
+            return True
+        if isinstance(node, ASTNodeIdent):
+            return node.get_name() in defined
+        if isinstance(node, (ASTNodeOpEqual, ASTNodeOpNotEq, ASTNodeOpAnd, ASTNodeOpOr)):
+            return Optimizer.is_total(node.get_left_child(), defined) \
+                and Optimizer.is_total(node.get_right_child(), defined)
+        if isinstance(node, ASTNodeOpNot):
+            return Optimizer.is_total(node.get_child(), defined)
+        return False
+
+    @staticmethod
+    def size(node: ASTNode) -> int:
+        return 1 + sum(Optimizer.size(child) for child in Optimizer.children(node))
+
+    @staticmethod
+    def target(node: ASTNode) -> str:
+        """
+        Vrátí název proměnné, do které příkaz přiřazení nebo čtení zapisuje.
+        """
+        if isinstance(node, ASTNodeOpAssign):
+            return node.get_left_child().get_name()
+        return node.get_expression().get_name()
+
+    @staticmethod
+    def reads(node: ASTNode) -> set:
+        """
+        Vrátí názvy proměnných, které podstrom čte.
+        """
+        if isinstance(node, ASTNodeIdent):
+            return {node.get_name()}
+        if isinstance(node, ASTNodeOpAssign):
+            return Optimizer.reads(node.get_right_child())
+        if isinstance(node, ASTNodeReadKeyword):
+            return set()
+        result = set()
+        if isinstance(node, ASTNodeCall) and node.get_function() is not None:
+            # Volaná funkce může číst globální proměnné (zapisovat do nich nemůže).
+            from Functions import global_reads
+
+            result |= global_reads(node.get_function())
+        for child in Optimizer.children(node):
+            result |= Optimizer.reads(child)
+        return result
+
+    @staticmethod
+    def writes(node: ASTNode) -> set:
+        """
+        Vrátí názvy proměnných, do kterých podstrom zapisuje (přiřazením nebo čtením).
+        """
+        if isinstance(node, ASTNodeOpAssign):
+            # Pravá strana může být další přiřazení (a = b = 3).
+            return {Optimizer.target(node)} | Optimizer.writes(node.get_right_child())
+        if isinstance(node, ASTNodeReadKeyword):
+            return {Optimizer.target(node)}
+        result = set()
+        for child in Optimizer.children(node):
+            result |= Optimizer.writes(child)
+        return result
+
+
+def optimize(ast: ASTNode, live_out: set = None) -> ASTNode:
+    """
+    Vrátí optimalizovanou kopii programu.
+
+    :param ast: Kořen syntaktického stromu.
+    :param live_out: Proměnné, jejichž hodnoty jsou po skončení programu potřeba.
+    :return: Optimalizovaný syntaktický strom.
+    """
+    return Optimizer(live_out).optimize(ast)
@@ -0,0 +1,374 @@
+import atexit
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+from AST import *
+from Optimizer import Optimizer
+from Rope import flatten
+from SymbolTable import SymbolTable
+
+"""Nejmenší počet náročných skupin v úseku, pro který se vyplatí použít další procesy."""
+MIN_HEAVY_GROUPS = 2
+
+"""Sdílené skupiny pracovních procesů podle jejich počtu (viz get_pool a shutdown_pools)."""
+_pools = {}
+
+"""Moduly, které forkserver načte předem, aby je pracovní procesy nemusely načítat znovu."""
+PRELOAD = ["Parallel", "Interpreter", "Compiler", "Transpiler", "Serializer"]
+
+"""Nejvyšší počet přeložených skupin, které si pracovní proces pamatuje."""
+MAX_PROGRAMS = 64
+
+"""
+Přeložené skupiny příkazů v pracovním procesu podle jejich zápisu (viz
+run_group). Při překročení MAX_PROGRAMS se zahodí nejdéle nepoužitá.
+"""
+_programs = OrderedDict()
+
+
+class Statement:
+    """
+    Příkaz nejvyšší úrovně programu spolu s jeho účinky
+
+    Příkaz čte proměnné (i prostřednictvím volaných funkcí), zapisuje do
+    proměnných přiřazením nebo čtením a případně provádí vstup a výstup
+    (print a read, i ve volaných funkcích).
+    """
+
+    def __init__(self, node: ASTNode, index: int):
+        """
+        Konstruktor
+
+        :param node: Uzel příkazu.
+        :param index: Pořadí příkazu v programu.
+        """
+        self.__node = node
+        self.__index = index
+        self.__reads = Optimizer.reads(node)
+        self.__writes = Optimizer.writes(node)
+        self.__io, self.__heavy = Statement.__inspect(node)
+
+    def get_node(self) -> ASTNode:
+        return self.__node
+
+    def get_index(self) -> int:
+        return self.__index
+
+    def get_reads(self) -> set:
+        return self.__reads
+
+    def get_writes(self) -> set:
+        return self.__writes
+
+    def has_io(self) -> bool:
+        return self.__io
+
+    def is_heavy(self) -> bool:
+        """
+        :return: True, pokud příkaz obsahuje cyklus nebo volání funkce, tedy
+        může trvat libovolně dlouho.
+        """
+        return self.__heavy
+
+    @staticmethod
+    def __inspect(node: ASTNode) -> tuple:
+        """
+        :return: Dvojice (provádí vstup nebo výstup, je náročný).
+        """
+        io = heavy = False
+        seen = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ASTNodePrintKeyword, ASTNodeReadKeyword)):
+                io = True
+            elif isinstance(node, ASTNodeWhileLoop):
+                heavy = True
+            elif isinstance(node, ASTNodeCall):
+                heavy = True
+                definition = node.get_function()
+                if definition is not None and definition not in seen:
+                    seen.add(definition)
+                    stack.append(definition.get_body())
+            stack.extend(Optimizer.children(node))
+        return io, heavy
+
+
+def dependency_groups(statements: list) -> list:
+    """
+    Rozdělí příkazy bez vstupu a výstupu na skupiny, mezi kterými nejsou
+    žádné závislosti.
+
+    Dva příkazy jsou závislé, pokud jeden zapisuje do proměnné, kterou druhý
+    čte nebo do které také zapisuje. Skupiny jsou souvislé komponenty grafu
+    závislostí, takže skupina nečte nic, co jiná skupina zapisuje, a různé
+    skupiny lze vykonat v libovolném pořadí i souběžně.
+
+    :param statements: Příkazy (Statement) v pořadí programu.
+    :return: Skupiny jako seznamy příkazů v pořadí programu.
+    """
+    parent = list(range(len(statements)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    touched = {}
+    written = set()
+    for i, statement in enumerate(statements):
+        for name in statement.get_reads() | statement.get_writes():
+            touched.setdefault(name, []).append(i)
+        written |= statement.get_writes()
+    for name in written:
+        first, *others = touched[name]
+        for i in others:
+            parent[find(i)] = find(first)
+
+    groups = {}
+    for i, statement in enumerate(statements):
+        groups.setdefault(find(i), []).append(statement)
+    return sorted(groups.values(), key=lambda group: group[0].get_index())
+
+
+class Group:
+    """
+    Skupina nezávislých příkazů připravená k vykonání zde nebo v jiném procesu
+    """
+
+    def __init__(self, statements: list, compile: Callable, definitions: list):
+        """
+        Konstruktor
+
+        :param statements: Příkazy skupiny (Statement) v pořadí programu.
+        :param compile: Překlad programu na funkci přijímající tabulku symbolů.
+        :param definitions: Definice funkcí programu. Do zápisu skupiny pro
+        jiný proces se přidají ty, které skupina volá.
+        """
+        block = Optimizer.block([s.get_node() for s in statements])
+        self.__code = compile(block)
+        self.__reads = set().union(*(s.get_reads() for s in statements))
+        self.__writes = set().union(*(s.get_writes() for s in statements))
+        self.__heavy = any(s.is_heavy() for s in statements)
+        self.__source = None
+        if self.__heavy:
+            self.__source = Group.__serialize(block, definitions)
+
+    def get_writes(self) -> set:
+        return self.__writes
+
+    def is_remote(self) -> bool:
+        """
+        :return: True, pokud se skupina vyplatí (a lze ji) poslat jinému procesu.
+        """
+        return self.__source is not None
+
+    def run(self, symbol_table: dict) -> None:
+        self.__code(symbol_table)
+
+    def submit(self, pool: ProcessPoolExecutor, backend: str, symbol_table: dict):
+        """
+        Pošle skupinu ke zpracování jinému procesu spolu s hodnotami
+        proměnných, které skupina čte nebo zapisuje.
+
+        :return: Future, jejímž výsledkem jsou nové hodnoty zapsaných proměnných.
+        """
+        values = {name: flatten(symbol_table[name]) for name in self.__reads | self.__writes if name in symbol_table}
+        return pool.submit(run_group, self.__source, backend, values, tuple(self.__writes))
+
+    @staticmethod
+    def __serialize(block: ASTNodeProg, definitions: list):
+        from Serializer import dumps
+
+        called = set()
+        stack = [block]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ASTNodeCall) and node.get_function() not in called:
+                called.add(node.get_function())
+                stack.append(node.get_function().get_body())
+            stack.extend(Optimizer.children(node))
+        program = Optimizer.block([d for d in definitions if d in called] + block.get_expressions())
+        try:
+            return dumps(program)
+        except (TypeError, ValueError):
+            # Uzel, který nelze zapsat, skupina se proto vykoná zde.
+            return None
+
+
+class ParallelProgram:
+    """
+    Program, jehož nezávislé příkazy nejvyšší úrovně se vykonávají souběžně
+
+    Program se rozdělí na úseky. Příkazy se vstupem nebo výstupem (print,
+    read) tvoří sériové úseky a vykonávají se v pořadí programu. Souvislé
+    řady ostatních příkazů se rozdělí na nezávislé skupiny (viz
+    dependency_groups). Náročné skupiny (s cyklem nebo voláním funkce) se
+    pošlou pracovním procesům, ostatní se mezitím vykonají zde. Nové hodnoty
+    zapsaných proměnných se poté vrátí do tabulky symbolů. Další úsek začíná
+    až po dokončení všech skupin, výstup je proto stejný jako při sériovém běhu.
+
+    Pokud některá skupina selže, tabulka symbolů se vrátí do stavu před
+    úsekem a úsek se vykoná sériově. Chyba tak nastane na stejném místě a
+    se stejnými účinky jako při sériovém běhu.
+    """
+
+    def __init__(self, ast: ASTNode, compile: Callable, backend: str, workers: int):
+        """
+        Konstruktor
+
+        :param ast: Kořen syntaktického stromu.
+        :param compile: Překlad (části) programu na funkci přijímající
+        tabulku symbolů (viz Interpreter.BACKENDS).
+        :param backend: Název backendu, kterým skupiny vykonávají pracovní procesy.
+        :param workers: Počet pracovních procesů.
+        """
+        self.__backend = backend
+        self.__workers = workers
+        self.__segments = []
+        if isinstance(ast, ASTNodeProg) is False:
+            self.__segments.append((compile(ast), None))
+            return
+
+        definitions = [e for e in ast.get_expressions() if isinstance(e, ASTNodeFunctionDef)]
+        serial = []
+        pure = []
+        for index, node in enumerate(ast.get_expressions()):
+            statement = Statement(node, index)
+            if statement.has_io():
+                self.__add_pure(pure, serial, compile, definitions)
+                pure = []
+                serial.append(node)
+            else:
+                pure.append(statement)
+        self.__add_pure(pure, serial, compile, definitions)
+        self.__add_serial(serial, compile)
+
+    def get_segments(self) -> list:
+        """
+        :return: Úseky programu jako dvojice (sériová closure, None) nebo
+        (closure úseku, skupiny).
+        """
+        return self.__segments
+
+    def __add_pure(self, pure: list, serial: list, compile: Callable, definitions: list) -> None:
+        if sum(1 for s in pure if s.is_heavy()) < MIN_HEAVY_GROUPS:
+            serial.extend(s.get_node() for s in pure)
+            return
+
+        groups = [Group(group, compile, definitions) for group in dependency_groups(pure)]
+        if sum(1 for g in groups if g.is_remote()) < MIN_HEAVY_GROUPS:
+            serial.extend(s.get_node() for s in pure)
+            return
+
+        self.__add_serial(serial, compile)
+        serial.clear()
+        self.__segments.append((compile(Optimizer.block([s.get_node() for s in pure])), groups))
+
+    def __add_serial(self, serial: list, compile: Callable) -> None:
+        if serial:
+            self.__segments.append((compile(Optimizer.block(list(serial))), None))
+
+    def run(self, symbol_table: dict) -> None:
+        for code, groups in self.__segments:
+            if groups is None:
+                code(symbol_table)
+            else:
+                self.__run_groups(code, groups, symbol_table)
+
+    def __run_groups(self, code: Callable, groups: list, symbol_table: dict) -> None:
+        writes = set().union(*(g.get_writes() for g in groups))
+        saved = {name: symbol_table[name] for name in writes if name in symbol_table}
+        futures = []
+        try:
+            pool = get_pool(self.__workers)
+            # Jednu náročnou skupinu vykoná tento proces sám.
+            remote = [g for g in groups if g.is_remote()][1:]
+            futures = [g.submit(pool, self.__backend, symbol_table) for g in remote]
+            for group in groups:
+                if group not in remote:
+                    group.run(symbol_table)
+            for future in futures:
+                symbol_table.update(future.result())
+        except Exception:
+            # Skupiny, které ještě nezačaly, se zruší, úsek se vykoná celý zde.
+            for future in futures:
+                future.cancel()
+            for name in writes - saved.keys():
+                symbol_table.pop(name, None)
+            symbol_table.update(saved)
+            code(symbol_table)
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Vrátí (a případně vytvoří) skupinu pracovních procesů.
+
+    Procesy nevznikají rozvětvením (fork) hostitelského procesu, který už
+    může mít spuštěná vlákna (asyncio, souběžné běhy programu), ale
+    rozvětvením jednovláknového forkserveru s předem načteným interpretem
+    (viz PRELOAD). Kde forkserver není k dispozici, procesy se spustí znovu
+    (spawn). Skupiny se ukončí při ukončení interpretu Pythonu nebo voláním
+    shutdown_pools().
+    """
+    if workers not in _pools:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(PRELOAD)
+        else:
+            context = multiprocessing.get_context("spawn")
+        _pools[workers] = ProcessPoolExecutor(workers, context)
+    return _pools[workers]
+
+
+@atexit.register
+def shutdown_pools() -> None:
+    """
+    Ukončí všechny skupiny pracovních procesů. Další souběžný běh si
+    vytvoří nové.
+    """
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_group(source: str, backend: str, values: dict, writes: tuple) -> dict:
+    """
+    Vykoná skupinu příkazů v pracovním procesu.
+
+    :param source: Skupina zapsaná jako S-výraz (viz Serializer).
+    :param backend: Název backendu (viz Interpreter.BACKENDS).
+    :param values: Hodnoty proměnných, které skupina čte nebo zapisuje.
+    :param writes: Proměnné, do kterých skupina zapisuje.
+    :return: Hodnoty zapsaných proměnných po vykonání skupiny.
+    """
+    key = (source, backend)
+    program = _programs.get(key)
+    if program is None:
+        from Interpreter import Interpreter
+        from Serializer import loads
+
+        program = _programs[key] = Interpreter.BACKENDS[backend](loads(source), False)
+        if len(_programs) > MAX_PROGRAMS:
+            _programs.popitem(last=False)
+    else:
+        _programs.move_to_end(key)
+    table = SymbolTable(values)
+    program(table)
+    return {name: flatten(table[name]) for name in writes if name in table}
+
+
+def compile_parallel(ast: ASTNode, compile: Callable, backend: str, workers: int) -> Callable[[dict], None]:
+    """
+    Přeloží program tak, aby nezávislé příkazy nejvyšší úrovně vykonával souběžně.
+
+    :param ast: Kořen syntaktického stromu.
+    :param compile: Překlad programu na funkci přijímající tabulku symbolů.
+    :param backend: Název backendu pracovních procesů.
+    :param workers: Počet pracovních procesů.
+    :return: Funkce, jejíž zavolání s tabulkou symbolů program spustí.
+    """
+    return ParallelProgram(ast, compile, backend, workers).run
@@ -0,0 +1,148 @@
+"""Délka, od které se výsledek spojení dvou řetězců ukládá jako Rope."""
+ROPE_THRESHOLD = 256
+
+
+class Rope:
+    """
+    Řetězec vzniklý opakovaným spojováním, který se skutečně spojí až ve
+    chvíli, kdy je potřeba jeho hodnota
+
+    Části řetězce se ukládají do seznamu, který mohou sdílet i kratší Rope
+    vzniklé dříve (každá Rope zná jen počet svých částí). Připojení k
+    nejdelší Rope nad daným seznamem tak jen přidá další část, takže
+    hromadění řetězce v cyklu (s = s + "...") trvá lineárně dlouho místo
+    kvadraticky. Při výpisu, porovnání nebo indexování se Rope spojí do
+    obyčejného řetězce a výsledek se uloží.
+
+    Všechny operace, které Rope nepodporuje přímo, se provedou nad spojeným
+    řetězcem, takže se Rope chová (včetně chyb) stejně jako str.
+    """
+
+    __slots__ = ("__parts", "__count", "__length", "__flat")
+
+    def __init__(self, parts: list, count: int, length: int):
+        """
+        Konstruktor
+
+        :param parts: Seznam částí (může být sdílený s jinými Rope).
+        :param count: Počet částí seznamu, které patří této Rope.
+        :param length: Délka řetězce.
+        """
+        self.__parts = parts
+        self.__count = count
+        self.__length = length
+        self.__flat = None
+
+    def append(self, other):
+        """
+        Vrátí novou Rope s připojeným řetězcem. Tato Rope se nemění.
+        """
+        if type(other) is Rope:
+            other = other.flatten()
+        elif type(other) is not str:
+            return self.flatten() + other
+
+        parts = self.__parts
+        if self.__count != len(parts):
+            # Seznam už prodloužila jiná Rope, tato musí dostat vlastní.
+            parts = parts[:self.__count]
+        parts.append(other)
+        return Rope(parts, len(parts), self.__length + len(other))
+
+    def flatten(self) -> str:
+        """
+        :return: Hodnota jako obyčejný řetězec.
+        """
+        if self.__flat is None:
+            parts = self.__parts
+            self.__flat = "".join(parts if self.__count == len(parts) else parts[:self.__count])
+        return self.__flat
+
+    def __add__(self, other):
+        return self.append(other)
+
+    def __radd__(self, other):
+        return other + self.flatten()
+
+    def __mul__(self, other):
+        return self.flatten() * other
+
+    def __rmul__(self, other):
+        return other * self.flatten()
+
+    def __sub__(self, other):
+        return self.flatten() - other
+
+    def __rsub__(self, other):
+        return other - self.flatten()
+
+    def __truediv__(self, other):
+        return self.flatten() / other
+
+    def __rtruediv__(self, other):
+        return other / self.flatten()
+
+    def __eq__(self, other):
+        if type(other) is Rope:
+            return self.__length == other.__length and self.flatten() == other.flatten()
+        if type(other) is str:
+            return self.__length == len(other) and self.flatten() == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __lt__(self, other):
+        return self.flatten() < flatten(other)
+
+    def __le__(self, other):
+        return self.flatten() <= flatten(other)
+
+    def __gt__(self, other):
+        return self.flatten() > flatten(other)
+
+    def __ge__(self, other):
+        return self.flatten() >= flatten(other)
+
+    def __hash__(self):
+        return hash(self.flatten())
+
+    def __bool__(self):
+        return self.__length > 0
+
+    def __len__(self):
+        return self.__length
+
+    def __getitem__(self, index):
+        return self.flatten()[index]
+
+    def __str__(self):
+        return self.flatten()
+
+    def __repr__(self):
+        return repr(self.flatten())
+
+    def __format__(self, format_spec):
+        return format(self.flatten(), format_spec)
+
+
+def concat(x, y):
+    """
+    Operátor + jazyka. Spojení dlouhých řetězců vrací jako Rope, ostatní
+    operandy sčítá běžným způsobem.
+    """
+    if type(x) is Rope:
+        return x.append(y)
+    if type(x) is str and type(y) is str and len(x) + len(y) >= ROPE_THRESHOLD:
+        return Rope([x, y], 2, len(x) + len(y))
+    return x + y
+
+
+def flatten(value):
+    """
+    Převede Rope na obyčejný řetězec, ostatní hodnoty vrátí beze změny.
+    """
+    if type(value) is Rope:
+        return value.flatten()
+    return value
@@ -0,0 +1,509 @@
+import gc
+import io
+import json
+import re
+from typing import TextIO
+
+from AST import *
+
+"""Podporované formáty: S-výrazy a JSON Lines (jeden uzel na řádek)."""
+FORMATS = ("sexpr", "jsonl")
+
+"""Počet kusů textu, po jejichž nashromáždění se zapisuje do souboru."""
+WRITE_BATCH = 4096
+
+"""Velikost bloku, po kterém se čte ze souboru."""
+READ_CHUNK = 65536
+
+"""Celá čísla s více bity se zapisují jako šestnáctkový řetězec (viz atom)."""
+BIG_INT_BITS = 2048
+
+"""Pomocná konstanta se značkami uzlů (název třídy bez předpony ASTNode)."""
+NODE_TYPES = {cls.__name__[len("ASTNode"):]: cls for cls in (
+    ASTNodeProg, ASTNodeCondStatement, ASTNodeTernStatement, ASTNodeWhileLoop,
+    ASTNodeIdent, ASTNodeReadKeyword, ASTNodePrintKeyword,
+    ASTNodeBoolConst, ASTNodeNumConst, ASTNodeFloatConst, ASTNodeStringConst,
+    ASTNodeOpAssign, ASTNodeOpSum, ASTNodeOpSub, ASTNodeOpMul, ASTNodeOpDiv,
+    ASTNodeOpAnd, ASTNodeOpOr, ASTNodeOpGrThan, ASTNodeOpGrOrEqual, ASTNodeOpEqual,
+    ASTNodeOpNotEq, ASTNodeOpLess, ASTNodeOpLesOrEqual, ASTNodeOpNot,
+    ASTNodeFunctionDef, ASTNodeCall, ASTNodeReturn
+)}
+
+"""
+Lexém S-výrazu: závorka, řetězec v uvozovkách, atom nebo jiný znak (chyba).
+Řetězec může být neukončený, pokud ho rozdělil konec bloku čteného souboru.
+"""
+_SEXPR_TOKEN = re.compile(r'\s*(?:([()])|("(?:[^"\\]|\\.?)*"?)|([^\s()"]+)|(\S))')
+
+"""Značka na zásobníku zápisu S-výrazu, která uzavírá blok (viz ASTWriter)."""
+_CLOSE = object()
+
+"""Cache druhů uzlů podle třídy (viz describe)."""
+_kinds = {}
+
+
+def tag(cls: type):
+    """
+    :return: Značka nejbližší předkové třídy, kterou lze zapsat, nebo None.
+    """
+    for base in cls.__mro__:
+        name = base.__name__[len("ASTNode"):]
+        if NODE_TYPES.get(name) is base:
+            return name
+    return None
+
+
+def original(node: ASTNode) -> ASTNode:
+    """
+    Vrátí uzel, který obalující uzel (memoizovaný výraz, adaptivní operátor)
+    zastupuje, jinak uzel samotný.
+    """
+    if type(node) in _kinds or tag(type(node)) is not None:
+        return node
+
+    from Adaptive import ASTNodeAdaptiveBinaryOp
+    from Memoization import ASTNodeMemo
+
+    if isinstance(node, ASTNodeMemo):
+        return original(node.get_expression())
+    if isinstance(node, ASTNodeAdaptiveBinaryOp):
+        return original(node.get_generic())
+    return node
+
+
+def describe(node: ASTNode) -> tuple:
+    """
+    Vrátí značku a druh uzlu. Specializované uzly (např. z typové inference)
+    se zapíší jako uzel, ze kterého vznikly, obalující uzly je třeba předem
+    nahradit funkcí original().
+
+    Výsledek se ukládá podle třídy uzlu, protože isinstance() nad
+    abstraktními třídami je pomalé.
+
+    :return: Dvojice (značka, druh).
+    :raises ValueError: Pokud uzel nelze zapsat.
+    """
+    cls = type(node)
+    if cls in _kinds:
+        return _kinds[cls]
+
+    name = tag(cls)
+    if name is None:
+        raise ValueError("Cannot serialize node {:s}".format(cls.__name__))
+
+    if isinstance(node, ASTNodeProg):
+        kind = "prog"
+    elif isinstance(node, ASTNodeCondStatement):
+        kind = "cond"
+    elif isinstance(node, ASTNodeTernStatement):
+        kind = "tern"
+    elif isinstance(node, ASTNodeWhileLoop):
+        kind = "while"
+    elif isinstance(node, ASTNodeBinaryOp):
+        kind = "binary"
+    elif isinstance(node, ASTNodeUnaryOp):
+        kind = "unary"
+    elif isinstance(node, (ASTNodeReadKeyword, ASTNodePrintKeyword)):
+        kind = "keyword"
+    elif isinstance(node, ASTNodeIdent):
+        kind = "ident"
+    elif isinstance(node, ASTNodeFunctionDef):
+        kind = "function"
+    elif isinstance(node, ASTNodeCall):
+        kind = "call"
+    elif isinstance(node, ASTNodeReturn):
+        kind = "return"
+    else:
+        kind = "const"
+    _kinds[cls] = name, kind
+    return name, kind
+
+
+def children(node: ASTNode, kind: str) -> list:
+    """
+    :return: Potomci uzlu v pořadí, ve kterém se zapisují.
+    """
+    if kind == "binary":
+        return [node.get_left_child(), node.get_right_child()]
+    if kind == "prog":
+        return node.get_expressions()
+    if kind == "cond":
+        if node.get_else() is None:
+            return [node.get_condition(), node.get_then()]
+        return [node.get_condition(), node.get_then(), node.get_else()]
+    if kind == "tern":
+        return [node.get_condition(), node.get_then(), node.get_else()]
+    if kind == "while":
+        return [node.get_condition(), node.get_body()]
+    if kind == "unary":
+        return [node.get_child()]
+    if kind == "keyword":
+        return [node.get_expression()]
+    if kind == "call":
+        return node.get_arguments()
+    if kind == "function":
+        # Parametry se zapisují jako proměnné před tělem funkce.
+        return [ASTNodeIdent(name) for name in node.get_parameters()] + [node.get_body()]
+    if kind == "return":
+        return [] if node.get_expression() is None else [node.get_expression()]
+    return []
+
+
+def atom(node: ASTNode, kind: str) -> str:
+    """
+    :return: Hodnota listu (jméno proměnné nebo konstanta) zapsaná jako
+    JSON, případně None.
+    """
+    if kind in ("ident", "function", "call"):
+        return json.dumps(node.get_name())
+    if kind == "const":
+        value = node.get_value()
+        if type(value) is int and value.bit_length() > BIG_INT_BITS:
+            # Převod velkého čísla na desítkový zápis je v Pythonu omezen
+            # (sys.get_int_max_str_digits()), zapíše se proto jako
+            # šestnáctkový řetězec.
+            return json.dumps(hex(value))
+        return json.dumps(value)
+    return None
+
+
+def parse_atom(kind: int, text: str):
+    """
+    Převede lexém S-výrazu (2 řetězec, 3 ostatní atomy) na hodnotu listu.
+
+    :raises ValueError: Pokud lexém není platná hodnota.
+    """
+    if kind == 2 and len(text) >= 2 and text[-1] == '"' and "\\" not in text:
+        return text[1:-1]
+    if kind == 3 and text.isdigit():
+        return int(text)
+    try:
+        return json.loads(text)
+    except ValueError:
+        raise ValueError("Invalid atom {:s}".format(text)) from None
+
+
+def build(name: str, atom_value, nodes: list, functions: dict = None) -> ASTNode:
+    """
+    Vytvoří uzel ze značky, hodnoty listu a již vytvořených potomků.
+
+    :param functions: Tabulka funkcí načítaného programu. Definice funkcí se
+    do ní zapisují a volání ji sdílí.
+    :raises ValueError: Pokud značka nebo počet potomků neodpovídá žádnému uzlu.
+    """
+    cls = NODE_TYPES.get(name)
+    if cls is None:
+        raise ValueError("Unknown node '{:s}'".format(name))
+    try:
+        if cls is ASTNodeProg:
+            root = ASTNodeProg()
+            for e in nodes:
+                root.add_expression(e)
+            return root
+        if cls is ASTNodeCondStatement:
+            root = ASTNodeCondStatement(*nodes[:2])
+            if len(nodes) == 3:
+                root.set_else(nodes[2])
+            elif len(nodes) != 2:
+                raise TypeError
+            return root
+        if cls is ASTNodeFunctionDef:
+            if type(atom_value) is not str or not nodes \
+                    or not all(type(p) is ASTNodeIdent for p in nodes[:-1]):
+                raise TypeError
+            root = ASTNodeFunctionDef(atom_value, [p.get_name() for p in nodes[:-1]], nodes[-1])
+            if functions is not None:
+                functions[atom_value] = root
+            return root
+        if cls is ASTNodeCall:
+            if type(atom_value) is not str:
+                raise TypeError
+            return ASTNodeCall(atom_value, nodes, {} if functions is None else functions)
+        if cls is ASTNodeReturn:
+            return ASTNodeReturn(*nodes)
+        if cls is ASTNodeNumConst and type(atom_value) is str:
+            if nodes:
+                raise TypeError
+            return cls(int(atom_value, 16))
+        if cls is ASTNodeIdent or issubclass(cls, ASTNodeConstant):
+            if nodes:
+                raise TypeError
+            return cls(atom_value)
+        return cls(*nodes)
+    except (TypeError, ValueError):
+        raise ValueError("Malformed node '{:s}'".format(name)) from None
+
+
+class ASTWriter:
+    """
+    Proudový zápis syntaktického stromu do souboru
+
+    Strom se prochází s explicitním zásobníkem, takže hloubka stromu není
+    omezena hloubkou rekurze Pythonu. Text se zapisuje průběžně po dávkách,
+    v paměti tedy nikdy není celý výstup.
+
+    Formát "sexpr" zapíše strom jako S-výraz, např. (Assign (Ident "x")
+    (NumConst 1)), příkazy bloku jsou každý na vlastním řádku. Formát "jsonl"
+    zapíše každý uzel jako objekt JSON na samostatný řádek, v pořadí
+    preorder; uzel nese počet svých potomků, hodnotu listu a pozici ve
+    zdrojovém kódu.
+    """
+
+    def __init__(self, file: TextIO, format: str = "sexpr"):
+        """
+        Konstruktor
+
+        :param file: Objekt s metodou write(), kam se strom zapisuje.
+        :param format: Formát zápisu ("sexpr" nebo "jsonl").
+        """
+        if format not in FORMATS:
+            raise ValueError("Unknown format '{:s}'".format(format))
+        self.__file = file
+        self.__format = format
+        self.__pending = []
+
+    def write(self, ast: ASTNode) -> int:
+        """
+        Zapíše strom.
+
+        :param ast: Kořen syntaktického stromu.
+        :return: Počet zapsaných uzlů.
+        """
+        if self.__format == "sexpr":
+            count = self.__write_sexpr(ast)
+        else:
+            count = self.__write_jsonl(ast)
+        self.__flush()
+        return count
+
+    def __flush(self) -> None:
+        if self.__pending:
+            self.__file.write("".join(self.__pending))
+            self.__pending.clear()
+
+    def __write_sexpr(self, ast: ASTNode) -> int:
+        count = 0
+        pending = self.__pending
+        # Položky zásobníku jsou uzly, hotový text (oddělovače a uzavírací
+        # závorky) nebo značka _CLOSE, která uzavírá blok.
+        stack = [ast]
+        depth = 0
+        while stack:
+            item = stack.pop()
+            if item is _CLOSE:
+                depth -= 1
+                pending.append("\n" + "  " * depth + ")")
+                continue
+            if type(item) is str:
+                pending.append(item)
+                continue
+
+            count += 1
+            item = original(item)
+            name, kind = describe(item)
+            value = atom(item, kind)
+            pending.append("(" + name if value is None else "(" + name + " " + value)
+            if kind == "prog":
+                # Příkazy bloku jsou každý na vlastním řádku.
+                depth += 1
+                indent = "\n" + "  " * depth
+                stack.append(_CLOSE)
+                for e in reversed(item.get_expressions()):
+                    stack.append(e)
+                    stack.append(indent)
+            else:
+                stack.append(")")
+                for e in reversed(children(item, kind)):
+                    stack.append(e)
+                    stack.append(" ")
+            if len(pending) >= WRITE_BATCH:
+                self.__flush()
+        return count
+
+    def __write_jsonl(self, ast: ASTNode) -> int:
+        count = 0
+        pending = self.__pending
+        stack = [ast]
+        while stack:
+            node = original(stack.pop())
+            count += 1
+            name, kind = describe(node)
+            nodes = children(node, kind)
+            line, column = node.get_position()
+            text = '{"node": "' + name + '"'
+            if nodes:
+                text += ', "children": ' + str(len(nodes))
+            value = atom(node, kind)
+            if value is not None:
+                text += ', "value": ' + value
+            if line is not None:
+                text += ', "line": {:d}, "column": {:d}'.format(line, column)
+            pending.append(text + "}\n")
+            stack.extend(reversed(nodes))
+            if len(pending) >= WRITE_BATCH:
+                self.__flush()
+        return count
+
+
+class ASTReader:
+    """
+    Proudové načtení syntaktického stromu zapsaného třídou ASTWriter
+
+    Soubor se čte po blocích a strom se skládá s explicitním zásobníkem
+    rozpracovaných uzlů, takže ani načtení velmi hlubokého stromu nezávisí
+    na hloubce rekurze Pythonu.
+    """
+
+    def __init__(self, file: TextIO, format: str = "sexpr"):
+        """
+        Konstruktor
+
+        :param file: Objekt s metodou read(), ze kterého se strom čte.
+        :param format: Formát zápisu ("sexpr" nebo "jsonl").
+        """
+        if format not in FORMATS:
+            raise ValueError("Unknown format '{:s}'".format(format))
+        self.__file = file
+        self.__format = format
+
+    def read(self) -> ASTNode:
+        """
+        Načte strom.
+
+        :return: Kořen syntaktického stromu.
+        :raises ValueError: Pokud zápis není platný.
+        """
+        # Strom neobsahuje cykly, garbage collector by při načítání jen
+        # opakovaně procházel všechny už vytvořené uzly.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if self.__format == "sexpr":
+                return self.__read_sexpr()
+            return self.__read_jsonl()
+        finally:
+            if enabled:
+                gc.enable()
+
+    def __tokens(self):
+        """
+        Vrací lexémy S-výrazu po blocích jako seznamy dvojic (druh, text), kde
+        druh je 1 pro závorku, 2 pro řetězec, 3 pro atom a 4 pro chybný znak.
+        """
+        buffer = ""
+        end_of_file = False
+        while not end_of_file:
+            chunk = self.__file.read(READ_CHUNK)
+            end_of_file = not chunk
+            text = buffer + chunk
+            matches = list(_SEXPR_TOKEN.finditer(text))
+            if not end_of_file and matches:
+                # Poslední lexém může pokračovat v dalším bloku.
+                buffer = text[matches.pop().start():]
+            else:
+                buffer = ""
+            yield [(m.lastindex, m.group(m.lastindex)) for m in matches]
+
+    def __read_sexpr(self) -> ASTNode:
+        # Rozpracované uzly: [značka, hodnota listu, potomci].
+        stack = []
+        functions = {}
+        root = None
+        expect_tag = False
+        for tokens in self.__tokens():
+            for kind, text in tokens:
+                if root is not None:
+                    raise ValueError("Unexpected text after the tree")
+                if expect_tag:
+                    if kind != 3:
+                        raise ValueError("Node tag expected")
+                    stack.append([text, None, []])
+                    expect_tag = False
+                elif kind == 1:
+                    if text == "(":
+                        expect_tag = True
+                        continue
+                    if not stack:
+                        raise ValueError("Unbalanced ')'")
+                    name, value, nodes = stack.pop()
+                    node = build(name, value, nodes, functions)
+                    if stack:
+                        stack[-1][2].append(node)
+                    else:
+                        root = node
+                elif kind == 4:
+                    raise ValueError("Unexpected character {:s}".format(text))
+                elif stack and stack[-1][1] is None and not stack[-1][2]:
+                    stack[-1][1] = parse_atom(kind, text)
+                else:
+                    raise ValueError("Unexpected atom {:s}".format(text))
+        if root is None:
+            raise ValueError("Unexpected end of input")
+        return root
+
+    def __read_jsonl(self) -> ASTNode:
+        # Rozpracované uzly: [značka, hodnota listu, pozice, zbývající počet potomků, potomci].
+        stack = []
+        functions = {}
+        root = None
+        for number, line in enumerate(self.__file, 1):
+            if not line.strip():
+                continue
+            if root is not None:
+                raise ValueError("Line {:d}: unexpected node after the tree".format(number))
+            try:
+                record = json.loads(line)
+                frame = [record["node"], record.get("value"), (record.get("line"), record.get("column")),
+                         record.get("children", 0), []]
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise ValueError("Line {:d}: malformed record".format(number)) from None
+            stack.append(frame)
+            # Dokončené uzly připojíme k rodičům.
+            while stack and stack[-1][3] == 0:
+                name, value, position, _, nodes = stack.pop()
+                try:
+                    node = build(name, value, nodes, functions)
+                except ValueError as e:
+                    raise ValueError("Line {:d}: {:s}".format(number, str(e))) from None
+                if position[0] is not None:
+                    node.set_position(*position)
+                if stack:
+                    stack[-1][3] -= 1
+                    stack[-1][4].append(node)
+                else:
+                    root = node
+        if root is None:
+            raise ValueError("Unexpected end of input")
+        return root
+
+
+def dump(ast: ASTNode, file: TextIO, format: str = "sexpr") -> int:
+    """
+    Zapíše strom do souboru.
+
+    :return: Počet zapsaných uzlů.
+    """
+    return ASTWriter(file, format).write(ast)
+
+
+def dumps(ast: ASTNode, format: str = "sexpr") -> str:
+    """
+    :return: Strom zapsaný jako řetězec.
+    """
+    output = io.StringIO()
+    ASTWriter(output, format).write(ast)
+    return output.getvalue()
+
+
+def load(file: TextIO, format: str = "sexpr") -> ASTNode:
+    """
+    Načte strom ze souboru.
+    """
+    return ASTReader(file, format).read()
+
+
+def loads(text: str, format: str = "sexpr") -> ASTNode:
+    """
+    Načte strom z řetězce.
+    """
+    return ASTReader(io.StringIO(text), format).read()
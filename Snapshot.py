@@ -0,0 +1,133 @@
+import marshal
+import threading
+from collections import OrderedDict
+
+from SymbolTable import SymbolTable
+
+"""Výchozí nejvyšší počet přeložených programů, které si snímek pamatuje."""
+MAX_PROGRAMS = 256
+
+
+class Snapshot:
+    """
+    Zachycený stav interpretu po vykonání společného úvodu programů
+
+    Snímek obsahuje hodnoty proměnných a cache programů, které už byly nad
+    snímkem přeloženy (a specializovány na typy jeho proměnných). Každý běh
+    nad snímkem začíná s vlastní kopií proměnných, úvod se tedy znovu
+    nevykonává a snímek sám se nemění.
+
+    Hodnoty proměnných jsou neměnné objekty (čísla, pravdivostní hodnoty a
+    řetězce), kopie tabulky symbolů je proto mělká a velmi levná.
+    """
+
+    def __init__(self, interpreter, values: dict, max_programs: int = MAX_PROGRAMS):
+        """
+        Konstruktor
+
+        :param interpreter: Interpret, kterým se překládají programy spouštěné nad snímkem.
+        :param values: Hodnoty proměnných po vykonání úvodu.
+        :param max_programs: Nejvyšší počet přeložených programů v cache
+        snímku. Při jeho překročení se zahodí nejdéle nepoužitý program.
+        """
+        if max_programs < 1:
+            raise ValueError("Program cache size must be positive")
+        self.__interpreter = interpreter
+        self.__values = dict(values)
+        self.__max_programs = max_programs
+        self.__programs = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get_max_programs(self) -> int:
+        return self.__max_programs
+
+    def get_values(self) -> dict:
+        """
+        :return: Kopie hodnot proměnných snímku.
+        """
+        return dict(self.__values)
+
+    def clone(self) -> SymbolTable:
+        """
+        :return: Nová tabulka symbolů se stavem snímku.
+        """
+        return SymbolTable(self.__values)
+
+    def compile(self, source: str, name: str = "<string>"):
+        """
+        Přeloží program, který bude spouštěn nad snímkem.
+
+        Přeložené programy se ukládají do cache snímku (nejvýše max_programs
+        nejdéle nepoužitých), opakovaný překlad téhož zdrojového kódu je proto
+        zdarma. Pokud to interpret umí, specializují se na typy proměnných
+        snímku.
+
+        :param source: Zdrojový kód.
+        :param name: Název programu.
+        :return: Přeložený program.
+        """
+        with self.__lock:
+            program = self.__programs.get(source)
+            if program is not None:
+                self.__programs.move_to_end(source)
+                return program
+        values = self.__values if self.__interpreter.supports_specialization() else None
+        program = self.__interpreter.compile(source, name, values)
+        with self.__lock:
+            self.__programs[source] = program
+            if len(self.__programs) > self.__max_programs:
+                self.__programs.popitem(last=False)
+        return program
+
+    def run(self, program, **kwargs) -> SymbolTable:
+        """
+        Spustí program nad kopií stavu snímku.
+
+        :param program: Přeložený program nebo jeho zdrojový kód.
+        :param kwargs: Další parametry metody Program.run (input, output, limity).
+        :return: Tabulka symbolů po skončení běhu.
+        """
+        if isinstance(program, str):
+            program = self.compile(program)
+        return program.run(self.__values, **kwargs)
+
+    async def run_async(self, program, **kwargs) -> SymbolTable:
+        """
+        Spustí program nad kopií stavu snímku v režimu asyncio.
+
+        :param program: Přeložený program nebo jeho zdrojový kód.
+        :param kwargs: Další parametry metody Program.run_async.
+        :return: Tabulka symbolů po skončení běhu.
+        """
+        if isinstance(program, str):
+            program = self.compile(program)
+        return await program.run_async(self.__values, **kwargs)
+
+    def extend(self, program, **kwargs):
+        """
+        Vykoná nad snímkem další úvod a vrátí z jeho výsledku nový snímek.
+
+        :param program: Přeložený program nebo jeho zdrojový kód.
+        :param kwargs: Další parametry metody Program.run.
+        :return: Nový snímek.
+        """
+        return Snapshot(self.__interpreter, self.run(program, **kwargs), self.__max_programs)
+
+    def dumps(self) -> bytes:
+        """
+        Převede hodnoty proměnných snímku na blob, ze kterého jde snímek
+        rychle obnovit (i v jiném procesu). Přeložené programy se neukládají.
+        """
+        return marshal.dumps(self.__values)
+
+    @staticmethod
+    def loads(interpreter, data: bytes, max_programs: int = MAX_PROGRAMS):
+        """
+        Obnoví snímek z blobu vytvořeného metodou dumps().
+
+        :param interpreter: Interpret, kterým se budou překládat programy.
+        :param data: Blob s hodnotami proměnných.
+        :param max_programs: Nejvyšší počet přeložených programů v cache snímku.
+        :return: Obnovený snímek.
+        """
+        return Snapshot(interpreter, marshal.loads(data), max_programs)
@@ -0,0 +1,113 @@
+import itertools
+import sys
+from typing import Callable, Optional, TextIO
+
+from Budget import Budget
+
+"""Společný zdroj verzí proměnných všech tabulek symbolů (viz SymbolTable.bump_version)."""
+_versions = itertools.count(1)
+
+
+class SymbolTable(dict):
+    """
+    Tabulka symbolů jednoho běhu programu
+
+    Kromě hodnot proměnných nese i vstup a výstup daného běhu, takže více běhů
+    téhož programu (i v různých vláknech) může číst a zapisovat každý jinam.
+    Protože jde o slovník, lze ji předat všude, kde se čeká obyčejná tabulka
+    symbolů.
+    """
+
+    def __init__(self, values: dict = None, input_provider: Callable[[str], str] = None,
+                 output_sink: TextIO = None, budget: Budget = None):
+        """
+        Konstruktor
+
+        :param values: Počáteční hodnoty proměnných.
+        :param input_provider: Funkce, která dostane výzvu a vrátí řádek vstupu.
+        Pokud není zadána, čte se ze standardního vstupu.
+        :param output_sink: Objekt s metodou write(), kam se zapisuje výstup.
+        Pokud není zadán, zapisuje se na standardní výstup.
+        :param budget: Limity běhu. Pokud nejsou zadány, běh není nijak omezen.
+        """
+        super().__init__(values or {})
+        self.__input_provider = input_provider
+        self.__output_sink = output_sink
+        self.__budget = budget
+        # Proměnné, které od vzniku tabulky nikdo nezměnil, mají verzi tabulky.
+        self.__epoch = next(_versions)
+        self.__versions = {}
+
+    def get_input_provider(self) -> Optional[Callable[[str], str]]:
+        return self.__input_provider
+
+    def get_output_sink(self) -> Optional[TextIO]:
+        return self.__output_sink
+
+    def get_budget(self) -> Optional[Budget]:
+        return self.__budget
+
+    def bump_version(self, name: str) -> None:
+        """
+        Zaznamená změnu hodnoty proměnné.
+
+        Verze se berou ze společného čítače, takže jsou jedinečné napříč všemi
+        tabulkami symbolů a běhy. Stejná verze proto vždy znamená stejnou
+        hodnotu proměnné.
+
+        :param name: Jméno změněné proměnné.
+        """
+        self.__versions[name] = next(_versions)
+
+    def get_versions(self, names: tuple) -> tuple:
+        """
+        :param names: Jména proměnných.
+        :return: Aktuální verze zadaných proměnných.
+        """
+        versions = self.__versions
+        epoch = self.__epoch
+        return tuple([versions.get(name, epoch) for name in names])
+
+    def read_line(self, prompt: str) -> str:
+        if self.__input_provider is None:
+            return input(prompt)
+        return self.__input_provider(prompt)
+
+    def write_line(self, text: str) -> None:
+        if self.__budget is not None:
+            self.__budget.charge_output(len(text) + 1)
+        (self.__output_sink or sys.stdout).write(text + "\n")
+
+
+def read_line(symbol_table: dict, prompt: str) -> str:
+    """
+    Přečte řádek vstupu běhu, kterému patří tabulka symbolů.
+
+    Obyčejný slovník nemá vlastní vstup, čte se tedy ze standardního vstupu.
+    """
+    if isinstance(symbol_table, SymbolTable):
+        return symbol_table.read_line(prompt)
+    return input(prompt)
+
+
+def write_line(symbol_table: dict, text: str) -> None:
+    """
+    Zapíše řádek na výstup běhu, kterému patří tabulka symbolů.
+
+    Obyčejný slovník nemá vlastní výstup, zapisuje se na standardní výstup.
+    """
+    if isinstance(symbol_table, SymbolTable):
+        symbol_table.write_line(text)
+    else:
+        print(text)
+
+
+def get_budget(symbol_table: dict) -> Optional[Budget]:
+    """
+    Vrátí limity běhu, kterému patří tabulka symbolů.
+
+    Obyčejný slovník žádné limity nemá.
+    """
+    if isinstance(symbol_table, SymbolTable):
+        return symbol_table.get_budget()
+    return None
@@ -1,3 +1,4 @@
+from Errors import GJKError, LexError, ParseError, CompileError
 from LexicalAnalysis import Tokenizer
 from Tokens import *
 from AST import *
@@ -8,30 +9,113 @@ class Parser:
         AssignOperatorToken: 1,
         OrOperatorToken: 2,
         AndOperatorToken: 3,
+        GreaterThanToken: 5, GreaterOrEqualToken: 5, EqualToken: 5, NotEqualToken: 5,
+        LesserThanToken: 5, LesserOrEqualToken: 5,
         SumOperatorToken: 10, SubOperatorToken: 10, IncrementOpToken: 10, DecrementOpToken: 10,
         MulOperatorToken: 20, DivOperatorToken: 20
     }
 
     def __init__(self, tokenizer: Tokenizer):
         self.__tokenizer = tokenizer
+        self.__errors = []
+        self.__functions = {}
+        self.__calls = []
+        self.__function = None
 
     def parse(self):
-        root = ASTNodeProg()
+        """
+        Provede syntaktickou analýzu celého zdrojového kódu.
+
+        Po chybě se analýza zotaví na nejbližším konci výrazu (;) nebo bloku
+        (}) a pokračuje dál, takže se v jednom průchodu najdou všechny chyby.
 
-        while self.__tokenizer.is_eof() is False:
-            expr = self.parse_expression()
-            if self.__tokenizer.is_eof() is False:
-                if isinstance(self.__tokenizer.peek(), BinaryOperatorToken):
-                    root.add_expression(self.parse_binary_operator(expr))
-                    self.skip(ExprEndToken)               
+        :return: Kořen syntaktického stromu.
+        :raises CompileError: Pokud byla nalezena alespoň jedna chyba.
+        """
+        root = ASTNodeProg()
+        self.__errors = []
+        # Tabulku funkcí sdílí všechna volání v programu.
+        self.__functions = {}
+        self.__calls = []
+
+        while True:
+            try:
+                if self.__tokenizer.is_eof():
+                    break
+                position = self.position()
+                if isinstance(self.__tokenizer.peek(), FunctionKeywordToken):
+                    expr = self.parse_function()
                 else:
-                    root.add_expression(expr)
+                    expr = self.parse_expression()
+                if self.__tokenizer.is_eof() is False:
+                    if isinstance(self.__tokenizer.peek(), BinaryOperatorToken):
+                        expr = self.parse_binary_operator(expr)
                     self.skip(ExprEndToken)
-            else:
+                expr.set_position(*position)
                 root.add_expression(expr)
-
+            except GJKError as e:
+                self.__errors.append(e)
+                self.synchronize(False)
+
+        # Funkce lze volat i před jejich definicí, volání se proto ověří až nakonec.
+        for call in self.__calls:
+            definition = self.__functions.get(call.get_name())
+            if definition is None:
+                self.__errors.append(ParseError("Undefined function {:s}".format(call.get_name()),
+                                                *call.get_position()))
+            elif len(definition.get_parameters()) != len(call.get_arguments()):
+                self.__errors.append(ParseError("Function {:s} expects {:d} arguments, {:d} given".format(
+                    call.get_name(), len(definition.get_parameters()), len(call.get_arguments())),
+                    *call.get_position()))
+
+        if self.__errors:
+            raise CompileError(self.__errors)
         return root
 
+    def position(self) -> tuple:
+        """
+        :return: Pozice (řádek, sloupec) aktuálního tokenu ve zdrojovém kódu.
+        """
+        token = self.__tokenizer.peek()
+        if token is None:
+            return self.__tokenizer.get_position()
+        return token.get_line(), token.get_column()
+
+    def error(self, msg: str) -> ParseError:
+        """
+        Vytvoří výjimku popisující chybu na pozici aktuálního tokenu.
+        """
+        return ParseError(msg, *self.position())
+
+    def synchronize(self, inside_block: bool) -> None:
+        """
+        Přeskočí tokeny až za konec rozpracovaného výrazu.
+
+        Výraz končí středníkem nebo koncem bloku na stejné úrovni zanoření.
+        Uvnitř bloku se konec bloku nepřeskakuje, aby ho mohl zpracovat blok.
+
+        :param inside_block: Zda se zotavujeme uvnitř bloku.
+        """
+        depth = 0
+        while True:
+            try:
+                token = self.__tokenizer.peek()
+                if token is None:
+                    return
+                if isinstance(token, BlockEndToken) and depth == 0 and inside_block:
+                    return
+                self.__tokenizer.next()
+                if isinstance(token, BlockStartToken):
+                    depth += 1
+                elif isinstance(token, BlockEndToken):
+                    if depth == 0:
+                        return
+                    depth -= 1
+                elif isinstance(token, ExprEndToken) and depth == 0:
+                    return
+            except LexError as e:
+                self.__errors.append(e)
+
     def parse_expression(self):
         node = None
         if isinstance(self.__tokenizer.peek(), BoolConstantToken):
@@ -56,18 +140,29 @@ class Parser:
             node = self.parse_ternary()
         if isinstance(self.__tokenizer.peek(), WhileKeywordToken):
             node = self.parse_while()
+        if isinstance(self.__tokenizer.peek(), ReturnKeywordToken):
+            node = self.parse_return()
         if isinstance(self.__tokenizer.peek(), BinaryOperatorToken):
             return self.parse_binary_operator(node)
         if isinstance(self.__tokenizer.peek(), IncrementOperatorToken):
             return self.parse_increment_operator(node)
-        else:
-            return node
+        if node is None:
+            token = self.__tokenizer.peek()
+            if token is None:
+                raise self.error("Unexpected end of file, expression expected")
+            if isinstance(token, FunctionKeywordToken):
+                raise self.error("Functions can only be defined at the top level")
+            raise self.error("Unexpected token {:s}".format(str(token)))
+        return node
 
     def parse_boolean_constant(self):
         return ASTNodeBoolConst(self.__tokenizer.next().get_value())
 
     def parse_numeric_constant(self):
-        return ASTNodeNumConst(self.__tokenizer.next().get_value())
+        token = self.__tokenizer.next()
+        if isinstance(token, FloatConstantToken):
+            return ASTNodeFloatConst(token.get_value())
+        return ASTNodeNumConst(token.get_value())
 
     def parse_string_constant(self):
         return ASTNodeStringConst(self.__tokenizer.next().get_value())
@@ -88,10 +183,13 @@ class Parser:
         return root
 
     def skip(self, token_type):
-        if isinstance(self.__tokenizer.peek(), token_type):           
+        token = self.__tokenizer.peek()
+        if isinstance(token, token_type):
             self.__tokenizer.next()
+        elif token is None:
+            raise self.error("Unexpected end of file, {:s} expected".format(token_type.__name__))
         else:
-            raise TypeError
+            raise self.error("Unexpected token {:s}, {:s} expected".format(str(token), token_type.__name__))
 
     def parse_condition(self):
         self.skip(LeftParToken)
@@ -103,13 +201,18 @@ class Parser:
         self.skip(BlockStartToken)
 
         root = ASTNodeProg()
-        while self.__tokenizer.is_eof() is False \
-                and isinstance(self.__tokenizer.peek(), BlockEndToken) is False:
-            root.add_expression(self.parse_expression())
-            self.skip(ExprEndToken)
-
-        if self.__tokenizer.is_eof():
-            raise EOFError
+        while True:
+            try:
+                if self.__tokenizer.is_eof() or isinstance(self.__tokenizer.peek(), BlockEndToken):
+                    break
+                position = self.position()
+                expr = self.parse_expression()
+                self.skip(ExprEndToken)
+                expr.set_position(*position)
+                root.add_expression(expr)
+            except GJKError as e:
+                self.__errors.append(e)
+                self.synchronize(True)
 
         self.skip(BlockEndToken)
         return root
@@ -128,18 +231,15 @@ class Parser:
             root.add_expression(self.parse_expression())
 
         if self.__tokenizer.is_eof():
-            raise EOFError
+            raise self.error("Unexpected end of file, TernaryDivider expected")
 
         return root
 
     def parse_ternary_false(self):
         self.skip(TernaryDivider)
+        # Nepravdivá větev je jediný výraz, středník za ní ukončuje celý příkaz.
         root = ASTNodeProg()
-        while self.__tokenizer.is_eof() is False and isinstance(self.__tokenizer.peek(), ExprEndToken) is False:
-            root.add_expression(self.parse_expression())
-            self.skip(ExprEndToken)
-            
-
+        root.add_expression(self.parse_expression())
         return root
 
     def parse_ternary(self):
@@ -153,7 +253,7 @@ class Parser:
     def parse_while(self):
         self.__tokenizer.next()
         condition = self.parse_condition()
-        while_block = self.parse_block();
+        while_block = self.parse_block()
 
         root = ASTNodeWhileLoop(condition, while_block)
 
@@ -167,18 +267,24 @@ class Parser:
         elif isinstance(operator, DecrementOpToken):
             node = ASTNodeOpDecr(left_operand)        
         else:
-            raise TypeError
+            raise self.error("Unexpected token {:s}".format(str(operator)))
         return node
 
 
     def parse_binary_operator(self, left_operand: ASTNode):
         operator = self.__tokenizer.next()
+        if left_operand is None:
+            raise ParseError("Expected expression", operator.get_line(), operator.get_column())
         right_operand = self.parse_expression()
+        if right_operand is None:
+            raise self.error("Expected expression")
 
         node = None
         if isinstance(operator, SumOperatorToken):
             node = ASTNodeOpSum(left_operand, right_operand)
         elif isinstance(operator, AssignOperatorToken):
+            if isinstance(left_operand, ASTNodeIdent) is False:
+                raise ParseError("Only a variable can be assigned to", operator.get_line(), operator.get_column())
             node = ASTNodeOpAssign(left_operand, right_operand)
         elif isinstance(operator, SubOperatorToken):
             node = ASTNodeOpSub(left_operand, right_operand)
@@ -204,7 +310,7 @@ class Parser:
             node = ASTNodeOpLesOrEqual(left_operand, right_operand)             
 
         else:
-            raise TypeError
+            raise self.error("Unexpected operator {:s}".format(str(operator)))
 
         if isinstance(self.__tokenizer.peek(), BinaryOperatorToken):
             if self.__precedence[type(operator)] > self.__precedence[type(self.__tokenizer.peek())]:
@@ -217,12 +323,74 @@ class Parser:
 
     def parse_unary_operator(self):            
         if isinstance(self.__tokenizer.peek(), NotOperatorToken):
+            self.__tokenizer.next()
             return ASTNodeOpNot(self.parse_expression())
         else:
-            raise TypeError
+            raise self.error("Unexpected operator {:s}".format(str(self.__tokenizer.peek())))
 
     def parse_identifier(self):
-        return ASTNodeIdent(self.__tokenizer.next().get_name())
+        token = self.__tokenizer.next()
+        if isinstance(self.__tokenizer.peek(), LeftParToken):
+            return self.parse_call(token)
+        return ASTNodeIdent(token.get_name())
+
+    def parse_call(self, name: IdentifierToken):
+        self.skip(LeftParToken)
+        arguments = []
+        if isinstance(self.__tokenizer.peek(), RightParToken) is False:
+            arguments.append(self.parse_expression())
+            while isinstance(self.__tokenizer.peek(), CommaToken):
+                self.__tokenizer.next()
+                arguments.append(self.parse_expression())
+        self.skip(RightParToken)
+
+        node = ASTNodeCall(name.get_name(), arguments, self.__functions)
+        node.set_position(name.get_line(), name.get_column())
+        self.__calls.append(node)
+        return node
+
+    def parse_function(self):
+        self.skip(FunctionKeywordToken)
+        name = self.__tokenizer.peek()
+        self.skip(IdentifierToken)
+        if name.get_name() in self.__functions:
+            raise ParseError("Function {:s} is already defined".format(name.get_name()),
+                             name.get_line(), name.get_column())
+
+        self.skip(LeftParToken)
+        parameters = []
+        if isinstance(self.__tokenizer.peek(), RightParToken) is False:
+            parameters.append(self.parse_parameter(parameters))
+            while isinstance(self.__tokenizer.peek(), CommaToken):
+                self.__tokenizer.next()
+                parameters.append(self.parse_parameter(parameters))
+        self.skip(RightParToken)
+
+        self.__function = name.get_name()
+        try:
+            body = self.parse_block()
+        finally:
+            self.__function = None
+
+        root = ASTNodeFunctionDef(name.get_name(), parameters, body)
+        self.__functions[name.get_name()] = root
+        return root
+
+    def parse_parameter(self, parameters: list) -> str:
+        token = self.__tokenizer.peek()
+        self.skip(IdentifierToken)
+        if token.get_name() in parameters:
+            raise ParseError("Duplicate parameter {:s}".format(token.get_name()),
+                             token.get_line(), token.get_column())
+        return token.get_name()
+
+    def parse_return(self):
+        token = self.__tokenizer.next()
+        if self.__function is None:
+            raise ParseError("Return outside of a function", token.get_line(), token.get_column())
+        if isinstance(self.__tokenizer.peek(), ExprEndToken):
+            return ASTNodeReturn()
+        return ASTNodeReturn(self.parse_expression())
 
     def parse_read_keyword(self):
         self.skip(ReadKeywordToken)
@@ -4,7 +4,18 @@ from abc import ABC
 class Token(ABC):
 
     def __init__(self):
-        pass
+        self.__line = None
+        self.__column = None
+
+    def set_position(self, line: int, column: int) -> None:
+        self.__line = line
+        self.__column = column
+
+    def get_line(self):
+        return self.__line
+
+    def get_column(self):
+        return self.__column
 
     def __str__(self):
         return "<TOKEN type={:s}>".format(str(type(self)))
@@ -32,6 +43,21 @@ class NumericConstantToken(ConstantToken):
         return "<CONST_NUM val='{:d}'>".format(super().get_value())
 
 
+class FloatConstantToken(NumericConstantToken):
+    """
+    Desetinná číselná konstanta
+    """
+
+    def __init__(self, value: float):
+        super().__init__(value)
+
+    def get_value(self) -> float:
+        return float(ConstantToken.get_value(self))
+
+    def __str__(self):
+        return "<CONST_FLOAT val='{!r}'>".format(self.get_value())
+
+
 class StringConstantToken(ConstantToken):
 
     def __init__(self, value: str):
@@ -115,6 +141,24 @@ class ReadKeywordToken(KeywordToken):
         return "<KW_READ>"
 
 
+class FunctionKeywordToken(KeywordToken):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<KW_FUNCTION>"
+
+
+class ReturnKeywordToken(KeywordToken):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<KW_RETURN>"
+
+
 class OperatorToken(Token):
 
     def __init__(self):
@@ -290,6 +334,15 @@ class RightParToken(Token):
         return "<RPAR>"
 
 
+class CommaToken(Token):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<COMMA>"
+
+
 class BlockStartToken(Token):
 
     def __init__(self):
@@ -341,4 +394,37 @@ class TernaryDivider(Token):
         super().__init__()
 
     def __str__(self):
-        return "<DIVTERN>"
\ No newline at end of file
+        return "<DIVTERN>"
+
+
+class WhileKeywordToken(KeywordToken):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<KW_WHILE>"
+
+
+class IncrementOperatorToken(OperatorToken):
+
+    def __init__(self):
+        super().__init__()
+
+
+class IncrementOpToken(IncrementOperatorToken):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<OP_INCREMENT>"
+
+
+class DecrementOpToken(IncrementOperatorToken):
+
+    def __init__(self):
+        super().__init__()
+
+    def __str__(self):
+        return "<OP_DECREMENT>"
@@ -0,0 +1,382 @@
+import inspect
+from typing import Callable, Iterable, TextIO
+
+from AST import *
+from Compiler import ClosureCompiler, Closure
+from Functions import FrameCompiler, Function, resolve, call_site
+from Optimizer import Optimizer
+
+"""Událost: začátek vykonávání příkazu bloku. Údaj události je None."""
+STATEMENT = "statement"
+
+"""Událost: rozhodnutí podmínky příkazu if nebo ternárního příkazu. Údaj je True, pokud se vykoná větev then."""
+BRANCH = "branch"
+
+"""Událost: zápis do proměnné přiřazením. Údaj je zapisovaná hodnota."""
+ASSIGN = "assign"
+
+"""Událost: výpis příkazem print. Údaj je vypisovaný text."""
+PRINT = "print"
+
+"""Událost: čtení příkazem read. Údaj je přečtená (převedená) hodnota."""
+READ = "read"
+
+"""Všechny druhy událostí."""
+EVENTS = (STATEMENT, BRANCH, ASSIGN, PRINT, READ)
+
+
+class Tracer:
+    """
+    Odběr událostí z běhu programu
+
+    Odběratel je funkce callback(událost, uzel, údaj). Uzel je příkaz, který
+    událost vyvolal, jeho pozici ve zdrojovém kódu vrací get_position().
+
+    Program spuštěný s tracerem, který nemá žádné odběratele, běží úplně
+    stejně jako bez něj. Hlášení událostí je totiž přeloženo do zvláštní
+    varianty programu (viz TracingCompiler), kterou Program.run použije, jen
+    když je co hlásit.
+    """
+
+    def __init__(self):
+        """
+        Konstruktor
+        """
+        self.__subscribers = []
+
+    def subscribe(self, callback: Callable, events: Iterable[str] = None) -> None:
+        """
+        Přihlásí odběratele událostí.
+
+        :param callback: Funkce volaná jako callback(událost, uzel, údaj).
+        :param events: Druhy událostí, které chce odběratel dostávat. Pokud
+        nejsou zadány, dostává všechny.
+        """
+        events = EVENTS if events is None else tuple(events)
+        for event in events:
+            if event not in EVENTS:
+                raise ValueError("Unknown event '{:s}'".format(event))
+        self.__subscribers.append((callback, frozenset(events)))
+
+    def unsubscribe(self, callback: Callable) -> None:
+        """
+        Odhlásí odběratele (všechna jeho přihlášení).
+        """
+        self.__subscribers = [s for s in self.__subscribers if s[0] != callback]
+
+    def is_active(self) -> bool:
+        """
+        :return: True, pokud má tracer alespoň jednoho odběratele.
+        """
+        return len(self.__subscribers) > 0
+
+    def emit(self, event: str, node: ASTNode, detail=None) -> None:
+        """
+        Předá událost odběratelům, kteří o ni stojí.
+        """
+        for callback, events in self.__subscribers:
+            if event in events:
+                callback(event, node, detail)
+
+
+class TracingCompiler(ClosureCompiler):
+    """
+    Překladač, jehož closures hlásí události zadanému traceru
+
+    Události se přidávají obalením přeložených uzlů, samotné uzly se
+    překládají stejně jako v ClosureCompiler. Hodnoty podmínek, vypisovaných
+    výrazů a pravých stran přiřazení se hlásí obalením closure potomka (viz
+    observe), takže je lze použít i v překladačích, jejichž closures jsou
+    generátory (TracingFrameCompiler).
+    """
+
+    """Pomocná konstanta s převodem hodnoty potomka na údaj události."""
+    __details = {
+        BRANCH: lambda value: value is True,
+        ASSIGN: lambda value: value,
+        PRINT: str
+    }
+
+    def __init__(self, tracer: Tracer, *args):
+        """
+        Konstruktor
+
+        :param tracer: Tracer, kterému se hlásí události.
+        :param args: Parametry konstruktoru rodičovského překladače.
+        """
+        super().__init__(*args)
+        self.__tracer = tracer
+        self.__observed = {}
+
+    def get_tracer(self) -> Tracer:
+        return self.__tracer
+
+    def observe(self, child: ASTNode, event: str, node: ASTNode) -> None:
+        """
+        Zařídí, aby přeložený potomek po vyhodnocení ohlásil událost uzlu
+        node s údajem odvozeným z hodnoty potomka.
+        """
+        self.__observed[child] = (event, node)
+
+    def compile(self, node: ASTNode):
+        code = super().compile(node)
+        if node not in self.__observed:
+            return code
+
+        event, parent = self.__observed[node]
+        detail = TracingCompiler.__details[event]
+        emit = self.__tracer.emit
+
+        if inspect.isgeneratorfunction(code):
+            def observed_generator(st):
+                value = yield from code(st)
+                emit(event, parent, detail(value))
+                return value
+            return observed_generator
+
+        def observed(st):
+            value = code(st)
+            emit(event, parent, detail(value))
+            return value
+        return observed
+
+    def compile_statement(self, node: ASTNode) -> Closure:
+        code = super().compile_statement(node)
+        emit = self.__tracer.emit
+
+        def statement(st):
+            emit(STATEMENT, node)
+            return code(st)
+        return statement
+
+    def compile_assign(self, node: ASTNodeOpAssign) -> Closure:
+        self.observe(node.get_right_child(), ASSIGN, node)
+        return super().compile_assign(node)
+
+    def compile_if_statement(self, node: ASTNodeCondStatement) -> Closure:
+        self.observe(node.get_condition(), BRANCH, node)
+        return super().compile_if_statement(node)
+
+    def compile_ternary(self, node: ASTNodeTernStatement) -> Closure:
+        self.observe(node.get_condition(), BRANCH, node)
+        return super().compile_ternary(node)
+
+    def compile_print_keyword(self, node: ASTNodePrintKeyword) -> Closure:
+        self.observe(node.get_expression(), PRINT, node)
+        return super().compile_print_keyword(node)
+
+    def compile_read_keyword(self, node: ASTNodeReadKeyword) -> Closure:
+        code = super().compile_read_keyword(node)
+        # Přečtenou hodnotu zjistíme zpětně z proměnné, do které se uložila.
+        value = self.compile_identifier(node.get_expression())
+        emit = self.__tracer.emit
+
+        def read(st):
+            code(st)
+            emit(READ, node, value(st))
+        return read
+
+    def compile_call(self, node: ASTNodeCall) -> Closure:
+        site = call_site(node, self.get_budgeted(), self.__tracer)
+        arguments = tuple(self.compile(a) for a in node.get_arguments())
+        return lambda st: site([a(st) for a in arguments], st)
+
+
+class TracingFrameCompiler(TracingCompiler, FrameCompiler):
+    """
+    Překladač těla funkce, jehož closures hlásí události zadanému traceru
+
+    Funkce volané z těla se také překládají se sledováním.
+    """
+
+    def compile_block_statement(self, node: ASTNode) -> tuple:
+        code, kind = super().compile_block_statement(node)
+        emit = self.get_tracer().emit
+
+        if kind in (1, 3):
+            def statement_generator(f):
+                emit(STATEMENT, node)
+                return (yield from code(f))
+            return statement_generator, kind
+
+        def statement(f):
+            emit(STATEMENT, node)
+            return code(f)
+        return statement, kind
+
+    def generate_assign(self, node: ASTNodeOpAssign):
+        self.observe(node.get_right_child(), ASSIGN, node)
+        return super().generate_assign(node)
+
+    def generate_if_statement(self, node: ASTNode):
+        self.observe(node.get_condition(), BRANCH, node)
+        return super().generate_if_statement(node)
+
+    def generate_print_keyword(self, node: ASTNodePrintKeyword):
+        self.observe(node.get_expression(), PRINT, node)
+        return super().generate_print_keyword(node)
+
+    def resolve_call(self, node: ASTNodeCall) -> Function:
+        return resolve(node, self.get_budgeted(), self.get_tracer())
+
+
+def compile_traced(ast: ASTNode, tracer: Tracer, budgeted: bool = False) -> Closure:
+    """
+    Přeloží program tak, aby hlásil události zadanému traceru.
+
+    :param ast: Kořen syntaktického stromu.
+    :param tracer: Tracer, kterému se hlásí události.
+    :param budgeted: Zda má program započítávat kroky do limitů běhu.
+    :return: Funkce, jejíž zavolání s tabulkou symbolů program spustí.
+    """
+    return TracingCompiler(tracer, budgeted).compile(ast)
+
+
+class Coverage:
+    """
+    Sběr pokrytí řádků a větví programu
+
+    Pokrytí se sbírá z událostí traceru, ke kterému se Coverage přihlásí
+    (viz subscribe). Data se hromadí přes všechny běhy, dokud se nezavolá
+    reset().
+    """
+
+    def __init__(self, ast: ASTNode, name: str = "<string>"):
+        """
+        Konstruktor
+
+        :param ast: Kořen syntaktického stromu sledovaného programu.
+        :param name: Název programu použitý ve zprávě.
+        """
+        self.__name = name
+        self.__lines = set()
+        self.__branches = {}
+        for node in Coverage.statements(ast):
+            line = node.get_position()[0]
+            if line is not None:
+                self.__lines.add(line)
+                if isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+                    self.__branches[node] = line
+        self.__executed = set()
+        self.__taken = {node: set() for node in self.__branches}
+
+    def subscribe(self, tracer: Tracer) -> None:
+        """
+        Přihlásí sběr pokrytí k odběru událostí traceru.
+        """
+        tracer.subscribe(self.record, (STATEMENT, BRANCH))
+
+    def record(self, event: str, node: ASTNode, detail=None) -> None:
+        """
+        Zaznamená událost z běhu programu.
+        """
+        if event == STATEMENT:
+            self.__executed.add(node.get_position()[0])
+        elif node in self.__taken:
+            self.__taken[node].add(detail)
+
+    def reset(self) -> None:
+        """
+        Zapomene všechny zaznamenané události.
+        """
+        self.__executed.clear()
+        for taken in self.__taken.values():
+            taken.clear()
+
+    def get_lines(self) -> list:
+        """
+        :return: Čísla řádků, na kterých začíná některý příkaz.
+        """
+        return sorted(self.__lines)
+
+    def get_missing(self) -> list:
+        """
+        :return: Čísla řádků, na kterých nebyl vykonán žádný příkaz.
+        """
+        return sorted(self.__lines - self.__executed)
+
+    def get_partial_branches(self) -> list:
+        """
+        :return: Dvojice (řádek, vykonané větve) podmínek, u kterých se
+        nevykonaly obě větve. Vykonané větve jsou množina pravdivostních
+        hodnot (True pro then, False pro else).
+        """
+        return sorted(((line, frozenset(self.__taken[node])) for node, line in self.__branches.items()
+                       if len(self.__taken[node]) < 2), key=lambda b: b[0])
+
+    def summary(self) -> dict:
+        """
+        :return: Počty řádků a větví, celkové a pokryté.
+        """
+        return {
+            "lines": len(self.__lines),
+            "covered_lines": len(self.__lines) - len(self.get_missing()),
+            "branches": 2 * len(self.__branches),
+            "covered_branches": sum(len(taken) for taken in self.__taken.values())
+        }
+
+    def report(self) -> str:
+        """
+        Sestaví stručnou zprávu o pokrytí, např.:
+
+            source.gjk: lines 10/12 (83.3 %), branches 3/4 (75.0 %)
+            missing lines: 4-5
+            partial branches: 7 (then only)
+
+        :return: Text zprávy.
+        """
+        s = self.summary()
+        lines = ["{:s}: lines {:d}/{:d} ({:s}), branches {:d}/{:d} ({:s})".format(
+            self.__name, s["covered_lines"], s["lines"], Coverage.__percent(s["covered_lines"], s["lines"]),
+            s["covered_branches"], s["branches"], Coverage.__percent(s["covered_branches"], s["branches"]))]
+        missing = self.get_missing()
+        if missing:
+            lines.append("missing lines: " + ", ".join(Coverage.__ranges(missing)))
+        partial = self.get_partial_branches()
+        if partial:
+            names = {frozenset(): "never", frozenset((True,)): "then only", frozenset((False,)): "else only"}
+            lines.append("partial branches: " + ", ".join("{:d} ({:s})".format(line, names[taken])
+                                                          for line, taken in partial))
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, output: TextIO) -> None:
+        """
+        Zapíše zprávu o pokrytí (viz report) do zadaného výstupu.
+        """
+        output.write(self.report())
+
+    @staticmethod
+    def statements(ast: ASTNode) -> list:
+        """
+        Vrátí všechny příkazy programu včetně příkazů v tělech funkcí.
+        """
+        result = []
+        stack = [ast]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ASTNodeProg):
+                result.extend(node.get_expressions())
+            if isinstance(node, ASTNodeFunctionDef):
+                stack.append(node.get_body())
+            else:
+                stack.extend(Optimizer.children(node))
+        return result
+
+    @staticmethod
+    def __percent(covered: int, total: int) -> str:
+        return "{:.1f} %".format(100 * covered / total) if total else "100.0 %"
+
+    @staticmethod
+    def __ranges(lines: list) -> list:
+        """
+        Zapíše seřazená čísla řádků jako souvislé úseky ("4-6", "10").
+        """
+        ranges = []
+        start = end = lines[0]
+        for line in lines[1:] + [None]:
+            if line is not None and line == end + 1:
+                end = line
+                continue
+            ranges.append(str(start) if start == end else "{:d}-{:d}".format(start, end))
+            start = end = line
+        return ranges
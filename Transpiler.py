@@ -0,0 +1,430 @@
+import contextlib
+import difflib
+import io
+import re
+import sys
+import threading
+import weakref
+from typing import Union
+
+from AST import *
+from Compiler import ClosureCompiler, compile_program
+from Errors import CompileError, GJKError, GJKRuntimeError, ParseError
+from SymbolTable import SymbolTable
+
+
+class Transpiler:
+    """
+    Převádí syntaktický strom na ekvivalentní zdrojový kód v Pythonu
+
+    Proměnné programu se stávají lokálními proměnnými vygenerované funkce,
+    podmínky se převádějí na if/else a výpisy se zapisují do bufferu. Výsledný
+    zdrojový kód se přeloží vestavěnou funkcí compile(), takže program nakonec
+    vykonává přímo interpret Pythonu.
+    """
+
+    """Pomocná konstanta s binárními operátory a jim odpovídajícími operátory Pythonu."""
+    __binary = {
+        ASTNodeOpSum: '+',
+        ASTNodeOpSub: '-',
+        ASTNodeOpMul: '*',
+        ASTNodeOpDiv: '/',
+        ASTNodeOpAnd: 'and',
+        ASTNodeOpOr: 'or',
+        ASTNodeOpGrThan: '>',
+        ASTNodeOpGrOrEqual: '>=',
+        ASTNodeOpEqual: '==',
+        ASTNodeOpNotEq: '!=',
+        ASTNodeOpLess: '<',
+        ASTNodeOpLesOrEqual: '<='
+    }
+
+    """Počet kroků, které vygenerovaný kód nasčítá, než je započítá do limitů běhu."""
+    CHARGE_BATCH = 256
+
+    """Název funkce, do které se program převádí."""
+    FUNCTION_NAME = "gjk_program"
+
+    """Název souboru, pod kterým se vygenerovaný kód překládá."""
+    FILE_NAME = "<gjk:transpiled>"
+
+    def __init__(self, budgeted: bool = False):
+        """
+        Konstruktor
+
+        :param budgeted: Zda má vygenerovaný kód započítávat kroky do limitů běhu.
+        """
+        self.__lines = []
+        self.__names = set()
+        self.__calls = []
+        self.__budgeted = budgeted
+        self.__loops = 0
+        self.__statement_positions = []
+        self.__position = (None, None)
+        self.__positions = ()
+
+    def get_calls(self) -> list:
+        """
+        :return: Volání funkcí v posledním převedeném programu. Vygenerovaný
+        kód je předává funkci __call podle jejich pořadí.
+        """
+        return self.__calls
+
+    def get_positions(self) -> tuple:
+        """
+        :return: Pozice příkazů programu podle řádků vygenerovaného kódu
+        (položka i odpovídá řádku i + 1), případně (None, None).
+        """
+        return self.__positions
+
+    def transpile(self, ast: ASTNode) -> str:
+        """
+        Vygeneruje zdrojový kód funkce, která provádí zadaný program.
+
+        Funkce má parametry (tabulka symbolů, zápis výstupu, vyprázdnění
+        výstupu, čtení vstupu, převod vstupu, započítání kroků, volání funkce).
+        Hodnoty proměnných načte na začátku z tabulky symbolů a na konci (i
+        při chybě) je tam zapíše zpět.
+
+        :param ast: Kořen syntaktického stromu.
+        :return: Zdrojový kód v Pythonu.
+        """
+        self.__lines = []
+        self.__names = set()
+        self.__calls = []
+        self.__statement_positions = []
+        self.emit_statement(ast, 2)
+        body = self.__lines
+
+        names = sorted(self.__names)
+        lines = ["def {:s}(__st, __write, __flush, __input, __convert, __charge, __call):"
+                 .format(Transpiler.FUNCTION_NAME)]
+        for name in names:
+            lines.append("    if {0!r} in __st: {1:s} = __st[{0!r}]".format(name, Transpiler.variable(name)))
+        lines.append("    __pending = 0")
+        lines.append("    try:")
+        header = len(lines)
+        lines.extend(body)
+        if self.__budgeted:
+            # Započítáme i kroky, které nenaplnily celou dávku.
+            lines.append("        if __pending: __charge(__pending)")
+        lines.append("        pass")
+        lines.append("    finally:")
+        lines.append("        __locals = locals()")
+        for name in names:
+            variable = Transpiler.variable(name)
+            lines.append("        if {0!r} in __locals: __st[{1!r}] = __locals[{0!r}]".format(variable, name))
+        lines.append("        pass")
+        unknown = (None, None)
+        self.__positions = (unknown,) * header + tuple(self.__statement_positions) \
+            + (unknown,) * (len(lines) - header - len(body))
+        return "\n".join(lines) + "\n"
+
+    def emit(self, line: str, indent: int) -> None:
+        self.__lines.append("    " * indent + line)
+        self.__statement_positions.append(self.__position)
+
+    def emit_charge(self, steps: Union[int, str], indent: int) -> None:
+        """
+        Vygeneruje započítání kroků. Kroky se sčítají v lokální proměnné a
+        do limitů běhu se předávají až po dávkách.
+        """
+        self.emit("__pending += {}".format(steps), indent)
+        self.emit("if __pending >= {:d}:".format(Transpiler.CHARGE_BATCH), indent)
+        self.emit("__charge(__pending)", indent + 1)
+        self.emit("__pending = 0", indent + 1)
+
+    def emit_budgeted_loop(self, node: ASTNodeWhileLoop, indent: int) -> None:
+        """
+        Vygeneruje cyklus, který započítává své iterace do limitů běhu.
+
+        Iterace se neprovádí příkazem while, ale po dávkách cyklem for přes
+        range(). Krok iterace (i příkazy těla) se tak nepřičítá v každé
+        iteraci, ale za celou dávku najednou, nebo po skončení cyklu podle
+        jejího čítače. Dávka má nejvýše CHARGE_BATCH kroků; bloky vnořené do
+        těla k ní své kroky jen přičtou a do limitů je předá až cyklus.
+        """
+        steps = 1 + node.get_body().get_steps()
+        iterations = max(1, Transpiler.CHARGE_BATCH // steps)
+        # Vnořené cykly mají větší odsazení, a tedy i vlastní čítač.
+        counter = "__iteration{:d}".format(indent)
+        self.emit("while True:", indent)
+        self.emit("for {:s} in range({:d}):".format(counter, iterations), indent + 1)
+        self.emit("if not {:s}: break".format(self.condition(node.get_condition())), indent + 2)
+        self.__loops += 1
+        self.emit_statement(node.get_body(), indent + 2, False)
+        self.__loops -= 1
+        self.emit("else:", indent + 1)
+        self.emit_charge(str(iterations * steps), indent + 2)
+        self.emit("continue", indent + 2)
+        self.emit_charge("{:s} * {:d}".format(counter, steps), indent + 1)
+        self.emit("break", indent + 1)
+
+    def emit_statement(self, node: ASTNode, indent: int, charge: bool = True) -> None:
+        """
+        Vygeneruje příkaz (nebo posloupnost příkazů) odpovídající uzlu.
+
+        :param charge: Zda se mají příkazy bloku započítat do limitů běhu.
+        """
+        if isinstance(node, ASTNodeProg):
+            if len(node.get_expressions()) == 0:
+                self.emit("pass", indent)
+            if self.__budgeted is False or charge is False or node.get_steps() == 0:
+                pass
+            elif self.__loops:
+                # Dávku uvnitř cyklu předá do limitů běhu nejbližší cyklus.
+                self.emit("__pending += {:d}".format(node.get_steps()), indent)
+            else:
+                self.emit_charge(node.get_steps(), indent)
+            for e in node.get_expressions():
+                # Řádky příkazu nesou jeho pozici, aby chyba za běhu ukázala
+                # na stejný příkaz jako při vyhodnocování stromu.
+                outer, self.__position = self.__position, e.get_position()
+                self.emit_statement(e, indent)
+                self.__position = outer
+        elif isinstance(node, ASTNodeOpAssign):
+            name = node.get_left_child().get_name()
+            self.__names.add(name)
+            self.emit("{:s} = {:s}".format(Transpiler.variable(name),
+                                           self.expression(node.get_right_child())), indent)
+        elif isinstance(node, ASTNodeCondStatement):
+            self.emit("if {:s}:".format(self.condition(node.get_condition())), indent)
+            self.emit_statement(node.get_then(), indent + 1)
+            if node.get_else() is not None:
+                self.emit("else:", indent)
+                self.emit_statement(node.get_else(), indent + 1)
+        elif isinstance(node, ASTNodeTernStatement):
+            self.emit("if {:s}:".format(self.condition(node.get_condition())), indent)
+            self.emit_statement(node.get_then(), indent + 1)
+            self.emit("else:", indent)
+            self.emit_statement(node.get_else(), indent + 1)
+        elif isinstance(node, ASTNodeWhileLoop) and self.__budgeted:
+            self.emit_budgeted_loop(node, indent)
+        elif isinstance(node, ASTNodeWhileLoop):
+            self.emit("while {:s}:".format(self.condition(node.get_condition())), indent)
+            self.emit_statement(node.get_body(), indent + 1, False)
+        elif isinstance(node, ASTNodePrintKeyword):
+            self.emit("__write(str({:s}) + '\\n')".format(self.expression(node.get_expression())), indent)
+        elif isinstance(node, ASTNodeReadKeyword):
+            name = node.get_expression().get_name()
+            self.__names.add(name)
+            self.emit("__flush()", indent)
+            self.emit("{:s} = __convert(__input('> '))".format(Transpiler.variable(name)), indent)
+        elif isinstance(node, ASTNodeFunctionDef):
+            self.emit("pass", indent)
+        else:
+            self.emit(self.expression(node), indent)
+
+    def expression(self, node: ASTNode) -> str:
+        """
+        Vygeneruje výraz odpovídající uzlu. Výrazy jsou vždy plně uzávorkované.
+        """
+        if isinstance(node, ASTNodeConstant):
+            return repr(node.get_value())
+        if isinstance(node, ASTNodeIdent):
+            self.__names.add(node.get_name())
+            return Transpiler.variable(node.get_name())
+        if type(node) in Transpiler.__binary:
+            return "({:s} {:s} {:s})".format(self.expression(node.get_left_child()),
+                                             Transpiler.__binary[type(node)],
+                                             self.expression(node.get_right_child()))
+        if isinstance(node, ASTNodeOpNot):
+            return "(not {:s})".format(self.expression(node.get_child()))
+        if isinstance(node, ASTNodeOpAssign):
+            # Vnořené přiřazení (a = b = 3) má stejně jako ve stromu hodnotu None.
+            name = node.get_left_child().get_name()
+            self.__names.add(name)
+            return "({:s} := {:s}, None)[1]".format(Transpiler.variable(name),
+                                                    self.expression(node.get_right_child()))
+        if isinstance(node, ASTNodeCall):
+            # Volaná funkce čte globální proměnné z tabulky symbolů, předají
+            # se jí proto i aktuální hodnoty lokálních proměnných.
+            self.__calls.append(node)
+            return "__call({:d}, locals(), [{:s}])".format(
+                len(self.__calls) - 1, ", ".join(self.expression(a) for a in node.get_arguments()))
+
+        raise CompileError([ParseError("Node {:s} cannot be used as an expression".format(type(node).__name__),
+                                       *self.__position)])
+
+    def condition(self, node: ASTNode) -> str:
+        """
+        Vygeneruje podmínku příkazu if se stejnou sémantikou jako strom, který
+        větví jen při hodnotě rovné True.
+        """
+        if isinstance(node, ASTNodeConstant):
+            return repr(node.get_value() is True)
+        if ClosureCompiler.is_boolean(node):
+            return self.expression(node)
+        if Transpiler.is_constant(node):
+            # Výraz ze samých konstant Python při překladu vyhodnotí a u
+            # výsledného literálu by operátor is vyvolal SyntaxWarning.
+            return "((__condition := {:s}) is True)".format(self.expression(node))
+        return "({:s} is True)".format(self.expression(node))
+
+    @staticmethod
+    def is_constant(node: ASTNode) -> bool:
+        """
+        Zjistí, zda výraz obsahuje jen konstanty a operátory.
+        """
+        if isinstance(node, ASTNodeConstant):
+            return True
+        if isinstance(node, ASTNodeBinaryOp) and isinstance(node, ASTNodeOpAssign) is False:
+            return Transpiler.is_constant(node.get_left_child()) and Transpiler.is_constant(node.get_right_child())
+        if isinstance(node, ASTNodeUnaryOp):
+            return Transpiler.is_constant(node.get_child())
+        return False
+
+    @staticmethod
+    def variable(name: str) -> str:
+        """
+        Vrátí název lokální proměnné Pythonu pro proměnnou programu.
+        """
+        return "v_" + name
+
+
+"""
+Cache přeložených programů (zvlášť bez limitů a s limity běhu). Položka
+zaniká spolu se syntaktickým stromem.
+"""
+_cache = {False: weakref.WeakKeyDictionary(), True: weakref.WeakKeyDictionary()}
+
+"""Zámek cache přeložených programů, aby se jeden program nepřekládal souběžně vícekrát."""
+_cache_lock = threading.Lock()
+
+
+def compile_python(ast: ASTNode, budgeted: bool = False):
+    """
+    Převede program na Python, přeloží ho funkcí compile() a výsledek uloží do cache.
+
+    :param ast: Kořen syntaktického stromu.
+    :param budgeted: Zda má program započítávat kroky do limitů běhu. Takový
+    program musí dostat tabulku symbolů s nastaveným Budget.
+    :return: Funkce přijímající tabulku symbolů, která program spustí.
+    """
+    with _cache_lock:
+        runner = _cache[budgeted].get(ast)
+        if runner is None:
+            runner = _cache[budgeted][ast] = _compile_python(ast, budgeted)
+        return runner
+
+
+def _compile_python(ast: ASTNode, budgeted: bool):
+    transpiler = Transpiler(budgeted)
+    try:
+        source = transpiler.transpile(ast)
+        code = compile(source, Transpiler.FILE_NAME, "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        # Python omezuje zanoření závorek a bloků ve zdrojovém kódu. Program,
+        # který tyto meze překročí, se místo toho přeloží do closures.
+        return compile_program(ast, budgeted)
+
+    sites = ()
+    if transpiler.get_calls():
+        from Functions import call_site
+
+        sites = tuple(call_site(node, budgeted) for node in transpiler.get_calls())
+    namespace = {}
+    exec(code, namespace)
+    function = namespace[Transpiler.FUNCTION_NAME]
+    convert = ASTNodeReadKeyword.convert
+    positions = transpiler.get_positions()
+
+    def run(symbol_table: dict):
+        buffer = []
+        write, charge = buffer.append, None
+        if isinstance(symbol_table, SymbolTable):
+            sink = symbol_table.get_output_sink()
+            read = symbol_table.read_line
+        else:
+            sink, read = None, input
+        if budgeted:
+            budget = symbol_table.get_budget()
+            charge = budget.charge
+
+            def write(text: str):
+                budget.charge_output(len(text))
+                buffer.append(text)
+
+        def flush():
+            if buffer:
+                (sink or sys.stdout).write("".join(buffer))
+                buffer.clear()
+
+        def call(site: int, variables: dict, arguments: list):
+            flush()
+            for name, value in variables.items():
+                if name.startswith("v_"):
+                    symbol_table[name[2:]] = value
+            return sites[site](arguments, symbol_table)
+
+        try:
+            function(symbol_table, write, flush, read, convert, charge, call)
+        except GJKError:
+            raise
+        except UnboundLocalError as e:
+            # Čtení nedefinované proměnné hlásíme stejně jako při vyhodnocování stromu.
+            match = re.search(r"'v_(\w+)'", str(e))
+            raise GJKRuntimeError.from_exception(KeyError(match.group(1) if match else str(e)),
+                                                 error_position(e, positions)) from e
+        except Exception as e:
+            raise GJKRuntimeError.from_exception(e, error_position(e, positions)) from e
+        finally:
+            flush()
+
+    run.source = source
+    return run
+
+
+def error_position(error: Exception, positions: tuple) -> tuple:
+    """
+    Určí pozici příkazu, při kterém ve vygenerovaném kódu nastala chyba.
+
+    :param error: Výjimka vyhozená vygenerovaným kódem.
+    :param positions: Pozice příkazů podle řádků kódu (viz Transpiler.get_positions).
+    :return: Dvojice (řádek, sloupec), případně (None, None).
+    """
+    line = None
+    traceback = error.__traceback__
+    while traceback is not None:
+        if traceback.tb_frame.f_code.co_filename == Transpiler.FILE_NAME:
+            line = traceback.tb_lineno
+        traceback = traceback.tb_next
+    if line is None or line > len(positions):
+        return None, None
+    return positions[line - 1]
+
+
+def verify(ast: ASTNode, input_text: str = "", symbol_table: dict = None) -> str:
+    """
+    Spustí program vyhodnocením stromu i přeloženým kódem a porovná výsledky.
+
+    Oba běhy dostanou stejný vstup a kopii stejné tabulky symbolů. Porovnává
+    se výstup, výsledná tabulka symbolů a případná výjimka.
+
+    :param ast: Kořen syntaktického stromu.
+    :param input_text: Text předaný programu na standardní vstup.
+    :param symbol_table: Počáteční tabulka symbolů.
+    :return: Rozdíl mezi oběma běhy ve formátu unified diff, prázdný řetězec, pokud se shodují.
+    """
+    def capture(runner) -> list:
+        table = dict(symbol_table or {})
+        stdout = io.StringIO()
+        stdin, sys.stdin = sys.stdin, io.StringIO(input_text)
+        error = None
+        try:
+            with contextlib.redirect_stdout(stdout):
+                runner(table)
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            sys.stdin = stdin
+        report = stdout.getvalue().splitlines()
+        report.append("--- symbol table ---")
+        report.extend("{:s} = {!r}".format(k, table[k]) for k in sorted(table))
+        if error is not None:
+            report.append("--- raised {:s} ---".format(error))
+        return report
+
+    expected = capture(ast.evaluate)
+    actual = capture(compile_python(ast))
+    return "\n".join(difflib.unified_diff(expected, actual, "tree-walker", "transpiled", lineterm=""))
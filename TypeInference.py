@@ -0,0 +1,389 @@
+from typing import Optional
+
+from AST import *
+from Adaptive import fast_factory
+from Compiler import ClosureCompiler, Closure
+from Rope import concat
+
+"""
+Typy hodnot jsou reprezentovány přímo třídami Pythonu (int, float, str, bool).
+Neznámý typ (např. hodnota přečtená příkazem read) je reprezentován hodnotou None.
+"""
+NUMERIC = (int, float, bool)
+
+
+#####################################################
+# SPECIALIZED NODES                                 #
+#####################################################
+class ASTNodeTypedBinaryOp(ASTNodeBinaryOp, ABC):
+    """
+    Binární operátor, u kterého jsou typy operandů známé
+
+    Potomci mají operátor Pythonu vložený přímo ve specializované
+    implementaci (viz Adaptive.fast_factory), která čte proměnné a konstanty
+    bez volání jejich uzlů a hlídá typy operandů. Pokud má operand za běhu
+    jiný typ (např. program běží s jinou tabulkou symbolů, než pro kterou byl
+    specializován), výsledek spočítá obecný operátor.
+    """
+
+    """Operátor Pythonu vložený do specializované implementace."""
+    _operator = None
+
+    def __init__(self, left_child: ASTNode, right_child: ASTNode, operand_types: tuple):
+        # Konstruktor obecného operátoru (další třída v MRO) nastaví obecnou funkci operátoru.
+        super().__init__(left_child, right_child)
+        self._left = left_child
+        self._right = right_child
+        self.__operand_types = operand_types
+        if self._operator is not None:
+            factory = fast_factory(self._operator, left_child, right_child)
+            self.evaluate = factory(left_child, right_child, *operand_types, self.get_op())
+
+    def get_operand_types(self) -> tuple:
+        return self.__operand_types
+
+    def get_operator(self) -> Optional[str]:
+        """
+        :return: Operátor Pythonu vložený do specializované implementace,
+        případně None, pokud ji uzel nemá (spojení řetězců).
+        """
+        return self._operator
+
+
+class ASTNodeTypedOpSum(ASTNodeTypedBinaryOp, ASTNodeOpSum):
+    _operator = "+"
+
+
+class ASTNodeTypedOpConcat(ASTNodeTypedBinaryOp, ASTNodeOpSum):
+    """
+    Spojení řetězců. Na rozdíl od sčítání čísel se nevkládá operátor +, ale
+    spojení, které u dlouhých řetězců vytváří Rope.
+    """
+
+    def evaluate(self, symbol_table: dict):
+        return concat(self._left.evaluate(symbol_table), self._right.evaluate(symbol_table))
+
+
+class ASTNodeTypedOpSub(ASTNodeTypedBinaryOp, ASTNodeOpSub):
+    _operator = "-"
+
+
+class ASTNodeTypedOpMul(ASTNodeTypedBinaryOp, ASTNodeOpMul):
+    _operator = "*"
+
+
+class ASTNodeTypedOpDiv(ASTNodeTypedBinaryOp, ASTNodeOpDiv):
+    _operator = "/"
+
+
+class ASTNodeTypedOpGrThan(ASTNodeTypedBinaryOp, ASTNodeOpGrThan):
+    _operator = ">"
+
+
+class ASTNodeTypedOpGrOrEqual(ASTNodeTypedBinaryOp, ASTNodeOpGrOrEqual):
+    _operator = ">="
+
+
+class ASTNodeTypedOpEqual(ASTNodeTypedBinaryOp, ASTNodeOpEqual):
+    _operator = "=="
+
+
+class ASTNodeTypedOpNotEq(ASTNodeTypedBinaryOp, ASTNodeOpNotEq):
+    _operator = "!="
+
+
+class ASTNodeTypedOpLess(ASTNodeTypedBinaryOp, ASTNodeOpLess):
+    _operator = "<"
+
+
+class ASTNodeTypedOpLesOrEqual(ASTNodeTypedBinaryOp, ASTNodeOpLesOrEqual):
+    _operator = "<="
+
+
+#####################################################
+# INFERENCE                                         #
+#####################################################
+class TypeInference:
+    """
+    Statická typová inference nad syntaktickým stromem
+
+    Program se prochází v pořadí vykonávání a pro každou proměnnou se
+    udržuje její typ. Na místech, kde se větve programu spojují, zůstane typ
+    znám jen tehdy, pokud je v obou větvích stejný. Uzly, jejichž typy
+    operandů jsou prokázané, se nahradí specializovanými variantami. Kde jeden
+    operand je proměnná s typem známým až za běhu, předpokládá se u ní typ
+    druhého operandu. Typy hlídají stráže specializovaných uzlů, program proto
+    lze spustit i s hodnotami jiných typů (pak se použijí obecné operátory).
+
+    Původní strom zůstává nezměněn, specializace vytváří strom nový.
+    """
+
+    """Pomocná konstanta s binárními operátory a jim odpovídajícími specializovanými uzly."""
+    __typed = {
+        ASTNodeOpSum: ASTNodeTypedOpSum,
+        ASTNodeOpSub: ASTNodeTypedOpSub,
+        ASTNodeOpMul: ASTNodeTypedOpMul,
+        ASTNodeOpDiv: ASTNodeTypedOpDiv,
+        ASTNodeOpGrThan: ASTNodeTypedOpGrThan,
+        ASTNodeOpGrOrEqual: ASTNodeTypedOpGrOrEqual,
+        ASTNodeOpEqual: ASTNodeTypedOpEqual,
+        ASTNodeOpNotEq: ASTNodeTypedOpNotEq,
+        ASTNodeOpLess: ASTNodeTypedOpLess,
+        ASTNodeOpLesOrEqual: ASTNodeTypedOpLesOrEqual
+    }
+
+    """Typy, na které se vyplatí hlídat proměnné neznámého typu."""
+    __guardable = (int, str, bool)
+
+    def __init__(self, symbol_table: dict = None):
+        """
+        Konstruktor
+
+        :param symbol_table: Tabulka symbolů, se kterou bude program spuštěn.
+        Typy v ní uložených hodnot se použijí jako výchozí typy proměnných.
+        """
+        self.__env = {name: type(value) for name, value in (symbol_table or {}).items()}
+        self.specialized = 0
+        self.guarded = 0
+
+    def specialize(self, node: ASTNode) -> ASTNode:
+        """
+        Vrátí specializovanou kopii zadaného (pod)stromu.
+
+        :param node: Uzel syntaktického stromu.
+        :return: Specializovaný uzel.
+        """
+        return self.__rewrite(node)[0]
+
+    def get_variable_types(self) -> dict:
+        """
+        :return: Typy proměnných po skončení programu (None pro neznámý typ).
+        """
+        return dict(self.__env)
+
+    def __rewrite(self, node: ASTNode) -> tuple:
+        """
+        Odvodí typ uzlu a zároveň uzel přepíše.
+
+        :return: Dvojice (nový uzel, typ výsledku uzlu).
+        """
+        if isinstance(node, ASTNodeProg):
+            prog = ASTNodeProg()
+            for e in node.get_expressions():
+                statement = self.__rewrite(e)[0]
+                statement.set_position(*e.get_position())
+                prog.add_expression(statement)
+            prog.set_steps(node.get_steps())
+            return prog, None
+        if isinstance(node, ASTNodeConstant):
+            return node, type(node.get_value())
+        if isinstance(node, ASTNodeIdent):
+            return node, self.__env.get(node.get_name())
+        if isinstance(node, ASTNodeOpAssign):
+            right, right_type = self.__rewrite(node.get_right_child())
+            self.__env[node.get_left_child().get_name()] = right_type
+            return ASTNodeOpAssign(node.get_left_child(), right), None
+        if isinstance(node, ASTNodeReadKeyword):
+            self.__env[node.get_expression().get_name()] = None
+            return node, None
+        if isinstance(node, ASTNodePrintKeyword):
+            return ASTNodePrintKeyword(self.__rewrite(node.get_expression())[0]), None
+        if isinstance(node, ASTNodeOpNot):
+            return ASTNodeOpNot(self.__rewrite(node.get_child())[0]), bool
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            return self.__rewrite_logical(node)
+        if isinstance(node, ASTNodeCondStatement):
+            return self.__rewrite_if_statement(node)
+        if isinstance(node, ASTNodeTernStatement):
+            return self.__rewrite_ternary(node)
+        if isinstance(node, ASTNodeWhileLoop):
+            return self.__rewrite_while(node)
+        if type(node) in TypeInference.__typed:
+            return self.__rewrite_binary_operator(node)
+        if isinstance(node, (ASTNodeFunctionDef, ASTNodeCall)):
+            # Funkce do proměnných programu nezapisují, jen jejich výsledek je neznámého typu.
+            return node, None
+
+        # Neznámé uzly ponecháme beze změny a nic o nich nepředpokládáme.
+        self.__env = {name: None for name in self.__env}
+        return node, None
+
+    def __rewrite_logical(self, node: ASTNodeBinaryOp) -> tuple:
+        left, left_type = self.__rewrite(node.get_left_child())
+        # Pravý operand se nemusí vyhodnotit, přiřazení v něm proto nejsou jistá.
+        before = dict(self.__env)
+        right, right_type = self.__rewrite(node.get_right_child())
+        self.__env = TypeInference.__merge(before, self.__env)
+
+        result = left_type if left_type == right_type else None
+        return type(node)(left, right), result
+
+    def __rewrite_if_statement(self, node: ASTNodeCondStatement) -> tuple:
+        condition, condition_type = self.__rewrite(node.get_condition())
+        before = dict(self.__env)
+        then = self.__rewrite(node.get_then())[0]
+        after_then, self.__env = self.__env, before
+        otherwise = self.__rewrite(node.get_else())[0] if node.get_else() is not None else None
+        self.__env = TypeInference.__merge(after_then, self.__env)
+
+        root = ASTNodeCondStatement(condition, then)
+        if otherwise is not None:
+            root.set_else(otherwise)
+        return root, None
+
+    def __rewrite_ternary(self, node: ASTNodeTernStatement) -> tuple:
+        condition = self.__rewrite(node.get_condition())[0]
+        before = dict(self.__env)
+        then = self.__rewrite(node.get_then())[0]
+        after_then, self.__env = self.__env, before
+        otherwise = self.__rewrite(node.get_else())[0]
+        self.__env = TypeInference.__merge(after_then, self.__env)
+        return ASTNodeTernStatement(condition, then, otherwise), None
+
+    def __rewrite_while(self, node: ASTNodeWhileLoop) -> tuple:
+        # Typy na začátku iterace musí platit pro všechny iterace, proto tělo
+        # procházíme opakovaně, dokud se typy na začátku cyklu nepřestanou měnit.
+        specialized, guarded = self.specialized, self.guarded
+        entry = dict(self.__env)
+        while True:
+            self.specialized, self.guarded = specialized, guarded
+            self.__env = dict(entry)
+            condition = self.__rewrite(node.get_condition())[0]
+            body = self.__rewrite(node.get_body())[0]
+            merged = TypeInference.__merge(entry, self.__env)
+            if merged == entry:
+                break
+            entry = merged
+        self.__env = entry
+        return ASTNodeWhileLoop(condition, body), None
+
+    def __rewrite_binary_operator(self, node: ASTNodeBinaryOp) -> tuple:
+        left, left_type = self.__rewrite(node.get_left_child())
+        right, right_type = self.__rewrite(node.get_right_child())
+        op = type(node)
+        result = TypeInference.result_type(op, left_type, right_type)
+
+        if result is not None:
+            self.specialized += 1
+            return TypeInference.typed_node(op, left, right, (left_type, right_type)), result
+
+        # Jeden operand je proměnná neznámého typu, druhý má typ známý. Budeme
+        # předpokládat, že proměnná má stejný typ. Předpoklad hlídá stráž
+        # specializovaného uzlu, typ výsledku ale znám není.
+        guessed = False
+        if left_type is None and isinstance(left, ASTNodeIdent) and right_type in TypeInference.__guardable:
+            left_type, guessed = right_type, True
+        elif right_type is None and isinstance(right, ASTNodeIdent) and left_type in TypeInference.__guardable:
+            right_type, guessed = left_type, True
+
+        if guessed and TypeInference.result_type(op, left_type, right_type) is not None:
+            self.guarded += 1
+            return TypeInference.typed_node(op, left, right, (left_type, right_type)), None
+
+        return op(left, right), None
+
+    @staticmethod
+    def typed_node(op: type, left: ASTNode, right: ASTNode, operand_types: tuple) -> ASTNodeTypedBinaryOp:
+        """
+        Vytvoří specializovaný uzel operátoru pro zadané typy operandů.
+        """
+        if op is ASTNodeOpSum and str in operand_types:
+            return ASTNodeTypedOpConcat(left, right, operand_types)
+        return TypeInference.__typed[op](left, right, operand_types)
+
+    @staticmethod
+    def result_type(op: type, left: Optional[type], right: Optional[type]) -> Optional[type]:
+        """
+        Určí typ výsledku operátoru pro zadané typy operandů.
+
+        :return: Typ výsledku, nebo None, pokud typ není znám nebo by operace selhala.
+        """
+        if left is None or right is None:
+            return None
+        numeric = left in NUMERIC and right in NUMERIC
+
+        if op in (ASTNodeOpEqual, ASTNodeOpNotEq):
+            return bool
+        if op in (ASTNodeOpGrThan, ASTNodeOpGrOrEqual, ASTNodeOpLess, ASTNodeOpLesOrEqual):
+            return bool if numeric or left == right == str else None
+        if op is ASTNodeOpDiv:
+            return float if numeric else None
+        if numeric:
+            return float if float in (left, right) else int
+        if op is ASTNodeOpSum and left == right == str:
+            return str
+        if op is ASTNodeOpMul and {left, right} in ({str, int}, {str, bool}):
+            return str
+        return None
+
+    @staticmethod
+    def __merge(first: dict, second: dict) -> dict:
+        """
+        Sloučí typy proměnných ze dvou větví programu.
+        """
+        merged = {}
+        for name in first.keys() | second.keys():
+            merged[name] = first.get(name) if first.get(name) == second.get(name) else None
+        return merged
+
+
+#####################################################
+# COMPILATION                                       #
+#####################################################
+class CompiledOperand:
+    """
+    Přeložený operand specializovaného operátoru, který se vyhodnocuje
+    stejně jako uzel (viz Adaptive.fast_factory)
+    """
+
+    def __init__(self, closure: Closure):
+        self.evaluate = closure
+
+
+class TypedCompiler(ClosureCompiler):
+    """
+    Překladač specializovaného stromu do closures
+
+    Specializované operátory se přeloží na implementaci z Adaptive.fast_factory,
+    takže operátor se spolu s čtením proměnných a konstant vykoná jediným
+    voláním. Operandy, které nejsou proměnnou ani konstantou, se do ní předají
+    přeložené. Ostatní uzly se překládají jako v ClosureCompiler.
+    """
+
+    def compile(self, node: ASTNode) -> Closure:
+        if isinstance(node, ASTNodeTypedBinaryOp) and node.get_operator() is not None:
+            return self.compile_typed_binary_operator(node)
+        return super().compile(node)
+
+    def compile_typed_binary_operator(self, node: ASTNodeTypedBinaryOp) -> Closure:
+        left = self.compile_operand(node.get_left_child())
+        right = self.compile_operand(node.get_right_child())
+        factory = fast_factory(node.get_operator(), left, right)
+        return factory(left, right, *node.get_operand_types(), node.get_op())
+
+    def compile_operand(self, node: ASTNode):
+        if isinstance(node, (ASTNodeConstant, ASTNodeIdent)):
+            return node
+        return CompiledOperand(self.compile(node))
+
+
+def compile_typed(ast: ASTNode, budgeted: bool = False) -> Closure:
+    """
+    Přeloží specializovaný program na jedinou closure (viz TypedCompiler).
+
+    :param ast: Kořen specializovaného syntaktického stromu.
+    :param budgeted: Zda má program započítávat kroky do limitů běhu.
+    :return: Funkce, jejíž zavolání s tabulkou symbolů program spustí.
+    """
+    return TypedCompiler(budgeted).compile(ast)
+
+
+def specialize(ast: ASTNode, symbol_table: dict = None) -> ASTNode:
+    """
+    Provede typovou inferenci a vrátí specializovanou kopii programu.
+
+    :param ast: Kořen syntaktického stromu.
+    :param symbol_table: Tabulka symbolů, se kterou bude program spuštěn.
+    :return: Specializovaný syntaktický strom.
+    """
+    return TypeInference(symbol_table).specialize(ast)
@@ -0,0 +1,414 @@
+import io
+from typing import Callable, Sequence
+
+from AST import *
+from Errors import GJKError
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy je volitelná závislost (pip install numpy), interpret ji jinak
+    # nepotřebuje. Bez ní se každý záznam dávky vyhodnotí zvlášť.
+    np = None
+
+"""Největší celé číslo, které se převodem na float nezmění."""
+EXACT_FLOAT_LIMIT = 2 ** 53
+
+"""Mez, za kterou už výsledek násobení nemusí být v int64 přesný."""
+INT64_SAFE_LIMIT = 2.0 ** 62
+
+
+class NotVectorizable(Exception):
+    """
+    Program obsahuje konstrukci, kterou nelze vyhodnotit po sloupcích
+    """
+    pass
+
+
+class BatchResult:
+    """
+    Výsledek vyhodnocení programu nad dávkou záznamů
+    """
+
+    def __init__(self, outputs: list, errors: dict, fallbacks: int):
+        """
+        Konstruktor
+
+        :param outputs: Výstup programu pro každý záznam.
+        :param errors: Slovník index záznamu -> chyba, kterou běh skončil.
+        :param fallbacks: Počet záznamů, které se vyhodnotily každý zvlášť.
+        """
+        self.__outputs = outputs
+        self.__errors = errors
+        self.__fallbacks = fallbacks
+
+    def get_outputs(self) -> list:
+        return self.__outputs
+
+    def get_errors(self) -> dict:
+        return self.__errors
+
+    def get_fallbacks(self) -> int:
+        return self.__fallbacks
+
+
+class VectorEvaluator:
+    """
+    Vyhodnocení programu nad celou dávkou záznamů najednou
+
+    Každá proměnná je sloupec (pole NumPy) s hodnotou pro každý záznam.
+    Aritmetika a porovnání se počítají po prvcích, podmínky a ternární
+    operátory se vyhodnotí pro všechny záznamy jako výběr podle masky a
+    cykly běží, dokud platí podmínka alespoň pro jeden záznam. Příkaz read
+    čte další řádek vstupu daného záznamu.
+
+    Čísla se ukládají do int64 a float64, pravdivostní hodnoty do bool,
+    všechno ostatní (řetězce, velká čísla, sloupce se smíšenými typy) do
+    polí objektů, na která se operátory aplikují prvek po prvku. Záznamy,
+    u kterých by došlo k chybě nebo u kterých by výsledek v int64 nebyl
+    přesný, se označí jako neplatné a vyhodnotí se znovu každý zvlášť
+    běžným interpretem.
+    """
+
+    def __init__(self, records: Sequence[Sequence[str]], symbol_table: dict = None):
+        """
+        Konstruktor
+
+        :param records: Vstup každého záznamu jako posloupnost řádků.
+        :param symbol_table: Počáteční hodnoty proměnných (stejné pro všechny záznamy).
+        """
+        self.__records = records
+        self.__size = len(records)
+        self.__invalid = np.zeros(self.__size, dtype=bool)
+        self.__consumed = np.zeros(self.__size, dtype=np.int64)
+        self.__inputs = []
+        self.__prints = []
+        self.__values = {}
+        self.__defined = {}
+        for name, value in (symbol_table or {}).items():
+            self.__values[name] = self.column(value)
+            self.__defined[name] = np.ones(self.__size, dtype=bool)
+
+    def get_invalid(self):
+        """
+        :return: Maska záznamů, které je třeba vyhodnotit zvlášť.
+        """
+        return self.__invalid
+
+    def get_outputs(self) -> list:
+        """
+        :return: Výstup každého záznamu.
+        """
+        if len(self.__prints) == 0:
+            return [""] * self.__size
+        columns = []
+        for mask, values in self.__prints:
+            texts = [""] * self.__size
+            selected = np.flatnonzero(mask)
+            for i, value in zip(selected.tolist(), values[selected].tolist()):
+                texts[i] = str(value) + "\n"
+            columns.append(texts)
+        return ["".join(parts) for parts in zip(*columns)]
+
+    #####################################################
+    # STATEMENTS                                        #
+    #####################################################
+    def execute(self, node: ASTNode, mask) -> None:
+        """
+        Vykoná příkaz pro záznamy vybrané maskou.
+        """
+        mask = mask & ~self.__invalid
+        if not mask.any():
+            return
+
+        if isinstance(node, ASTNodeProg):
+            for e in node.get_expressions():
+                self.execute(e, mask)
+        elif isinstance(node, ASTNodeOpAssign):
+            self.assign(node.get_left_child().get_name(), self.evaluate(node.get_right_child(), mask), mask)
+        elif isinstance(node, ASTNodePrintKeyword):
+            value = self.evaluate(node.get_expression(), mask)
+            self.__prints.append((mask & ~self.__invalid, value))
+        elif isinstance(node, ASTNodeReadKeyword):
+            self.assign(node.get_expression().get_name(), self.read(mask), mask)
+        elif isinstance(node, (ASTNodeCondStatement, ASTNodeTernStatement)):
+            condition = self.is_true(self.evaluate(node.get_condition(), mask))
+            self.execute(node.get_then(), mask & condition)
+            if node.get_else() is not None:
+                self.execute(node.get_else(), mask & ~condition)
+        elif isinstance(node, ASTNodeWhileLoop):
+            running = mask & self.is_true(self.evaluate(node.get_condition(), mask))
+            while running.any():
+                self.execute(node.get_body(), running)
+                running &= ~self.__invalid
+                running &= self.is_true(self.evaluate(node.get_condition(), running))
+        elif type(node) in VectorEvaluator.__operators \
+                or isinstance(node, (ASTNodeIdent, ASTNodeConstant, ASTNodeOpAnd, ASTNodeOpOr, ASTNodeOpNot)):
+            self.evaluate(node, mask)
+        else:
+            raise NotVectorizable(type(node).__name__)
+
+    def assign(self, name: str, value, mask) -> None:
+        old = self.__values.get(name)
+        if old is None or (mask | self.__invalid).all():
+            # Hodnoty záznamů mimo masku nejsou definované, nikdo je nepřečte.
+            self.__values[name] = value
+            self.__defined[name] = mask if old is None else self.__defined[name] | mask
+            return
+
+        if old.dtype != value.dtype:
+            # Záznamy mohou mít v proměnné hodnoty různých typů.
+            old, value = old.astype(object), value.astype(object)
+        self.__values[name] = np.where(mask, value, old)
+        self.__defined[name] = self.__defined[name] | mask
+
+    def read(self, mask):
+        """
+        Přečte pro každý záznam vybraný maskou jeho další řádek vstupu.
+        """
+        result = None
+        for index in np.unique(self.__consumed[mask]).tolist():
+            column, missing = self.__input_column(index)
+            selected = mask & (self.__consumed == index)
+            # Záznamu došel vstup, běh skončí chybou.
+            self.__invalidate(selected & missing)
+            if result is None:
+                result = column
+            else:
+                if result.dtype != column.dtype:
+                    result, column = result.astype(object), column.astype(object)
+                result = np.where(selected, column, result)
+        self.__consumed[mask] += 1
+        return result
+
+    def __input_column(self, index: int) -> tuple:
+        """
+        :return: Dvojice (hodnoty index-tého řádku vstupu všech záznamů,
+        maska záznamů, které tolik řádků nemají).
+        """
+        while len(self.__inputs) <= index:
+            k = len(self.__inputs)
+            column = self.__integer_column(k)
+            if column is not None:
+                self.__inputs.append((column, np.zeros(self.__size, dtype=bool)))
+                continue
+
+            values = [ASTNodeReadKeyword.convert(record[k].rstrip("\n")) if k < len(record) else None
+                      for record in self.__records]
+            missing = np.array([v is None for v in values], dtype=bool)
+            if missing.any():
+                # Chybějící hodnoty nahradíme existující, aby sloupec zůstal úzkého typu.
+                filler = next((v for v in values if v is not None), 0)
+                values = [filler if v is None else v for v in values]
+            self.__inputs.append((self.narrow(values), missing))
+        return self.__inputs[index]
+
+    def __integer_column(self, index: int):
+        """
+        Rychlá cesta pro nejčastější případ: všechny záznamy mají na daném
+        řádku vstupu celé číslo v rozsahu int64.
+
+        :return: Sloupec celých čísel nebo None.
+        """
+        try:
+            lines = [record[index] for record in self.__records]
+            return np.array(list(map(int, lines)), dtype=np.int64)
+        except (IndexError, ValueError, OverflowError):
+            return None
+
+    #####################################################
+    # EXPRESSIONS                                       #
+    #####################################################
+    """Pomocná konstanta s binárními operátory a jim odpovídajícími operátory Pythonu."""
+    __operators = {
+        ASTNodeOpSum: lambda x, y: x + y,
+        ASTNodeOpSub: lambda x, y: x - y,
+        ASTNodeOpMul: lambda x, y: x * y,
+        ASTNodeOpDiv: lambda x, y: x / y,
+        ASTNodeOpGrThan: lambda x, y: x > y,
+        ASTNodeOpGrOrEqual: lambda x, y: x >= y,
+        ASTNodeOpEqual: lambda x, y: x == y,
+        ASTNodeOpNotEq: lambda x, y: x != y,
+        ASTNodeOpLess: lambda x, y: x < y,
+        ASTNodeOpLesOrEqual: lambda x, y: x <= y
+    }
+
+    """Operátory, které se nad čísly počítají s kontrolou přesnosti."""
+    __arithmetic = (ASTNodeOpSum, ASTNodeOpSub, ASTNodeOpMul, ASTNodeOpDiv)
+
+    def evaluate(self, node: ASTNode, mask):
+        """
+        Vyhodnotí výraz pro všechny záznamy; platné jsou hodnoty záznamů
+        vybraných maskou.
+        """
+        if isinstance(node, ASTNodeConstant):
+            return self.column(node.get_value())
+        if isinstance(node, ASTNodeIdent):
+            name = node.get_name()
+            undefined = mask & ~self.__defined[name] if name in self.__defined else mask
+            if undefined.any():
+                self.__invalid |= undefined
+            if name not in self.__values:
+                return np.zeros(self.__size, dtype=np.int64)
+            return self.__values[name]
+        if isinstance(node, (ASTNodeOpAnd, ASTNodeOpOr)):
+            left = self.evaluate(node.get_left_child(), mask)
+            truthy = self.truthy(left)
+            # Pravý operand se vyhodnocuje jen tam, kde o výsledku nerozhodl levý.
+            decided = truthy if isinstance(node, ASTNodeOpOr) else ~truthy
+            right = self.evaluate(node.get_right_child(), mask & ~decided)
+            if left.dtype != right.dtype:
+                left, right = left.astype(object), right.astype(object)
+            return np.where(decided, left, right)
+        if isinstance(node, ASTNodeOpNot):
+            return ~self.truthy(self.evaluate(node.get_child(), mask))
+        if type(node) in VectorEvaluator.__operators:
+            left = self.evaluate(node.get_left_child(), mask)
+            right = self.evaluate(node.get_right_child(), mask)
+            return self.binary(type(node), left, right, mask)
+        raise NotVectorizable(type(node).__name__)
+
+    def binary(self, op: type, left, right, mask):
+        if left.dtype == object or right.dtype == object:
+            return self.elementwise(VectorEvaluator.__operators[op], left, right, mask)
+
+        if op not in VectorEvaluator.__arithmetic:
+            # Python porovnává celé číslo s desetinným přesně, NumPy celé číslo
+            # převede na float64. Velká celá čísla porovná běžný interpret.
+            for integers, floats in ((left, right), (right, left)):
+                if integers.dtype == np.int64 and floats.dtype == np.float64:
+                    self.__invalidate(mask & ((integers > EXACT_FLOAT_LIMIT) | (integers < -EXACT_FLOAT_LIMIT)))
+            return VectorEvaluator.__operators[op](left, right)
+
+        # Pravdivostní hodnoty se v aritmetice chovají jako celá čísla.
+        if left.dtype == bool:
+            left = left.astype(np.int64)
+        if right.dtype == bool:
+            right = right.astype(np.int64)
+        integers = left.dtype == np.int64 and right.dtype == np.int64
+
+        with np.errstate(all="ignore"):
+            if op is ASTNodeOpDiv:
+                inexact = right == 0
+                if integers:
+                    inexact |= (np.abs(left) > EXACT_FLOAT_LIMIT) | (np.abs(right) > EXACT_FLOAT_LIMIT)
+                self.__invalidate(mask & inexact)
+                return np.true_divide(left, np.where(right == 0, 1, right))
+
+            result = VectorEvaluator.__operators[op](left, right)
+            if integers:
+                if op is ASTNodeOpSum:
+                    overflow = ((left ^ result) & (right ^ result)) < 0
+                elif op is ASTNodeOpSub:
+                    overflow = ((left ^ right) & (left ^ result)) < 0
+                else:
+                    overflow = np.abs(left.astype(np.float64) * right) >= INT64_SAFE_LIMIT
+                # Výsledek mimo int64 spočítá přesně až běžný interpret.
+                self.__invalidate(mask & overflow)
+            return result
+
+    def elementwise(self, op: Callable, left, right, mask):
+        """
+        Aplikuje operátor Pythonu prvek po prvku; záznamy, u kterých operátor
+        selže, označí jako neplatné.
+        """
+        left = left.astype(object)
+        right = right.astype(object)
+        result = np.zeros(self.__size, dtype=object)
+        for i in np.flatnonzero(mask).tolist():
+            try:
+                result[i] = op(left[i], right[i])
+            except Exception:
+                self.__invalid[i] = True
+        return self.narrow(result.tolist()) if mask.all() else result
+
+    def __invalidate(self, mask) -> None:
+        if mask.any():
+            self.__invalid |= mask
+
+    def column(self, value):
+        """
+        Vytvoří sloupec se stejnou hodnotou pro všechny záznamy.
+        """
+        if type(value) is bool:
+            return np.full(self.__size, value, dtype=bool)
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return np.full(self.__size, value, dtype=np.int64)
+        if type(value) is float:
+            return np.full(self.__size, value, dtype=np.float64)
+        result = np.empty(self.__size, dtype=object)
+        result[:] = [value] * self.__size
+        return result
+
+    @staticmethod
+    def narrow(values: list):
+        """
+        Převede seznam hodnot na pole NumPy s nejužším přesným typem.
+        """
+        types = set(map(type, values))
+        if types == {bool}:
+            return np.array(values, dtype=bool)
+        if types == {int} and -2 ** 63 <= min(values) and max(values) < 2 ** 63:
+            return np.array(values, dtype=np.int64)
+        if types == {float}:
+            return np.array(values, dtype=np.float64)
+        result = np.empty(len(values), dtype=object)
+        result[:] = values
+        return result
+
+    @staticmethod
+    def truthy(values):
+        """
+        Pravdivost hodnot (jako bool() v Pythonu).
+        """
+        if values.dtype == bool:
+            return values
+        if values.dtype == object:
+            return np.array([bool(v) for v in values.tolist()], dtype=bool)
+        return values != 0
+
+    @staticmethod
+    def is_true(values):
+        """
+        Zda jsou hodnoty rovny True; jen tehdy podmínka programu platí.
+        """
+        if values.dtype == bool:
+            return values
+        if values.dtype == object:
+            return np.array([v is True for v in values.tolist()], dtype=bool)
+        return np.zeros(len(values), dtype=bool)
+
+
+def run_batch(program, records: Sequence[Sequence[str]], symbol_table: dict = None) -> BatchResult:
+    """
+    Vyhodnotí program pro každý záznam dávky.
+
+    Pokud je k dispozici NumPy, vyhodnotí se celá dávka najednou po sloupcích.
+    Záznamy, které po sloupcích vyhodnotit nejde, a všechny záznamy programu,
+    který vektorizovat nelze, se vyhodnotí každý zvlášť.
+
+    :param program: Přeložený program (Program).
+    :param records: Vstup každého záznamu jako posloupnost řádků.
+    :param symbol_table: Počáteční hodnoty proměnných (stejné pro všechny záznamy).
+    :return: Výstupy a chyby jednotlivých záznamů.
+    """
+    fallback = list(range(len(records)))
+    outputs = [""] * len(records)
+    if np is not None and len(records) > 0:
+        evaluator = VectorEvaluator(records, symbol_table)
+        try:
+            evaluator.execute(program.get_ast(), np.ones(len(records), dtype=bool))
+            outputs = evaluator.get_outputs()
+            fallback = np.flatnonzero(evaluator.get_invalid()).tolist()
+        except NotVectorizable:
+            pass
+
+    errors = {}
+    for i in fallback:
+        output = io.StringIO()
+        try:
+            program.run(symbol_table, input=records[i], output=output)
+        except GJKError as e:
+            errors[i] = e
+        outputs[i] = output.getvalue()
+    return BatchResult(outputs, errors, len(fallback))
@@ -1,22 +1,22 @@
-from InputStream import InputStream
-from LexicalAnalysis import Tokenizer
-from SyntacticAnalysis import Parser
+import sys
 
-# Incializujeme tokenizer s naším zdrojovým kódem.
-tokenizer = Tokenizer(InputStream.from_file("source.gjk"))
+from Errors import GJKError
+from Interpreter import Interpreter
 
-# Incializujeme parser.
-parser = Parser(tokenizer)
+try:
+    # Přeložíme náš zdrojový kód. Při překladu proběhne lexikální analýza,
+    # parsing (syntaktická a sémantická analýza) a vytvoří se abstraktní
+    # syntaktický strom, který se dále převede na spustitelný program.
+    program = Interpreter().compile_file("source.gjk")
 
-# Provedeme parsing (syntaktickou a sémantickou analýzu) a
-# vytvoříme abstraktní syntaktický strom.
-ast = parser.parse()
+    print(program.get_ast())
 
-print(ast)
-
-# Vytvoříme si tabulku symbolů, která udržuje informace
-# o názvech a hodnotách všech proměnných a funkcí.
-symbol_table = dict()
-
-# Interpretujeme vrácený syntaktický strom.
-ast.evaluate(symbol_table)
+    # Interpretujeme přeložený program. Každý běh si vytvoří vlastní tabulku
+    # symbolů, která udržuje informace o názvech a hodnotách všech proměnných.
+    # Funkce program zná už od překladu, jejich lokální proměnné jsou v
+    # rámcích jednotlivých volání.
+    program.run()
+except GJKError as e:
+    # Chyby ve zdrojovém kódu vypíšeme uživateli, ostatní chyby jsou chybou interpretu.
+    print(e, file=sys.stderr)
+    sys.exit(1)
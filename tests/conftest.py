@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Moduly interpretu leží v kořeni repozitáře, testy je importují přímo.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import io
+import threading
+
+from Adaptive import ASTNodeAdaptiveIdent, make_adaptive
+from Instrumentation import Instrumentation
+from Interpreter import Interpreter
+from SymbolTable import SymbolTable
+
+SOURCE = "i = 0;\ns = 0;\nwhile (i < 100) { s = s + i; i = i + 1; };\nprint s;\n"
+
+
+def test_adaptive_backend_specializes_sites():
+    program = Interpreter("adaptive").compile(SOURCE)
+    output = io.StringIO()
+    program.run(output=output)
+    assert output.getvalue() == "4950\n"
+    summary = program.get_instrumentation().summary()
+    assert summary["specialized"] > 0
+    assert summary["deoptimizations"] == 0
+
+
+def test_other_backends_have_no_instrumentation():
+    assert Interpreter("tree").compile(SOURCE).get_instrumentation() is None
+
+
+def test_ident_guard_deoptimizes():
+    instrumentation = Instrumentation()
+    site = ASTNodeAdaptiveIdent("x", instrumentation, threshold=4)
+    for _ in range(4):
+        assert site.evaluate({"x": 1}) == 1
+    assert site.get_counters()["state"] == "specialized"
+    assert site.evaluate({"x": "a"}) == "a"
+    counters = site.get_counters()
+    assert counters["state"] == "warming"
+    assert counters["deoptimizations"] == 1
+
+
+def test_type_change_after_specialization():
+    program = Interpreter("adaptive").compile("y = x + x;\nprint y;\n")
+    for value, expected in [(1, "2")] * 20 + [("a", "aa"), (True, "2")]:
+        output = io.StringIO()
+        program.run({"x": value}, output=output)
+        assert output.getvalue() == expected + "\n"
+    assert program.get_instrumentation().summary()["deoptimizations"] >= 1
+
+
+def test_concurrent_runs_with_changing_types():
+    ast = Interpreter("tree").compile("y = x + x;\nz = x;\n").get_ast()
+    instrumentation = Instrumentation()
+    tree = make_adaptive(ast, instrumentation, threshold=2)
+    errors = []
+
+    def worker(value):
+        try:
+            for _ in range(2000):
+                table = SymbolTable({"x": value})
+                tree.evaluate(table)
+                assert table["y"] == value + value and table["z"] == value
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(value,)) for value in (1, "a", 2.5, 3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+def test_call_arguments_are_adaptive_sites():
+    source = "function twice(x) { return x * 2; };\ni = 0;\ns = 0;\n" \
+             "while (i < 50) { s = s + twice(i + 1); i = i + 1; };\nprint s;\n"
+    program = Interpreter("adaptive").compile(source)
+    output = io.StringIO()
+    program.run(output=output)
+    assert output.getvalue() == "2550\n"
+    # Proměnnou i čte podmínka cyklu, argument volání a přičtení jedničky,
+    # všechna tři místa vložily do sebe specializované operátory.
+    sites = [site for site in program.get_instrumentation().get_sites() if site["kind"] == "Ident:i"]
+    assert [site["state"] for site in sites] == ["subsumed"] * 3
+
+
+def test_inlined_sites_are_subsumed_until_deoptimization():
+    program = Interpreter("adaptive").compile("y = x + x;\n")
+    for _ in range(20):
+        program.run({"x": 1})
+    instrumentation = program.get_instrumentation()
+    states = {site["kind"]: site["state"] for site in instrumentation.get_sites()}
+    assert states == {"Ident:x": "subsumed", "OpSum": "specialized"}
+    assert "warming" not in [site["state"] for site in instrumentation.get_sites()]
+    assert program.run({"x": "a"})["y"] == "aa"
+    assert "subsumed" not in [site["state"] for site in instrumentation.get_sites()]
+    assert instrumentation.summary()["subsumed"] == 0
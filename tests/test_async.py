@@ -0,0 +1,94 @@
+import asyncio
+import io
+
+from Interpreter import Interpreter
+
+ECHO = "read a;\nread b;\nprint a + b;\n"
+
+
+async def lines(*values: bytes):
+    for value in values:
+        await asyncio.sleep(0)
+        yield value
+
+
+class SlowWriter:
+    """
+    Výstup, který čeká na odeslání dat (jako asyncio.StreamWriter).
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.drains = 0
+
+    def write(self, text: str) -> None:
+        self.text += text
+
+    async def drain(self) -> None:
+        self.drains += 1
+        await asyncio.sleep(0)
+
+
+def test_input_forms():
+    program = Interpreter().compile(ECHO)
+
+    async def ask(prompt: str) -> str:
+        return "3"
+
+    async def main():
+        outputs = []
+        for source in (["1", "2"], ask, lines(b"4\n", b"5\n")):
+            output = io.StringIO()
+            await program.run_async(input=source, output=output)
+            outputs.append(output.getvalue())
+        return outputs
+
+    assert asyncio.run(main()) == ["3\n", "6\n", "9\n"]
+
+
+def test_output_is_drained():
+    writer = SlowWriter()
+    asyncio.run(Interpreter().compile("print 1;\nprint 2;\n").run_async(output=writer))
+    assert writer.text == "1\n2\n"
+    assert writer.drains == 2
+
+
+def test_long_loop_yields_to_other_sessions():
+    program = Interpreter().compile("i = 0;\nwhile (i < 5000) { i = i + 1; };\n")
+    ticks = []
+
+    async def ticker(done: asyncio.Event):
+        while not done.is_set():
+            ticks.append(None)
+            await asyncio.sleep(0)
+
+    async def main():
+        done = asyncio.Event()
+        task = asyncio.create_task(ticker(done))
+        await asyncio.sleep(0)
+        table = await program.run_async(yield_interval=100)
+        done.set()
+        await task
+        return table
+
+    assert asyncio.run(main())["i"] == 5000
+    assert len(ticks) >= 40
+
+
+def test_many_sessions_interleave():
+    program = Interpreter().compile("read name;\nprint \"hello \" + name;\n")
+
+    async def session(n: int) -> str:
+        output = io.StringIO()
+
+        async def ask(prompt: str) -> str:
+            await asyncio.sleep(0.001 * (n % 3))
+            return "user{:d}".format(n)
+
+        await program.run_async(input=ask, output=output)
+        return output.getvalue()
+
+    async def main():
+        return await asyncio.gather(*(session(n) for n in range(100)))
+
+    assert asyncio.run(main()) == ["hello user{:d}\n".format(n) for n in range(100)]
@@ -0,0 +1,87 @@
+import asyncio
+import io
+
+import pytest
+
+from Budget import Budget
+from Errors import BudgetExceededError
+from Interpreter import Interpreter
+from SymbolTable import SymbolTable
+
+BACKENDS = sorted(Interpreter.BACKENDS)
+
+LOOP = "i = 0;\nwhile (true) { i = i + 1; };\n"
+
+
+def test_step_limit_is_exact():
+    budget = Budget(max_steps=10, check_interval=4)
+    budget.charge(10)
+    assert budget.get_steps() == 10
+    with pytest.raises(BudgetExceededError) as error:
+        budget.charge(1)
+    assert error.value.get_limit() == "steps"
+
+
+def test_output_limit():
+    budget = Budget(max_output=5)
+    budget.charge_output(5)
+    with pytest.raises(BudgetExceededError) as error:
+        budget.charge_output(1)
+    assert error.value.get_limit() == "output"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("limits, limit", [
+    ({"max_steps": 10000}, "steps"),
+    ({"max_time": 0.05}, "time"),
+])
+def test_infinite_loop_is_stopped(backend, limits, limit):
+    program = Interpreter(backend).compile(LOOP)
+    with pytest.raises(BudgetExceededError) as error:
+        program.run(**limits)
+    assert error.value.get_limit() == limit
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_output_is_limited(backend):
+    program = Interpreter(backend).compile("while (true) { print \"spam\"; };\n")
+    with pytest.raises(BudgetExceededError) as error:
+        program.run(output=io.StringIO(), max_output=100)
+    assert error.value.get_limit() == "output"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_program_within_limits_is_unaffected(backend):
+    source = "i = 0;\nwhile (i < 100) { i = i + 1; };\nprint i;\n"
+    output = io.StringIO()
+    Interpreter(backend).compile(source).run(output=output, max_steps=1000, max_time=60, max_output=10)
+    assert output.getvalue() == "100\n"
+
+
+def test_async_run_is_limited():
+    program = Interpreter().compile(LOOP)
+    with pytest.raises(BudgetExceededError) as error:
+        asyncio.run(program.run_async(max_steps=5000))
+    assert error.value.get_limit() == "steps"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unlimited_run_does_not_look_up_budget(backend, monkeypatch):
+    lookups = []
+    get_budget = SymbolTable.get_budget
+    monkeypatch.setattr(SymbolTable, "get_budget", lambda self: lookups.append(self) or get_budget(self))
+    source = "i = 0;\nwhile (i < 100) { if (i > 50) then { i = i + 1; }; i = i + 1; };\nprint i;\n"
+    program = Interpreter(backend).compile(source)
+    program.run(output=io.StringIO())
+    assert lookups == []
+    program.run(output=io.StringIO(), max_steps=1000)
+    assert lookups != []
+
+
+@pytest.mark.parametrize("backend", ["tree", "closures", "adaptive"])
+def test_step_limit_is_exact_for_programs(backend):
+    # Dva příkazy bloku a tři iterace po dvou krocích.
+    program = Interpreter(backend).compile("i = 0;\nwhile (i < 3) { i = i + 1; };\n")
+    assert program.run(max_steps=8)["i"] == 3
+    with pytest.raises(BudgetExceededError):
+        program.run(max_steps=7)
@@ -0,0 +1,77 @@
+import io
+
+import pytest
+
+from AST import *
+from Compiler import ClosureCompiler, compile_program
+from Errors import CompileError, GJKRuntimeError
+from InputStream import InputStream
+from LexicalAnalysis import Tokenizer
+from SymbolTable import SymbolTable
+from SyntacticAnalysis import Parser
+
+
+def parse(source: str):
+    return Parser(Tokenizer(InputStream(source))).parse()
+
+
+def run(source: str, symbol_table: dict = None) -> tuple:
+    output = io.StringIO()
+    table = SymbolTable(symbol_table or {}, output_sink=output)
+    compile_program(parse(source))(table)
+    return output.getvalue(), table
+
+
+class Doubled(ASTNode):
+    """
+    Uzel, který překladač nezná.
+    """
+
+    def __init__(self, name: str):
+        super().__init__()
+        self.name = name
+
+    def evaluate(self, symbol_table: dict):
+        symbol_table[self.name] *= 2
+
+
+def test_program_runs_on_symbol_table():
+    output, table = run("i = 0;\ns = \"\";\nwhile (i < 3) { s = s + \"ab\"; i = i + 1; };\nprint s;\n")
+    assert output == "ababab\n"
+    assert table["i"] == 3
+
+
+@pytest.mark.parametrize("value, expected", [(True, "yes\n"), (1, "no\n"), ("x", "no\n")])
+def test_condition_must_be_true(value, expected):
+    assert run("if (x) then { print \"yes\"; } else { print \"no\"; };\n", {"x": value})[0] == expected
+
+
+@pytest.mark.parametrize("source, boolean", [
+    ("a < b;", True), ("!a;", True), ("a == b ? c != d;", True), ("a ? b;", False), ("a + b;", False), ("a;", False),
+])
+def test_is_boolean(source, boolean):
+    assert ClosureCompiler.is_boolean(parse(source + "\n").get_expressions()[0]) is boolean
+
+
+def test_unknown_node_is_evaluated():
+    prog = ASTNodeProg()
+    prog.add_expression(Doubled("x"))
+    table = {"x": 21}
+    compile_program(prog)(table)
+    assert table["x"] == 42
+
+
+def test_error_in_nested_block_has_statement_position():
+    with pytest.raises(GJKRuntimeError) as error:
+        run("x = 1;\nwhile (x < 3) {\n  x = x + 1;\n  y = x / 0;\n};\n")
+    assert (error.value.get_line(), error.value.get_column()) == (4, 3)
+
+
+def test_invalid_child_is_rejected():
+    statement = ASTNodeOpSub(None, ASTNodeNumConst(2))
+    statement.set_position(3, 1)
+    prog = ASTNodeProg()
+    prog.add_expression(statement)
+    with pytest.raises(CompileError) as error:
+        compile_program(prog)
+    assert error.value.get_message() == "Error occurred [l:3, c:1]: Cannot compile node NoneType"
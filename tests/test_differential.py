@@ -0,0 +1,124 @@
+"""
+Rozdílové testy: stejné programy se spustí všemi způsoby vykonávání a
+porovná se výstup, výsledná tabulka symbolů a případná chyba (zpráva
+včetně pozice).
+"""
+import asyncio
+import io
+
+import pytest
+
+from Errors import GJKError
+from Interpreter import Interpreter
+from Snapshot import Snapshot
+from Tracing import Tracer
+
+PROGRAMS = {
+    "arithmetic": ("a = 7;\nb = 3;\nc = a * b - 4;\nd = a / b;\ne = a > b;\nf = 0x1F + 1_000 + 2.5;\n"
+                   "print c;\nprint d;\nprint e;\nprint f;\n", []),
+    "strings": ("s = \"ab\";\nt = s + \"cd\";\nu = s * 3;\ni = 0;\n"
+                "while (i < 300) { s = s + \"x\"; i = i + 1; };\nprint t;\nprint u;\nprint s;\n", []),
+    "control": ("x = 3;\nif (x > 1) then { y = 1; } else { y = 2; };\n[x == 3] ? z = \"yes\" : z = \"no\";\n"
+                "i = 0;\nn = 0;\nwhile (i < 4) { j = 0; while (j < i) { n = n + j; j = j + 1; }; i = i + 1; };\n"
+                "print y;\nprint z;\nprint n;\n", []),
+    "comparisons": ("a = 3;\nb = 3.0;\nprint a > b;\nprint a >= b;\nprint a < b;\nprint a <= b;\n"
+                    "print a == b;\nprint a != b;\nprint \"ab\" < \"b\";\nprint true == 1;\n", []),
+    "truthiness": ("x = 1;\nif (x) then { print \"int\"; } else { print \"not true\"; };\n"
+                   "b = !false;\nwhile (b) { print \"once\"; b = false; };\n", []),
+    "short_circuit": ("t = true;\nf = false;\nx = f ? missing;\ny = t | missing;\nprint x;\nprint y;\n", []),
+    "chained": ("a = b = 3;\nc = b * 2;\nprint a;\nprint c;\n", []),
+    "common": ("a = 6;\nb = 7;\ny = a * b + 1;\nz = a * b;\nk = 0;\nwhile (k < 5) { z = z + a * b; k = k + 1; };\n"
+               "print y;\nprint z;\n", []),
+    "input": ("read a;\nread b;\nread c;\nprint a + b;\nprint c;\n", ["4", "5", "word"]),
+    "functions": ("function fib(n) {\n  if (n < 2) then { return n; };\n  return fib(n - 1) + fib(n - 2);\n};\n"
+                  "g = 10;\nfunction add(x) { return x + g; };\nprint fib(12);\nprint add(5);\n", []),
+    "independent": ("a = 0; i = 0; while (i < 200) { a = a + i; i = i + 1; };\n"
+                    "b = 0; j = 0; while (j < 200) { b = b + 2; j = j + 1; };\nprint a;\nprint b;\n", []),
+    "undefined": ("x = 1;\nprint x;\ny = x + z;\nprint y;\n", []),
+    "division": ("i = 3;\nwhile (i > 0 - 1) {\n  print 6 / i;\n  i = i - 1;\n};\n", []),
+    "type_error": ("s = \"a\";\nprint s;\nt = s - 1;\n", []),
+    "end_of_input": ("read a;\nprint a;\nread b;\n", ["1"]),
+    "bad_input_type": ("read a;\nb = a + 1;\n", ["text"]),
+    "error_in_function": ("function f(x) {\n  return x / 0;\n};\nprint 1;\ny = f(2);\n", []),
+    "error_order": ("a = 1;\nb = 0;\ny = c + a / b;\nz = a / b;\n", []),
+}
+
+
+def outcome(run) -> tuple:
+    output = io.StringIO()
+    try:
+        table = run(output)
+    except GJKError as e:
+        return output.getvalue(), None, str(e)
+    return output.getvalue(), dict(table), None
+
+
+def plain(interpreter: Interpreter, **kwargs):
+    def run(source: str, lines: list, output):
+        return interpreter.compile(source).run(input=list(lines), output=output, **kwargs)
+    return run
+
+
+def typed(backend: str):
+    def run(source: str, lines: list, output):
+        return Interpreter(backend).compile(source, symbol_table={}).run(input=list(lines), output=output)
+    return run
+
+
+def run_async(source: str, lines: list, output):
+    program = Interpreter("closures").compile(source)
+    return asyncio.run(program.run_async(input=list(lines), output=output, yield_interval=7))
+
+
+def traced(source: str, lines: list, output):
+    tracer = Tracer()
+    events = []
+    tracer.subscribe(lambda event, node, detail: events.append(event))
+    table = Interpreter("closures").compile(source).run(input=list(lines), output=output, tracer=tracer)
+    assert events
+    return table
+
+
+def snapshot(source: str, lines: list, output):
+    interpreter = Interpreter("closures")
+    restored = Snapshot.loads(interpreter, interpreter.snapshot("").dumps())
+    return restored.run(source, input=list(lines), output=output)
+
+
+VARIANTS = {
+    "tree": plain(Interpreter("tree")),
+    "closures": plain(Interpreter("closures")),
+    "python": plain(Interpreter("python")),
+    "adaptive": plain(Interpreter("adaptive")),
+    "tree-optimized": plain(Interpreter("tree", optimize=True)),
+    "closures-optimized": plain(Interpreter("closures", optimize=True)),
+    "python-optimized": plain(Interpreter("python", optimize=True)),
+    "tree-memoized": plain(Interpreter("tree", memoize=64)),
+    "closures-budgeted": plain(Interpreter("closures"), max_steps=10 ** 6),
+    "python-budgeted": plain(Interpreter("python"), max_steps=10 ** 6),
+    "parallel": plain(Interpreter("closures", workers=2)),
+    "typed": typed("tree"),
+    "typed-closures": typed("closures"),
+    "async": run_async,
+    "traced": traced,
+    "snapshot": snapshot,
+}
+
+
+@pytest.mark.parametrize("variant", [v for v in VARIANTS if v != "tree"])
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_variant_matches_tree_walker(name, variant):
+    source, lines = PROGRAMS[name]
+    expected = outcome(lambda output: VARIANTS["tree"](source, lines, output))
+    assert outcome(lambda output: VARIANTS[variant](source, lines, output)) == expected
+
+
+@pytest.mark.parametrize("name", PROGRAMS)
+def test_batch_matches_tree_walker(name):
+    source, lines = PROGRAMS[name]
+    output, _, error = outcome(lambda output: VARIANTS["tree"](source, lines, output))
+    result = Interpreter("tree").compile(source).run_batch([lines, lines])
+    for index in range(2):
+        assert result.get_outputs()[index] == output
+        errors = result.get_errors()
+        assert (str(errors[index]) if index in errors else None) == error
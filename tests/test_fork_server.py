@@ -0,0 +1,160 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import ForkServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+needs_fork = pytest.mark.skipif(not hasattr(socket, "send_fds") or not hasattr(os, "fork"),
+                                reason="fork server needs fork and descriptor passing")
+
+
+def loaded_modules(code: str) -> set:
+    """
+    Spustí kód v novém interpretu Pythonu a vrátí načtené moduly interpretu.
+    """
+    script = code + "\nimport sys\nprint(' '.join(sorted(sys.modules)))\n"
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, cwd=ROOT, check=True)
+    return set(result.stdout.split())
+
+
+def test_optional_components_are_not_loaded_at_start():
+    modules = loaded_modules("from Interpreter import Interpreter\nInterpreter('closures').compile('x = 1;')")
+    assert "Compiler" in modules
+    assert not modules & {"Transpiler", "TypeInference", "Adaptive", "AsyncEvaluator", "Optimizer",
+                          "Memoization", "Parallel", "Serializer", "asyncio"}
+
+
+def test_backend_is_loaded_on_first_use():
+    modules = loaded_modules("from Interpreter import Interpreter\nInterpreter('python').compile('x = 1;')")
+    assert "Transpiler" in modules
+
+
+def start_server(path: str, code: str = None) -> subprocess.Popen:
+    if code is None:
+        command = [sys.executable, "ForkServer.py", "serve", path]
+    else:
+        code += "\nimport ForkServer\nForkServer.ForkServer({!r}).serve_forever()".format(path)
+        command = [sys.executable, "-c", code]
+    process = subprocess.Popen(command, cwd=ROOT)
+    deadline = time.monotonic() + 10
+    while not os.path.exists(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.01)
+    return process
+
+
+def stop_server(process: subprocess.Popen, path: str) -> None:
+    process.terminate()
+    process.wait(10)
+    assert not os.path.exists(path)
+
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "gjk.sock")
+    process = start_server(path)
+    yield path
+    stop_server(process, path)
+
+
+def run_script(server: str, cwd: str, script: str, input: str = "") -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, os.path.join(ROOT, "ForkServer.py"), "run", script, server],
+                          input=input, capture_output=True, text=True, cwd=cwd, timeout=10)
+
+
+@needs_fork
+def test_script_uses_client_streams_and_directory(server, tmp_path):
+    (tmp_path / "echo.gjk").write_text("read a;\nprint a * 2;\n")
+    result = run_script(server, str(tmp_path), "echo.gjk", "21\n")
+    assert result.returncode == 0
+    assert result.stdout.endswith("42\n")
+
+
+@needs_fork
+def test_error_is_reported_with_exit_code(server, tmp_path):
+    (tmp_path / "broken.gjk").write_text("print missing;\n")
+    result = run_script(server, str(tmp_path), "broken.gjk")
+    assert result.returncode == 1
+    assert "Error occurred" in result.stderr
+
+
+@needs_fork
+def test_children_are_independent(server, tmp_path):
+    (tmp_path / "count.gjk").write_text("i = 0;\nwhile (i < 3) { i = i + 1; };\nprint i;\n")
+    results = [run_script(server, str(tmp_path), "count.gjk") for _ in range(3)]
+    assert [r.stdout for r in results] == ["3\n"] * 3
+
+
+@needs_fork
+def test_failed_fork_is_reported_and_server_keeps_running(tmp_path):
+    # První fork selže, jako by systému došly procesy.
+    code = ("import errno, os\nfork, calls = os.fork, []\n"
+            "def failing_fork():\n"
+            "    calls.append(1)\n"
+            "    if len(calls) == 1:\n"
+            "        raise OSError(errno.EAGAIN, os.strerror(errno.EAGAIN))\n"
+            "    return fork()\n"
+            "os.fork = failing_fork")
+    path = str(tmp_path / "gjk.sock")
+    process = start_server(path, code)
+    try:
+        (tmp_path / "one.gjk").write_text("print 1;\n")
+        refused = run_script(path, str(tmp_path), "one.gjk")
+        assert refused.returncode == 1
+        assert "Cannot start worker" in refused.stderr
+        result = run_script(path, str(tmp_path), "one.gjk")
+        assert (result.returncode, result.stdout) == (0, "1\n")
+    finally:
+        stop_server(process, path)
+
+
+def test_default_socket_prefers_runtime_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("GJK_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    assert ForkServer.default_socket() == str(tmp_path / ForkServer.SOCKET_NAME)
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="needs POSIX user ids")
+def test_default_socket_is_in_private_directory(monkeypatch, tmp_path):
+    monkeypatch.delenv("GJK_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(ForkServer.tempfile, "tempdir", str(tmp_path))
+    directory = os.path.dirname(ForkServer.default_socket())
+    assert os.stat(directory).st_mode & 0o777 == 0o700
+
+    # Adresář přístupný ostatním (např. předem vytvořený útočníkem) se odmítne.
+    os.chmod(directory, 0o777)
+    with pytest.raises(PermissionError):
+        ForkServer.default_socket()
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_stale_socket_is_removed(tmp_path):
+    path = str(tmp_path / "gjk.sock")
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(path)
+    stale.close()
+    ForkServer.remove_stale_socket(path)
+    assert not os.path.exists(path)
+    ForkServer.remove_stale_socket(path)
+
+
+def test_other_files_are_not_removed(tmp_path):
+    path = tmp_path / "gjk.sock"
+    path.write_text("data")
+    with pytest.raises(FileExistsError):
+        ForkServer.remove_stale_socket(str(path))
+    assert path.read_text() == "data"
+
+
+@needs_fork
+def test_socket_of_running_server_is_not_removed(server):
+    with pytest.raises(FileExistsError):
+        ForkServer.remove_stale_socket(server)
+    assert os.path.exists(server)
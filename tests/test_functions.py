@@ -0,0 +1,106 @@
+import asyncio
+import io
+
+import pytest
+
+from Errors import CompileError, GJKRuntimeError
+from Functions import MAX_CALL_DEPTH
+from Interpreter import Interpreter
+
+BACKENDS = ("tree", "closures", "python")
+
+PROGRAM = """
+function fib(n) {
+    if (n < 2) then { return n; };
+    return fib(n - 1) + fib(n - 2);
+};
+function ask(prompt) {
+    print prompt;
+    read value;
+    return value * 2;
+};
+function depth(n) {
+    if (n == 0) then { return 0; };
+    return 1 + depth(n - 1);
+};
+g = 100;
+function global(x) { return x + g; };
+print fib(15);
+x = ask("first");
+print x + ask("second");
+print depth(20000);
+print global(5);
+"""
+
+EXPECTED = ["610", "first", "second", "20", "20000", "105"]
+
+
+class AsyncWriter:
+    """
+    Výstup, jehož zápis je korutina (jako u síťového spojení)
+    """
+
+    def __init__(self):
+        self.lines = []
+
+    async def write(self, text: str):
+        await asyncio.sleep(0)
+        self.lines.extend(text.splitlines())
+
+
+def async_input(lines: list):
+    lines = iter(lines)
+
+    async def provider(prompt: str) -> str:
+        await asyncio.sleep(0)
+        return next(lines)
+    return provider
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_calls(backend):
+    output = io.StringIO()
+    table = Interpreter(backend).compile(PROGRAM).run(input=["4", "6"], output=output)
+    assert output.getvalue().split() == EXPECTED
+    assert table["x"] == 8 and "value" not in table
+
+
+def test_io_inside_function_under_run_async():
+    writer = AsyncWriter()
+    table = asyncio.run(Interpreter().compile(PROGRAM).run_async(input=async_input(["4", "6"]), output=writer))
+    assert writer.lines == EXPECTED
+    assert table["x"] == 8
+
+
+def test_async_read_error_inside_function_has_position():
+    with pytest.raises(GJKRuntimeError) as error:
+        asyncio.run(Interpreter().compile(PROGRAM).run_async(input=[], output=AsyncWriter()))
+    assert "No more input" in str(error.value)
+    assert error.value.get_line() == 8
+
+
+def test_async_function_steps_are_budgeted():
+    source = "function spin(n) { while (n > 0) { n = n - 1; }; return n; }; x = spin(1000000);"
+    with pytest.raises(GJKRuntimeError) as error:
+        asyncio.run(Interpreter().compile(source).run_async(max_steps=1000))
+    assert error.value.get_limit() == "steps"
+
+
+@pytest.mark.parametrize("source, message", [
+    ("x = f(1);", "Undefined function f"),
+    ("function f(a) { return a; }; x = f(1, 2);", "Function f expects 1 arguments, 2 given"),
+    ("function f(a) { return a; }; function f(b) { return b; };", "Function f is already defined"),
+    ("return 1;", "Return outside of a function"),
+])
+def test_compile_errors(source, message):
+    with pytest.raises(CompileError) as error:
+        Interpreter().compile(source)
+    assert message in str(error.value)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_call_depth_is_limited(backend):
+    source = "function down(n) { return down(n + 1); }; x = down(0);"
+    with pytest.raises(GJKRuntimeError) as error:
+        Interpreter(backend).compile(source).run()
+    assert "Maximum call depth {:d} exceeded".format(MAX_CALL_DEPTH) in str(error.value)
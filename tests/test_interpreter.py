@@ -0,0 +1,147 @@
+import io
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from Errors import CompileError, LexError, ParseError
+from Interpreter import Interpreter
+
+SOURCE = "read n;\ni = 0;\ns = 0;\nwhile (i < n) { i = i + 1; s = s + i; };\nprint s;\n"
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+def test_compile_once_run_many(backend):
+    program = Interpreter(backend).compile(SOURCE)
+    for n in range(5):
+        output = io.StringIO()
+        table = program.run(input=[str(n)], output=output)
+        assert output.getvalue() == "{:d}\n".format(n * (n + 1) // 2)
+        assert table["i"] == n
+
+
+def test_symbol_table_is_copied():
+    values = {"x": 1}
+    table = Interpreter().compile("x = x + 1;\n").run(values)
+    assert table["x"] == 2
+    assert values == {"x": 1}
+
+
+def test_input_as_function():
+    prompts = []
+
+    def provider(prompt: str) -> str:
+        prompts.append(prompt)
+        return "7"
+
+    output = io.StringIO()
+    Interpreter().compile(SOURCE).run(input=provider, output=output)
+    assert output.getvalue() == "28\n"
+    assert prompts == ["> "]
+
+
+def test_concurrent_runs_are_isolated():
+    program = Interpreter().compile(SOURCE)
+    results = {}
+
+    def worker(n: int):
+        output = io.StringIO()
+        for _ in range(50):
+            program.run(input=[str(n)], output=output)
+        results[n] = set(output.getvalue().split())
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {n: {str(n * (n + 1) // 2)} for n in range(1, 9)}
+
+
+def test_compile_file(tmp_path):
+    path = tmp_path / "program.gjk"
+    path.write_text("print 1 + 2;\n")
+    program = Interpreter().compile_file(str(path))
+    output = io.StringIO()
+    program.run(output=output)
+    assert output.getvalue() == "3\n"
+    assert program.get_name() == str(path)
+
+
+@pytest.mark.parametrize("source, error", [("x = 1 $ 2;\n", LexError), ("x = ;\n", ParseError)])
+def test_compile_errors_are_exceptions(source, error):
+    interpreter = Interpreter()
+    with pytest.raises(CompileError) as compile_error:
+        interpreter.compile(source)
+    assert type(compile_error.value.get_errors()[0]) is error
+    # Interpret po chybě dál slouží.
+    output = io.StringIO()
+    interpreter.compile("print 1;\n").run(output=output)
+    assert output.getvalue() == "1\n"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        Interpreter("jit")
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+@pytest.mark.parametrize("source", ["y = -2;\n", "x = * 3;\n"])
+def test_missing_left_operand(backend, source):
+    with pytest.raises(CompileError) as compile_error:
+        Interpreter(backend).compile(source)
+    error = compile_error.value.get_errors()[0]
+    assert type(error) is ParseError
+    assert error.get_message() == "Expected expression"
+    assert (error.get_line(), error.get_column()) == (1, 5)
+
+
+def test_main_runs_example():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "main.py"], cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.endswith("1\n4\n")
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+def test_ternary_ends_at_semicolon(backend):
+    output = io.StringIO()
+    Interpreter(backend).compile("[1 == 2] ? print 1 : print 2;\nprint 3;\n").run(output=output)
+    assert output.getvalue() == "2\n3\n"
+
+
+def test_concurrent_first_runs_compile_variants_once(monkeypatch):
+    import asyncio
+    import time
+
+    import AsyncEvaluator
+    import Tracing
+
+    calls = []
+
+    def counting(compile):
+        def wrapper(*args):
+            calls.append(compile.__name__)
+            # Překlad trvá déle, aby se vlákna při prvním běhu potkala.
+            time.sleep(0.05)
+            return compile(*args)
+        return wrapper
+
+    monkeypatch.setattr(AsyncEvaluator, "compile_async", counting(AsyncEvaluator.compile_async))
+    monkeypatch.setattr(Tracing, "compile_traced", counting(Tracing.compile_traced))
+    program = Interpreter().compile("x = 1;\nprint x;\n")
+    tracer = Tracing.Tracer()
+    tracer.subscribe(lambda event, node, detail: None)
+
+    def worker():
+        asyncio.run(program.run_async(output=io.StringIO()))
+        program.run(output=io.StringIO(), tracer=tracer)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(calls) == ["compile_async", "compile_traced"]
@@ -0,0 +1,139 @@
+import pytest
+
+from Errors import CompileError, LexError
+from InputStream import InputStream
+from Interpreter import Interpreter
+from LexicalAnalysis import Tokenizer
+from Tokens import (ExprEndToken, FloatConstantToken, NumericConstantToken, StringConstantToken,
+                    SumOperatorToken)
+
+
+def tokens(source: str) -> list:
+    tokenizer = Tokenizer(InputStream(source))
+    result = []
+    while tokenizer.is_eof() is False:
+        result.append(tokenizer.next())
+    return result
+
+
+@pytest.mark.parametrize("source, message, position", [
+    ("x = 1 $ 2;", "Unexpected character '$' was found.", (1, 7)),
+    ("x = \"abc", "EOF found while reading string constant", (1, 9)),
+    ("x = 1;\nyy", "EOF found while reading identifier", (2, 3)),
+])
+def test_lexer_errors_are_exceptions(source, message, position):
+    with pytest.raises(LexError) as error:
+        tokens(source)
+    assert error.value.get_message() == message
+    assert (error.value.get_line(), error.value.get_column()) == position
+
+
+def test_all_errors_are_collected():
+    with pytest.raises(CompileError) as error:
+        Interpreter().compile("x = 1 $ 2;\ny = 3 @ 4;\nz = 5;\n")
+    errors = error.value.get_errors()
+    assert [type(e) for e in errors] == [LexError, LexError]
+    assert [e.get_line() for e in errors] == [1, 2]
+
+
+@pytest.mark.parametrize("source, value", [
+    ('""', ""),
+    ('"plain text"', "plain text"),
+    ('"say \\"hi\\""', 'say "hi"'),
+    ('"a\\nb"', "a\nb"),
+    ('"back\\\\slash"', "back\\slash"),
+    ('"\\\\"', "\\"),
+    ('"\\\\\\""', '\\"'),
+    ('"multi\nline"', "multi\nline"),
+])
+def test_string_constants(source, value):
+    token, = tokens(source)
+    assert type(token) is StringConstantToken
+    assert token.get_value() == value
+
+
+def test_string_is_followed_by_next_token():
+    first, second, third = tokens('"a\\"b" "c";')
+    assert (first.get_value(), second.get_value()) == ('a"b', "c")
+    assert type(third) is ExprEndToken
+
+
+@pytest.mark.parametrize("source, position", [
+    ('x = "a\\tb";', (1, 7)),
+    ('x = "ok\\\\" + "\\q";', (1, 15)),
+])
+def test_unknown_escape_sequence(source, position):
+    with pytest.raises(LexError) as error:
+        tokens(source)
+    assert error.value.get_message() == "Unknown escape sequence in string constant"
+    assert (error.value.get_line(), error.value.get_column()) == position
+
+
+def test_lexing_continues_after_bad_string():
+    with pytest.raises(CompileError) as error:
+        Interpreter().compile('x = "\\t";\ny = "\\q";\nz = 1;\n')
+    assert [e.get_line() for e in error.value.get_errors()] == [1, 2]
+
+
+def test_escaped_quote_does_not_end_string():
+    with pytest.raises(LexError) as error:
+        tokens('x = "abc\\"')
+    assert error.value.get_message() == "EOF found while reading string constant"
+
+
+@pytest.mark.parametrize("source, value, kind", [
+    ("0", 0, NumericConstantToken),
+    ("1234567", 1234567, NumericConstantToken),
+    ("1_000_000", 1000000, NumericConstantToken),
+    ("0xff", 255, NumericConstantToken),
+    ("0Xdead_BEEF", 0xdeadbeef, NumericConstantToken),
+    ("3.25", 3.25, FloatConstantToken),
+    ("1_0.5", 10.5, FloatConstantToken),
+    ("2e3", 2000.0, FloatConstantToken),
+    ("1.5E-2", 0.015, FloatConstantToken),
+])
+def test_numeric_constants(source, value, kind):
+    token, = tokens(source)
+    assert type(token) is kind
+    assert token.get_value() == value
+    assert type(token.get_value()) is type(value)
+
+
+def test_big_integer_constant():
+    digits = "9" * 10000
+    token, = tokens(digits)
+    assert token.get_value() == 10 ** 10000 - 1
+
+
+def test_number_is_followed_by_next_token():
+    result = tokens("x = 1.5+2;")
+    assert [type(t) for t in result][2:] == [FloatConstantToken, SumOperatorToken, NumericConstantToken, ExprEndToken]
+
+
+@pytest.mark.parametrize("source, message", [
+    ("x = 12abc;", "Malformed numeric constant"),
+    ("x = 1__0;", "Malformed numeric constant"),
+    ("x = 1_;", "Malformed numeric constant"),
+    ("x = 1.;", "Malformed numeric constant"),
+    ("x = 1.2.3;", "Malformed numeric constant"),
+    ("x = 0xg;", "Malformed numeric constant"),
+    ("x = 1e;", "Malformed numeric constant"),
+    ("x = 1e999;", "Numeric constant out of range"),
+])
+def test_bad_numeric_constants(source, message):
+    with pytest.raises(LexError) as error:
+        tokens(source)
+    assert error.value.get_message() == message
+    assert (error.value.get_line(), error.value.get_column()) == (1, 5)
+
+
+def test_lexing_continues_after_bad_number():
+    with pytest.raises(CompileError) as error:
+        Interpreter().compile("x = 1.2.3;\ny = 0xq1;\nz = 1;\n")
+    assert [e.get_line() for e in error.value.get_errors()] == [1, 2]
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+def test_numeric_constants_in_programs(backend):
+    table = Interpreter(backend).compile("a = 0x10 + 1_000;\nb = 2.5 * 2;\n").run()
+    assert table["a"] == 1016 and table["b"] == 5.0
@@ -0,0 +1,133 @@
+import io
+
+import pytest
+
+from Interpreter import Interpreter
+from Memoization import ASTNodeMemo, MemoCache, make_memoized
+from Optimizer import Optimizer
+from SymbolTable import SymbolTable
+
+# Výraz a * b + c se v cyklu nemění, dokud se nezmění c.
+LOOP = (
+    "a = 3;\nb = 4;\nc = 5;\ns = 0;\ni = 0;\n"
+    "while (i < 100) { t = a * b + c; s = s + t; i = i + 1; if (i == 50) then { c = 6; }; };\n"
+    "print s;\n"
+)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = MemoCache(2)
+    site = cache.register_site(("x",))
+    cache.store(site, (1,), "one")
+    cache.store(site, (2,), "two")
+    assert cache.lookup(site, (1,)) == "one"
+    cache.store(site, (3,), "three")
+    assert cache.lookup(site, (2,)) != "two"
+    assert cache.lookup(site, (1,)) == "one" and cache.lookup(site, (3,)) == "three"
+    summary = cache.summary()
+    assert summary["size"] == 2 and summary["evictions"] == 1
+    assert summary["hits"] == 3 and summary["misses"] == 1
+    assert cache.get_sites() == [{"site": 0, "reads": ("x",), "hits": 3, "misses": 1, "hit_rate": 0.75}]
+
+
+def test_cache_clear_keeps_counters():
+    cache = MemoCache()
+    site = cache.register_site(())
+    cache.store(site, (), 1)
+    cache.lookup(site, ())
+    cache.clear()
+    assert cache.summary()["size"] == 0 and cache.summary()["hits"] == 1
+
+
+def test_cache_size_must_be_positive():
+    with pytest.raises(ValueError):
+        MemoCache(0)
+
+
+def test_only_pure_subexpressions_are_wrapped():
+    program = Interpreter().compile("x = a * b + c;\ny = z = a * b;\nprint a + 1;\n")
+    tree = make_memoized(program.get_ast(), MemoCache())
+    wrapped = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ASTNodeMemo):
+            wrapped.append(node.get_reads())
+            node = node.get_expression()
+        stack.extend(Optimizer.children(node))
+    # Přiřazení uvnitř výrazu není čisté a jednoduchý součet nemá dost operátorů.
+    assert wrapped == [("a", "b", "c")]
+
+
+def test_memoized_run_matches_plain_run():
+    output = io.StringIO()
+    program = Interpreter("tree", memoize=64).compile(LOOP)
+    program.run(output=output)
+    expected = io.StringIO()
+    Interpreter().compile(LOOP).run(output=expected)
+    assert output.getvalue() == expected.getvalue() == "{:d}\n".format(50 * 3 * (4 + 5) + 50 * 3 * (4 + 6))
+
+
+def test_hits_and_invalidation():
+    program = Interpreter("tree", memoize=64).compile(LOOP)
+    program.run(output=io.StringIO())
+    summary = program.get_cache().summary()
+    # Výsledek se spočítá jednou před změnou c a jednou po ní.
+    assert summary["misses"] == 2 and summary["hits"] == 98
+
+
+def test_runs_with_different_values_do_not_share_results():
+    program = Interpreter("tree", memoize=64).compile("x = a * b + c;\n")
+    assert program.run({"a": 1, "b": 2, "c": 3})["x"] == 5
+    assert program.run({"a": 2, "b": 2, "c": 3})["x"] == 10
+
+
+def test_runs_share_results():
+    program = Interpreter("tree", memoize=64).compile("x = a * b + c;\n")
+    for _ in range(3):
+        assert program.run({"a": 1, "b": 2, "c": 3})["x"] == 5
+    summary = program.get_cache().summary()
+    assert summary["misses"] == 1 and summary["hits"] == 2
+
+
+@pytest.mark.parametrize("first, second", [(1, 1.0), (0.0, -0.0)])
+def test_equal_values_do_not_share_results(first, second):
+    program = Interpreter("tree", memoize=64).compile("x = a * 2 * 1;\n")
+    program.run({"a": first})
+    result = program.run({"a": second})["x"]
+    assert str(result) == str(second * 2 * 1)
+    assert program.get_cache().summary()["hits"] == 0
+
+
+def test_strings_are_reused_within_a_run_only():
+    program = Interpreter("tree", memoize=64).compile("i = 0;\nwhile (i < 10) { x = a + b + a; i = i + 1; };\n")
+    for _ in range(2):
+        assert program.run({"a": "p", "b": "q"})["x"] == "pqp"
+    summary = program.get_cache().summary()
+    assert summary["misses"] == 2 and summary["hits"] == 18
+
+
+def test_nested_assignment_invalidates_results():
+    program = Interpreter("tree", memoize=64).compile("a = 1;\nx = a * 2 * 3;\ny = a = 2;\nz = a * 2 * 3;\n")
+    table = program.run()
+    assert table["x"] == 6 and table["z"] == 12
+
+
+def test_versions_are_unique_across_tables():
+    first = SymbolTable({"a": 1})
+    second = SymbolTable({"a": 1})
+    assert first.get_versions(("a",)) != second.get_versions(("a",))
+    versions = first.get_versions(("a",))
+    first.bump_version("a")
+    assert first.get_versions(("a",)) != versions
+
+
+def test_program_without_memoization_has_no_cache():
+    assert Interpreter("tree").compile("x = 1;\n").get_cache() is None
+
+
+@pytest.mark.parametrize("kwargs", [{"backend": "closures", "memoize": 8}, {"memoize": 8, "workers": 2}])
+def test_unsupported_combinations(kwargs):
+    kwargs.setdefault("backend", "tree")
+    with pytest.raises(ValueError):
+        Interpreter(**kwargs)
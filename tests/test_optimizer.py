@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from Errors import BudgetExceededError, GJKRuntimeError
+from InputStream import InputStream
+from Interpreter import Interpreter
+from LexicalAnalysis import Tokenizer
+from Optimizer import Optimizer
+from Parallel import Statement, dependency_groups
+from SyntacticAnalysis import Parser
+
+
+def parse(source: str):
+    return Parser(Tokenizer(InputStream(source))).parse()
+
+
+def run(source: str, optimize: bool) -> list:
+    output = io.StringIO()
+    Interpreter("closures", optimize=optimize).compile(source).run(output=output)
+    return output.getvalue().split()
+
+
+def test_common_subexpression_is_eliminated():
+    optimizer = Optimizer()
+    optimizer.optimize(parse("a = 6;\nb = 7;\ny = a * b;\nz = a * b;\nprint z;\n"))
+    assert optimizer.eliminated == 1
+
+
+def test_elimination_keeps_error_order():
+    source = "a = 1;\nb = 0;\ny = c + a / b;\nz = a / b;\n"
+    for optimize in (False, True):
+        with pytest.raises(GJKRuntimeError) as error:
+            run(source, optimize)
+        assert str(error.value) == "Error occurred [l:3, c:1]: Undefined variable 'c'"
+
+
+def test_chained_assignment_invalidates_common_subexpression():
+    source = "x = 1;\ny = x * 2;\na = x = 5;\nz = x * 2;\nprint y;\nprint z;\n"
+    assert run(source, True) == run(source, False) == ["2", "10"]
+
+
+def test_writes_include_chained_assignment():
+    assert Optimizer.writes(parse("a = b = 3;\n")) == {"a", "b"}
+
+
+def test_chained_assignment_joins_dependency_groups():
+    ast = parse("a = b = 3;\nc = b;\n")
+    statements = [Statement(node, i) for i, node in enumerate(ast.get_expressions())]
+    assert len(dependency_groups(statements)) == 1
+
+
+def test_loop_invariant_is_hoisted():
+    source = "i = 0;\nk = 3;\ns = 0;\nwhile (i < 4) { s = s + k * k; i = i + 1; };\nprint s;\n"
+    optimizer = Optimizer()
+    optimizer.optimize(parse(source))
+    assert optimizer.hoisted == 1
+    assert run(source, True) == run(source, False) == ["36"]
+
+
+# Vynesení a * b z cyklu, společný podvýraz c + d a mrtvý zápis do e.
+BUDGETED = ("a = 2;\nb = 3;\nc = 4;\nd = 5;\ne = 1;\ne = 2;\nx = c + d * 2;\ny = c + d * 2;\n"
+            "i = 0;\ns = 0;\nwhile (i < 5) { s = s + a * b; i = i + 1; };\nprint s;\n")
+
+
+def smallest_budget(program) -> int:
+    steps = 1
+    while True:
+        try:
+            program.run(output=io.StringIO(), max_steps=steps)
+            return steps
+        except BudgetExceededError:
+            steps += 1
+
+
+@pytest.mark.parametrize("backend", ["tree", "closures", "adaptive"])
+def test_optimization_keeps_step_counts(backend):
+    optimizer = Optimizer()
+    optimizer.optimize(parse(BUDGETED))
+    assert optimizer.hoisted and optimizer.eliminated and optimizer.removed
+    expected = smallest_budget(Interpreter("tree").compile(BUDGETED))
+    assert expected == 12 + 5 * 3
+    program = Interpreter(backend, optimize=True).compile(BUDGETED)
+    assert program.run(output=io.StringIO(), max_steps=expected)["s"] == 30
+    with pytest.raises(BudgetExceededError):
+        program.run(output=io.StringIO(), max_steps=expected - 1)
@@ -0,0 +1,69 @@
+import io
+
+import pytest
+
+import Parallel
+from Interpreter import Interpreter
+from Serializer import dumps
+
+SOURCE = """
+a = 0; i = 0; while (i < 300) { a = a + i; i = i + 1; };
+b = 0; j = 0; while (j < 300) { b = b + 2; j = j + 1; };
+c = 1; k = 0; while (k < 10) { c = c * 2; k = k + 1; };
+print a; print b; print c;
+"""
+
+
+def test_parallel_output_matches_serial():
+    serial = io.StringIO()
+    Interpreter("closures").compile(SOURCE).run(output=serial)
+    parallel = io.StringIO()
+    table = Interpreter("closures", workers=2).compile(SOURCE).run(output=parallel)
+    assert parallel.getvalue() == serial.getvalue() == "44850\n600\n1024\n"
+    assert table["i"] == table["j"] == 300
+
+
+def test_worker_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(Parallel, "MAX_PROGRAMS", 2)
+    monkeypatch.setattr(Parallel, "_programs", Parallel.OrderedDict())
+    sources = [dumps(Interpreter("tree").compile("x = x + {:d};\n".format(n)).get_ast()) for n in range(4)]
+    for n, source in enumerate(sources):
+        assert Parallel.run_group(source, "closures", {"x": 1}, ("x",)) == {"x": 1 + n}
+    assert list(key[0] for key in Parallel._programs) == sources[2:]
+
+    Parallel.run_group(sources[2], "closures", {"x": 1}, ("x",))
+    Parallel.run_group(sources[0], "closures", {"x": 1}, ("x",))
+    assert list(key[0] for key in Parallel._programs) == [sources[2], sources[0]]
+
+
+def test_pools_are_shut_down():
+    Interpreter("closures", workers=2).compile(SOURCE).run(output=io.StringIO())
+    pool = Parallel._pools[2]
+    Parallel.shutdown_pools()
+    assert Parallel._pools == {}
+    with pytest.raises(RuntimeError):
+        pool.submit(int)
+    # Další běh si vytvoří novou skupinu.
+    output = io.StringIO()
+    Interpreter("closures", workers=2).compile(SOURCE).run(output=output)
+    assert output.getvalue() == "44850\n600\n1024\n"
+    assert Parallel._pools[2] is not pool
+
+
+def test_failed_segment_cancels_pending_groups(monkeypatch):
+    cancelled = []
+
+    class Future:
+        def result(self):
+            raise RuntimeError("worker failed")
+
+        def cancel(self):
+            cancelled.append(self)
+            return True
+
+    monkeypatch.setattr(Parallel.Group, "submit", lambda self, pool, backend, symbol_table: Future())
+    output = io.StringIO()
+    table = Interpreter("closures", workers=3).compile(SOURCE).run(output=output)
+    assert output.getvalue() == "44850\n600\n1024\n"
+    assert table["i"] == table["j"] == 300
+    assert len(cancelled) == 2
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from Interpreter import Interpreter
+from Rope import ROPE_THRESHOLD, Rope, concat, flatten
+
+LONG = "x" * ROPE_THRESHOLD
+
+
+def test_short_strings_are_plain():
+    assert type(concat("ab", "cd")) is str
+    assert concat(1, 2) == 3
+
+
+def test_long_strings_become_rope():
+    rope = concat(LONG, "y")
+    assert type(rope) is Rope
+    assert len(rope) == ROPE_THRESHOLD + 1
+    assert flatten(rope) == LONG + "y"
+    assert type(flatten(rope)) is str
+
+
+def test_appending_shares_parts():
+    rope = concat(LONG, "a")
+    longer = concat(rope, "b")
+    # Rope, která už není nejdelší nad sdíleným seznamem, dostane vlastní kopii.
+    other = concat(rope, "c")
+    assert flatten(rope) == LONG + "a"
+    assert flatten(longer) == LONG + "ab"
+    assert flatten(other) == LONG + "ac"
+    assert flatten(concat(longer, other)) == LONG + "ab" + LONG + "ac"
+
+
+def test_behaves_like_str():
+    rope = concat(LONG, "y")
+    text = LONG + "y"
+    assert rope == text and text == rope and rope == concat(LONG, "y")
+    assert rope != LONG and not rope == 1
+    assert rope > LONG and rope <= text and rope < text + "z" and rope >= concat(LONG, "")
+    assert hash(rope) == hash(text)
+    assert {rope: 1}[text] == 1
+    assert rope[-1] == "y" and rope[:2] == "xx"
+    assert bool(rope) and str(rope) == text and repr(rope) == repr(text)
+    assert "{}".format(rope) == text
+    assert "a" + rope == "a" + text
+    assert rope * 2 == text * 2 and 2 * rope == text * 2
+
+
+@pytest.mark.parametrize("operation", [
+    lambda rope: rope + 1,
+    lambda rope: 1 + rope,
+    lambda rope: rope - "a",
+    lambda rope: rope / 2,
+    lambda rope: rope < 1,
+])
+def test_errors_match_str(operation):
+    with pytest.raises(TypeError) as expected:
+        operation(LONG + "y")
+    with pytest.raises(TypeError) as error:
+        operation(concat(LONG, "y"))
+    assert type(error.value) is type(expected.value)
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+def test_accumulation_in_loop(backend):
+    source = "s = \"\";\ni = 0;\nwhile (i < 1000) { s = s + \"ab\"; i = i + 1; };\nt = s + \"!\";\nprint t;\n"
+    output = io.StringIO()
+    table = Interpreter(backend).compile(source).run(output=output)
+    assert output.getvalue() == "ab" * 1000 + "!\n"
+    # Hodnoty proměnných po běhu jsou obyčejné řetězce.
+    assert type(table["s"]) is str and table["s"] == "ab" * 1000
+    assert type(table["t"]) is str
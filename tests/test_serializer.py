@@ -0,0 +1,65 @@
+import pytest
+
+from AST import ASTNodeNumConst, ASTNodeOpSub, ASTNodeProg
+from Adaptive import make_adaptive
+from InputStream import InputStream
+from LexicalAnalysis import Tokenizer
+from Memoization import MemoCache, make_memoized
+from Serializer import FORMATS, dumps, loads
+from SyntacticAnalysis import Parser
+from TypeInference import specialize
+
+SOURCE = "x = 1;\ny = \"a\";\ni = 0;\nwhile (i < 3) { x = x * 2 + i; y = y + \"b\"; i = i + 1; };\nprint x;\nprint y;\n"
+
+
+def parse(source: str):
+    return Parser(Tokenizer(InputStream(source))).parse()
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_round_trip(format):
+    ast = parse(SOURCE)
+    assert dumps(loads(dumps(ast, format), format), format) == dumps(ast, format)
+
+
+@pytest.mark.parametrize("rewrite", [
+    lambda ast: specialize(ast, {}),
+    lambda ast: specialize(ast, {"x": 1}),
+    lambda ast: make_memoized(ast, MemoCache(16)),
+    lambda ast: make_adaptive(ast),
+])
+def test_rewritten_tree_is_written_as_original(rewrite):
+    ast = parse(SOURCE)
+    assert str(rewrite(ast)) == str(ast)
+
+
+def test_typed_node_is_written_as_generic_node():
+    ast = parse("y = z + 1;\nprint y;\n")
+    specialized = specialize(ast)
+    assert type(specialized.get_expressions()[0].get_right_child()).__name__ == "ASTNodeTypedOpSum"
+    assert str(specialized) == str(ast)
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_big_int_constant(format):
+    ast = parse("x = " + "9" * 5000 + ";\n")
+    value = ast.get_expressions()[0].get_right_child().get_value()
+    text = dumps(ast, format)
+    assert loads(text, format).get_expressions()[0].get_right_child().get_value() == value
+
+
+def test_malformed_big_int_is_rejected():
+    with pytest.raises(ValueError):
+        loads('(NumConst "0xg")')
+
+
+@pytest.mark.parametrize("format", FORMATS)
+def test_invalid_tree_is_rejected(format):
+    ast = ASTNodeProg()
+    ast.add_expression(ASTNodeOpSub(None, ASTNodeNumConst(2)))
+    with pytest.raises(ValueError, match="Cannot serialize node NoneType"):
+        dumps(ast, format)
+    # Platný strom se stejnou strukturou projde zápisem i načtením.
+    ast = ASTNodeProg()
+    ast.add_expression(ASTNodeOpSub(ASTNodeNumConst(1), ASTNodeNumConst(2)))
+    assert dumps(loads(dumps(ast, format), format), format) == dumps(ast, format)
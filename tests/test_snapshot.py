@@ -0,0 +1,99 @@
+import asyncio
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Interpreter import Interpreter
+from Snapshot import Snapshot
+
+PREFIX = "greeting = \"hello\";\ncount = 0;\ni = 0;\nwhile (i < 10) { count = count + i; i = i + 1; };\n"
+
+
+@pytest.fixture(params=sorted(Interpreter.BACKENDS))
+def interpreter(request):
+    return Interpreter(request.param)
+
+
+def test_runs_see_prefix_state(interpreter):
+    snapshot = interpreter.snapshot(PREFIX)
+    output = io.StringIO()
+    snapshot.run("print greeting;\n", output=output)
+    table = snapshot.run("total = count + 1;\n")
+    assert output.getvalue() == "hello\n"
+    assert table["total"] == 46
+
+
+def test_runs_do_not_change_snapshot(interpreter):
+    snapshot = interpreter.snapshot(PREFIX)
+    snapshot.run("count = 0;\ngreeting = \"bye\";\n")
+    table = snapshot.run("copy = count;\n")
+    assert table["copy"] == 45
+    assert snapshot.get_values()["greeting"] == "hello"
+
+
+def test_compiled_programs_are_cached(interpreter):
+    snapshot = interpreter.snapshot(PREFIX)
+    program = snapshot.compile("x = count * 2;\n")
+    assert snapshot.compile("x = count * 2;\n") is program
+    assert snapshot.run(program)["x"] == 90
+
+
+def test_program_cache_evicts_least_recently_used():
+    snapshot = Interpreter().snapshot(PREFIX, max_programs=2)
+    first = snapshot.compile("x = 1;\n")
+    second = snapshot.compile("x = 2;\n")
+    assert snapshot.compile("x = 1;\n") is first
+    snapshot.compile("x = 3;\n")
+    assert snapshot.compile("x = 1;\n") is first
+    assert snapshot.compile("x = 2;\n") is not second
+    assert snapshot.extend("x = 4;\n").get_max_programs() == 2
+
+
+def test_program_cache_size_must_be_positive():
+    with pytest.raises(ValueError):
+        Snapshot(Interpreter(), {}, 0)
+
+
+def test_extend():
+    snapshot = Interpreter().snapshot(PREFIX)
+    extended = snapshot.extend("count = count + 100;\n")
+    assert extended.run("x = count;\n")["x"] == 145
+    assert snapshot.run("x = count;\n")["x"] == 45
+
+
+def test_run_async():
+    snapshot = Interpreter().snapshot(PREFIX)
+    output = io.StringIO()
+    asyncio.run(snapshot.run_async("print greeting;\n", output=output))
+    assert output.getvalue() == "hello\n"
+
+
+def test_prefix_input_and_initial_values():
+    snapshot = Interpreter().snapshot("read a;\nb = a + base;\n", {"base": 10}, input=["5"])
+    assert snapshot.get_values() == {"base": 10, "a": 5, "b": 15}
+
+
+def test_dumps_loads_round_trip():
+    interpreter = Interpreter()
+    data = interpreter.snapshot(PREFIX).dumps()
+    restored = Snapshot.loads(interpreter, data)
+    assert restored.run("x = count;\n")["x"] == 45
+    assert restored.get_values()["greeting"] == "hello"
+
+
+def test_loads_in_another_process(tmp_path):
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(Interpreter().snapshot(PREFIX).dumps())
+    script = (
+        "import sys\n"
+        "from Interpreter import Interpreter\n"
+        "from Snapshot import Snapshot\n"
+        "snapshot = Snapshot.loads(Interpreter(), open(sys.argv[1], 'rb').read())\n"
+        "snapshot.run('print count;\\n')\n"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", script, str(path)], capture_output=True, text=True, cwd=root)
+    assert result.stdout == "45\n"
@@ -0,0 +1,128 @@
+import io
+
+import pytest
+
+from Errors import BudgetExceededError
+from Interpreter import Interpreter
+from Tracing import ASSIGN, BRANCH, PRINT, READ, STATEMENT, Coverage, Tracer
+
+PROGRAM = """read a;
+if (a > 2) then {
+    b = a * 2;
+} else {
+    b = 0;
+};
+print b;
+"""
+
+FUNCTION = """function sign(x) {
+    if (x < 0) then { return 0 - 1; };
+    return 1;
+};
+s = sign(5);
+print s;
+"""
+
+
+def collect(tracer: Tracer, events=None) -> list:
+    seen = []
+    tracer.subscribe(lambda event, node, detail: seen.append((event, node.get_position()[0], detail)), events)
+    return seen
+
+
+@pytest.mark.parametrize("backend", sorted(Interpreter.BACKENDS))
+def test_events(backend):
+    tracer = Tracer()
+    seen = collect(tracer)
+    output = io.StringIO()
+    Interpreter(backend).compile(PROGRAM).run(input=["3"], output=output, tracer=tracer)
+    assert output.getvalue() == "6\n"
+    assert seen == [
+        (STATEMENT, 1, None), (READ, 1, 3),
+        (STATEMENT, 2, None), (BRANCH, 2, True),
+        (STATEMENT, 3, None), (ASSIGN, 3, 6),
+        (STATEMENT, 7, None), (PRINT, 7, "6"),
+    ]
+
+
+def test_event_filter():
+    tracer = Tracer()
+    seen = collect(tracer, (BRANCH,))
+    Interpreter().compile(PROGRAM).run(input=["1"], output=io.StringIO(), tracer=tracer)
+    assert seen == [(BRANCH, 2, False)]
+
+
+def test_unknown_event():
+    with pytest.raises(ValueError):
+        Tracer().subscribe(print, ("call",))
+
+
+def test_function_body_is_traced():
+    tracer = Tracer()
+    seen = collect(tracer, (STATEMENT, BRANCH))
+    Interpreter().compile(FUNCTION).run(output=io.StringIO(), tracer=tracer)
+    assert seen == [(STATEMENT, 1, None), (STATEMENT, 5, None), (STATEMENT, 2, None), (BRANCH, 2, False),
+                    (STATEMENT, 3, None), (STATEMENT, 6, None)]
+
+
+def test_inactive_tracer_does_not_report():
+    tracer = Tracer()
+    seen = []
+
+    def callback(event, node, detail):
+        seen.append(event)
+
+    tracer.subscribe(callback)
+    tracer.unsubscribe(callback)
+    assert tracer.is_active() is False
+    output = io.StringIO()
+    Interpreter().compile(PROGRAM).run(input=["3"], output=output, tracer=tracer)
+    assert output.getvalue() == "6\n" and seen == []
+
+
+def test_traced_run_keeps_budget():
+    tracer = Tracer()
+    collect(tracer)
+    program = Interpreter().compile("while (true) { x = 1; };\n")
+    with pytest.raises(BudgetExceededError):
+        program.run(max_steps=100, tracer=tracer)
+
+
+def test_coverage_report():
+    program = Interpreter().compile(PROGRAM)
+    coverage = Coverage(program.get_ast(), "prog.gjk")
+    tracer = Tracer()
+    coverage.subscribe(tracer)
+    program.run(input=["3"], output=io.StringIO(), tracer=tracer)
+    assert coverage.get_lines() == [1, 2, 3, 5, 7]
+    assert coverage.get_missing() == [5]
+    assert coverage.get_partial_branches() == [(2, frozenset((True,)))]
+    assert coverage.report() == (
+        "prog.gjk: lines 4/5 (80.0 %), branches 1/2 (50.0 %)\n"
+        "missing lines: 5\n"
+        "partial branches: 2 (then only)\n"
+    )
+
+    program.run(input=["1"], output=io.StringIO(), tracer=tracer)
+    assert coverage.get_missing() == [] and coverage.get_partial_branches() == []
+    assert coverage.report() == "prog.gjk: lines 5/5 (100.0 %), branches 2/2 (100.0 %)\n"
+
+    coverage.reset()
+    output = io.StringIO()
+    coverage.write_report(output)
+    assert output.getvalue() == (
+        "prog.gjk: lines 0/5 (0.0 %), branches 0/2 (0.0 %)\n"
+        "missing lines: 1-3, 5, 7\n"
+        "partial branches: 2 (never)\n"
+    )
+
+
+def test_coverage_of_function_bodies():
+    program = Interpreter().compile(FUNCTION)
+    coverage = Coverage(program.get_ast())
+    tracer = Tracer()
+    coverage.subscribe(tracer)
+    program.run(output=io.StringIO(), tracer=tracer)
+    assert coverage.get_lines() == [1, 2, 3, 5, 6]
+    assert coverage.get_missing() == []
+    assert coverage.get_partial_branches() == [(2, frozenset((False,)))]
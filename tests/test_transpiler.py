@@ -0,0 +1,107 @@
+import io
+import threading
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from AST import ASTNodeNumConst, ASTNodeOpSub, ASTNodeProg
+from Errors import CompileError, GJKRuntimeError
+from Interpreter import Interpreter
+from Transpiler import Transpiler, compile_python, verify
+from SyntacticAnalysis import Parser
+from LexicalAnalysis import Tokenizer
+from InputStream import InputStream
+
+
+def parse(source: str):
+    return Parser(Tokenizer(InputStream(source))).parse()
+
+
+def nested_loops(depth: int) -> str:
+    source = "n = 0;\n"
+    for level in range(depth):
+        source += "k{0:s} = 0; while (k{0:s} < 1) {{ k{0:s} = k{0:s} + 1;\n".format(chr(ord("a") + level))
+    source += "n = n + 1;\n" + "};\n" * depth
+    return source + "print n;\n"
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("x = " + " + ".join(["1"] * 250) + ";\nprint x;\n", "250"),
+    (nested_loops(21), "1"),
+])
+def test_deeply_nested_programs_run_on_every_backend(source, expected):
+    for backend in ("tree", "closures", "python"):
+        output = io.StringIO()
+        Interpreter(backend).compile(source).run(output=output)
+        assert output.getvalue().split() == [expected], backend
+
+
+def test_shallow_program_is_transpiled():
+    runner = compile_python(parse("x = 1 + 2;\nprint x;\n"))
+    assert "def {:s}(".format(Transpiler.FUNCTION_NAME) in runner.source
+
+
+def test_verify_matches_tree_walker():
+    source = "read a; b = a * 2; if (b > 4) then { print \"big\"; } else { print b; };\n"
+    assert verify(parse(source), "3\n") == ""
+    assert verify(parse(source), "1\n") == ""
+
+
+def test_chained_assignment_matches_tree_walker():
+    source = "a = b = 3;\nprint a;\nprint b;\n"
+    assert verify(parse(source)) == ""
+    output = io.StringIO()
+    Interpreter("python").compile(source).run(output=output)
+    assert output.getvalue().split() == ["None", "3"]
+
+
+@pytest.mark.parametrize("source", [
+    "x = 1;\ny = x + z;\n",
+    "i = 0;\nwhile (i < 3) {\n  i = i + 1;\n  y = 1 / i - 2;\n};\n",
+    "x = 1;\nif (x == 1) then {\n  print x;\n  y = \"a\" - 1;\n};\n",
+    "x = 1;\nif (x < \"a\") then { print x; };\n",
+    "print 1;\nread x;\n",
+])
+def test_runtime_errors_carry_statement_position(source):
+    errors = set()
+    for backend in ("tree", "closures", "python"):
+        with pytest.raises(GJKRuntimeError) as error:
+            Interpreter(backend).compile(source).run(input=[], output=io.StringIO())
+        assert error.value.get_line() is not None, backend
+        errors.add(str(error.value))
+    assert len(errors) == 1
+
+
+def test_invalid_expression_is_compile_error():
+    statement = ASTNodeOpSub(None, ASTNodeNumConst(2))
+    statement.set_position(2, 1)
+    prog = ASTNodeProg()
+    prog.add_expression(statement)
+    with pytest.raises(CompileError) as error:
+        compile_python(prog)
+    assert (error.value.get_line(), error.value.get_column()) == (2, 1)
+    assert error.value.get_errors()[0].get_message() == "Node NoneType cannot be used as an expression"
+
+
+@pytest.mark.parametrize("budgeted", [False, True])
+def test_constant_condition_compiles_without_warnings(budgeted):
+    ast = parse("if (1 + 2) then { x = 1; };\nwhile (1 + 2) { x = 2; };\n")
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        runner = compile_python(ast, budgeted)
+    # Program se nepřeložil náhradou do closures.
+    assert "def {:s}(".format(Transpiler.FUNCTION_NAME) in runner.source
+
+
+def test_concurrent_compilation_shares_one_runner():
+    ast = parse("x = 1 + 2;\nprint x;\n")
+    barrier = threading.Barrier(8)
+
+    def compile_after_barrier():
+        barrier.wait()
+        return compile_python(ast)
+
+    with ThreadPoolExecutor(8) as executor:
+        runners = list(executor.map(lambda _: compile_after_barrier(), range(8)))
+    assert all(runner is runners[0] for runner in runners)
@@ -0,0 +1,88 @@
+import io
+
+import pytest
+
+from Interpreter import Interpreter
+import TypeInference as typing_module
+from TypeInference import TypeInference, ASTNodeTypedOpSum
+
+BRANCH = "if (x) then { print \"yes\"; } else { print \"no\"; };\nwhile (x) { print \"loop\"; x = false; };\n"
+ARITHMETIC = "y = x + x;\nz = y * 2 - 1;\nprint z;\n"
+
+
+def run(program, symbol_table: dict) -> str:
+    output = io.StringIO()
+    program.run(dict(symbol_table), output=output)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("backend", ["tree", "closures"])
+@pytest.mark.parametrize("value", [True, False, 1, 0, "a"])
+def test_condition_inferred_as_bool_keeps_tree_semantics(backend, value):
+    typed = Interpreter(backend).compile(BRANCH, symbol_table={"x": True})
+    generic = Interpreter("tree").compile(BRANCH)
+    assert run(typed, {"x": value}) == run(generic, {"x": value})
+
+
+@pytest.mark.parametrize("backend", ["tree", "closures"])
+@pytest.mark.parametrize("value, expected", [(3, "6\n"), (1.5, "3.0\n"), (True, "2\n")])
+def test_typed_operators_fall_back_for_other_types(backend, value, expected):
+    typed = Interpreter(backend).compile(ARITHMETIC, symbol_table={"x": 1})
+    assert run(typed, {"x": value}) == expected
+
+
+@pytest.mark.parametrize("backend", ["tree", "closures"])
+def test_typed_operator_with_string_operands(backend):
+    typed = Interpreter(backend).compile("y = x + x;\nprint y;\n", symbol_table={"x": 1})
+    assert run(typed, {"x": "ab"}) == "abab\n"
+
+
+def test_operators_are_specialized():
+    inference = TypeInference({"x": 1})
+    ast = inference.specialize(Interpreter("tree").compile(ARITHMETIC).get_ast())
+    assert isinstance(ast.get_expressions()[0].get_right_child(), ASTNodeTypedOpSum)
+    assert inference.specialized == 3
+    assert inference.get_variable_types() == {"x": int, "y": int, "z": int}
+
+
+def test_guessed_type_is_guarded():
+    inference = TypeInference()
+    program = Interpreter("tree").compile("y = x + 1;\nprint y;\n")
+    ast = inference.specialize(program.get_ast())
+    assert inference.guarded == 1
+    table = {"x": 2.5}
+    ast.evaluate(table)
+    assert table["y"] == 3.5
+
+
+def test_closures_backend_uses_typed_compiler(monkeypatch):
+    compiled = []
+    compile_typed = typing_module.compile_typed
+    monkeypatch.setattr(typing_module, "compile_typed",
+                        lambda ast, budgeted: compiled.append(budgeted) or compile_typed(ast, budgeted))
+    program = Interpreter("closures").compile(ARITHMETIC, symbol_table={"x": 1})
+    assert compiled == [False, True]
+    assert run(program, {"x": 3}) == run(Interpreter("tree").compile(ARITHMETIC), {"x": 3})
+    assert isinstance(program.get_ast().get_expressions()[0].get_right_child(), ASTNodeTypedOpSum)
+
+
+@pytest.mark.parametrize("value", [5, 0.5, True])
+def test_typed_operator_with_compiled_operand(value):
+    source = "y = x * 2 + x * 3;\nprint y;\n"
+    program = Interpreter("closures").compile(source, symbol_table={"x": 1})
+    assert run(program, {"x": value}) == run(Interpreter("tree").compile(source), {"x": value})
+
+
+@pytest.mark.parametrize("kwargs", [{"backend": "python"}, {"backend": "adaptive"},
+                                    {"backend": "tree", "memoize": 8}])
+def test_variables_are_rejected_without_specialization(kwargs):
+    interpreter = Interpreter(**kwargs)
+    assert interpreter.supports_specialization() is False
+    with pytest.raises(ValueError):
+        interpreter.compile(ARITHMETIC, symbol_table={"x": 1})
+
+
+def test_empty_table_opts_into_specialization():
+    program = Interpreter("tree").compile("x = 1;\ny = x + x;\nprint y;\n", symbol_table={})
+    assert isinstance(program.get_ast().get_expressions()[1].get_right_child(), ASTNodeTypedOpSum)
+    assert run(program, {}) == "2\n"
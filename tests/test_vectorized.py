@@ -0,0 +1,105 @@
+import io
+
+import pytest
+
+import Vectorized
+from Errors import GJKError
+from Interpreter import Interpreter
+
+# Bez NumPy se dávka vyhodnocuje po záznamech; testy počtu záznamů
+# vyhodnocených zvlášť proto NumPy potřebují, ostatní běží vždy.
+needs_numpy = pytest.mark.skipif(Vectorized.np is None, reason="vectorized evaluation needs numpy")
+
+SCORE = (
+    "read a;\nread b;\n"
+    "if (a > b) then { m = a; } else { m = b; };\n"
+    "s = 0;\ni = 0;\nwhile (i < m) { s = s + i; i = i + 1; };\n"
+    "print s;\nprint a / b;\nprint a == b | a * b > 10;\n"
+)
+
+
+def one_by_one(program, records: list, symbol_table: dict = None) -> tuple:
+    outputs = []
+    errors = {}
+    for i, record in enumerate(records):
+        output = io.StringIO()
+        try:
+            program.run(symbol_table, input=record, output=output)
+        except GJKError as e:
+            errors[i] = type(e)
+        outputs.append(output.getvalue())
+    return outputs, errors
+
+
+def check(source: str, records: list, symbol_table: dict = None):
+    program = Interpreter().compile(source)
+    result = program.run_batch(records, symbol_table)
+    outputs, errors = one_by_one(program, records, symbol_table)
+    assert result.get_outputs() == outputs
+    assert {i: type(e) for i, e in result.get_errors().items()} == errors
+    return result
+
+
+@needs_numpy
+def test_numeric_batch_is_vectorized():
+    records = [[str(a), str(b)] for a in range(1, 12) for b in range(1, 12)]
+    assert check(SCORE, records).get_fallbacks() == 0
+
+
+@needs_numpy
+def test_invalid_records_fall_back():
+    records = [["3", "4"], ["5", "0"], ["4000000000", "4000000000"], ["7"], ["6", "3"]]
+    result = check("read a;\nread b;\nprint a * b;\nprint a / b;\n", records)
+    # Dělení nulou, přetečení int64 a chybějící vstup.
+    assert result.get_fallbacks() == 3
+    assert sorted(result.get_errors()) == [1, 3]
+
+
+@needs_numpy
+def test_failing_string_operation_falls_back():
+    records = [["x", "1"], ["2", "3"]]
+    result = check("read a;\nread b;\nprint a * b;\nprint a - b;\n", records)
+    assert result.get_fallbacks() == 1
+    assert list(result.get_errors()) == [0]
+
+
+@needs_numpy
+def test_big_integers_are_exact():
+    records = [[str(2 ** 70), "3"], ["2", "5"]]
+    assert check("read a;\nread b;\nprint a * b + 1;\n", records).get_fallbacks() == 0
+
+
+@needs_numpy
+def test_mixed_types_per_record():
+    records = [["1"], ["a"], ["2.5"], ["true"]]
+    result = check("read a;\nif (a == 1) then { b = \"one\"; } else { b = a; };\nprint b;\n", records)
+    assert result.get_fallbacks() == 0
+
+
+@needs_numpy
+def test_undefined_variable_falls_back():
+    records = [["1"], ["0"]]
+    result = check("read a;\nif (a > 0) then { b = 1; };\nprint b;\n", records)
+    assert result.get_fallbacks() == 1
+    assert list(result.get_errors()) == [1]
+
+
+def test_initial_values():
+    check("read a;\nprint a + base;\n", [["1"], ["2"]], {"base": 10})
+
+
+def test_program_that_cannot_be_vectorized():
+    source = "function twice(x) { return x * 2; };\nread a;\nprint twice(a);\n"
+    records = [["1"], ["2"], ["3"]]
+    assert check(source, records).get_fallbacks() == 3
+
+
+def test_without_numpy(monkeypatch):
+    monkeypatch.setattr(Vectorized, "np", None)
+    records = [["1", "2"], ["3", "4"]]
+    assert check(SCORE, records).get_fallbacks() == 2
+
+
+def test_empty_batch():
+    result = Interpreter().compile(SCORE).run_batch([])
+    assert result.get_outputs() == [] and result.get_errors() == {} and result.get_fallbacks() == 0